@@ -0,0 +1,243 @@
+# Local stand-in for the Groq chat completions API
+#
+# Answers the prompts used by services/groq_service.py with canned content,
+# after a configurable latency with jitter, and can inject 429 responses.
+# Point the app at it with GROQ_BASE_URL=http://127.0.0.1:<port>.
+import json
+import random
+import re
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+TOPIC_WORDS = [
+    "History", "Science", "Art", "Music", "Geography", "Sports", "Literature",
+    "Movies", "Technology", "Nature", "Space", "Food", "Mythology", "Politics",
+    "Languages", "Inventions", "Animals", "Architecture", "Medicine", "Economics",
+]
+
+
+def estimate_tokens(text):
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+class FakeGroqServer:
+    """
+    Threaded HTTP server that mimics chat.completions.create.
+
+    latency and jitter are in seconds; every request waits
+    latency +/- jitter. rate_limit_probability is the chance that a request
+    is answered with a 429 and a Retry-After of retry_after seconds.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.05, rate_limit_probability=0.0,
+                 retry_after=0.1, seed=None, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "rate_limited": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+
+    def _delay(self):
+        with self._lock:
+            offset = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency + offset))
+
+    def _rate_limited(self):
+        with self._lock:
+            return self.random.random() < self.rate_limit_probability
+
+    def respond(self, body):
+        """Canned content for a request body, based on its prompt"""
+        prompt = body["messages"][-1]["content"]
+
+        if "coherent subject" in prompt:
+            return "INVALID" if re.search(r'"[^"]*\d{3,}[^"]*"', prompt) else "VALID"
+
+        if "different topics for quiz" in prompt:
+            count = int(re.search(r"EXACTLY (\d+)", prompt).group(1))
+            return "\n".join(
+                f"{self.random.choice(TOPIC_WORDS)} {i + 1}" for i in range(count)
+            )
+
+        if body.get("response_format", {}).get("type") == "json_object":
+            count = int(re.search(r"Ask (\d+) different", prompt).group(1))
+            with_explanation = '"explanation"' in prompt
+            return json.dumps({"questions": [
+                self._question_dict(with_explanation) for _ in range(count)
+            ]})
+
+        if "Ask a multiple choice question" in prompt:
+            question = self._question_dict("Explanation:" in prompt)
+            lines = [question["question"]]
+            lines += [f"{label}) {text}" for label, text in question["options"].items()]
+            lines.append(f"Answer: {question['answer']}")
+            if question.get("explanation"):
+                lines.append(f"Explanation: {question['explanation']}")
+            return "\n".join(lines)
+
+        if "one or two sentences" in prompt:
+            return "This is the correct answer because of a short, made-up reason."
+
+        return " ".join(["This is a detailed explanation of the correct answer."] * 12)
+
+    def _word(self):
+        return "".join(self.random.choice(string.ascii_lowercase) for _ in range(7))
+
+    def _question_dict(self, with_explanation):
+        # Random words, so that generated questions are no near-duplicates
+        with self._lock:
+            subject = " ".join(self._word() for _ in range(3))
+            options = {label: self._word() for label in "ABCD"}
+            answer = self.random.choice("ABCD")
+        question = {
+            "question": f"Which option is right for {subject}?",
+            "options": options,
+            "answer": answer,
+        }
+        if with_explanation:
+            question["explanation"] = f"Option {answer} is right by definition."
+        return question
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=()):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != COMPLETIONS_PATH:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+
+                server._delay()
+                if server._rate_limited():
+                    server._record(requests=1, rate_limited=1)
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                        [("retry-after", str(server.retry_after))],
+                    )
+                    return
+
+                content = server.respond(body)
+                prompt_tokens = sum(estimate_tokens(m["content"]) for m in body["messages"])
+                completion_tokens = estimate_tokens(content)
+                if body.get("max_tokens"):
+                    completion_tokens = min(completion_tokens, body["max_tokens"])
+                server._record(
+                    requests=1,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                )
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+
+                if body.get("stream"):
+                    self._stream(body, content, usage)
+                else:
+                    self._send_json(200, {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": usage,
+                    })
+
+            def _stream(self, body, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                            "finish_reason": None,
+                        }],
+                    }
+                    if i == len(words) - 1:
+                        chunk["x_groq"] = {"usage": usage}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
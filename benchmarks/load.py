@@ -0,0 +1,233 @@
+# Load test: many simulated players of src/main.py at the same time
+#
+# Every simulated player drives the app headlessly with Streamlit's AppTest:
+# spin the wheel, start the quiz, answer every question and reach the game
+# over screen, against the local Groq stand-in. Reports CPU, memory, script
+# runs and end-to-end latency per session.
+#
+# AppTest patches process-wide Streamlit state, so concurrent sessions run in
+# separate worker processes (one session at a time per worker) that share
+# the Groq stand-in and the question bank.
+#
+# Usage: python benchmarks/load.py [--sessions N] [--concurrency C] ...
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+SRC_DIR = os.path.join(REPO_DIR, "src")
+MAIN_SCRIPT = os.path.join(SRC_DIR, "main.py")
+sys.path.insert(0, SRC_DIR)
+# The app expects to run from the repository root, e.g. for its audio files;
+# this also runs in the worker processes, which import this module
+INVOCATION_DIR = os.getcwd()
+os.chdir(REPO_DIR)
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from fake_groq import FakeGroqServer  # noqa: E402
+
+RUN_COUNTER_KEY = "_load_test_script_runs"
+
+
+def count_script_runs():
+    """
+    Count the script runs of every session in a counter that the load test
+    puts in its session state (and keeps a reference to, since the game
+    over screen resets the session state)
+    """
+    import streamlit as st
+    from models.session import SessionState
+
+    initialize = SessionState.initialize
+
+    def counting_initialize():
+        if RUN_COUNTER_KEY in st.session_state:
+            st.session_state[RUN_COUNTER_KEY][0] += 1
+        return initialize()
+
+    SessionState.initialize = staticmethod(counting_initialize)
+
+
+def setup_worker(keep_animation):
+    """Prepare a worker process for playing sessions"""
+    from services.groq_client import groq_client
+    import utils.spinning_wheel
+
+    groq_client.buckets.clear()
+    if not keep_animation:
+        utils.spinning_wheel.WHEEL_SPIN_DURATION = 0
+    count_script_runs()
+    tracemalloc.start()
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def state_size(at):
+    """
+    Size of a session's state: the stored fields of the game and the
+    pickled size of the other picklable values
+    """
+    state = at.session_state
+    # Older Streamlit versions expose the user state as filtered_state
+    items = state.items() if hasattr(type(state), "items") else state.filtered_state.items()
+    size = 0
+    for _, value in items:
+        if hasattr(value, "to_fields"):
+            size += sum(len(field) for field in value.to_fields().values())
+            continue
+        try:
+            size += len(pickle.dumps(value))
+        except Exception:
+            continue
+    return size
+
+
+def play_session(seed, timeout):
+    """Play one game from the wheel to the game over screen"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    tracemalloc.reset_peak()
+    memory_start, _ = tracemalloc.get_traced_memory()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+    script_runs = [0]
+    at.session_state[RUN_COUNTER_KEY] = script_runs
+    at.run()
+    # The game, for its Groq usage
+    quiz = at.session_state["quiz"]
+    button(at, "Determine the quiz topic").click().run()
+    button(at, "Start the quiz").click().run()
+
+    answered = 0
+    max_state_size = state_size(at)
+    while not any("Game Over" in m.value for m in at.markdown):
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        at.radio[0].set_value(rng.choice("ABCD"))
+        button(at, "Submit Answer").click().run()
+        answered += 1
+        # Measured while the game is played
+        if not any("Game Over" in m.value for m in at.markdown):
+            max_state_size = max(max_state_size, state_size(at))
+
+    latency = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    return {
+        "latency": latency,
+        "cpu": time.process_time() - cpu_start,
+        "peak_memory": peak_memory - memory_start,
+        "answered": answered,
+        "script_runs": script_runs[0],
+        "state_bytes": max_state_size,
+        "tokens": quiz.tokens.totals(),
+    }
+
+
+def summarize(values):
+    return {
+        "mean": statistics.mean(values),
+        "p50": statistics.median(values),
+        "max": max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent Streamlit session load test")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="Groq seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--keep-animation", action="store_true",
+                        help="wait for the 3 second wheel animation like a real player")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per script run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    server = FakeGroqServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_probability=args.rate_limit_probability,
+        seed=args.seed,
+    ).start()
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    bank_dir = tempfile.mkdtemp()
+    os.environ["QUESTION_BANK_PATH"] = os.path.join(bank_dir, "question_bank.db")
+
+    # AppTest replaces __main__ in the workers, so hand them the functions
+    # of the importable module instead of this script's
+    import load
+
+    rng = random.Random(args.seed)
+    seeds = [rng.random() for _ in range(args.sessions)]
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.concurrency,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=load.setup_worker,
+        initargs=(args.keep_animation,),
+    ) as executor:
+        sessions = list(executor.map(
+            load.play_session, seeds, [args.timeout] * args.sessions
+        ))
+    wall_time = time.perf_counter() - wall_start
+    groq_stats = server.snapshot()
+    server.stop()
+
+    results = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "wall_seconds": wall_time,
+        "cpu_seconds": summarize([s["cpu"] for s in sessions]),
+        "peak_memory_bytes": summarize([s["peak_memory"] for s in sessions]),
+        "state_bytes": summarize([s["state_bytes"] for s in sessions]),
+        "script_runs": summarize([s["script_runs"] for s in sessions]),
+        "latency_seconds": summarize([s["latency"] for s in sessions]),
+        "tokens_per_quiz": summarize(
+            [s["tokens"]["prompt"] + s["tokens"]["completion"] for s in sessions]
+        ),
+        "cost_per_quiz": summarize([s["tokens"]["cost"] for s in sessions]),
+        "groq_calls_per_session": groq_stats["requests"] / args.sessions,
+    }
+
+    print(f"sessions:                 {args.sessions} ({args.concurrency} at a time)")
+    print(f"wall time:                {wall_time:.1f} s")
+    print(f"CPU per session:          {results['cpu_seconds']['mean'] * 1000:.0f} ms mean, "
+          f"{results['cpu_seconds']['max'] * 1000:.0f} ms max")
+    print(f"peak memory per session:  {results['peak_memory_bytes']['mean'] / 1024:.0f} KiB mean, "
+          f"{results['peak_memory_bytes']['max'] / 1024:.0f} KiB max (traced)")
+    print(f"session state size:       {results['state_bytes']['max'] / 1024:.1f} KiB max")
+    print(f"script runs per session:  {results['script_runs']['mean']:.1f} mean, "
+          f"{results['script_runs']['max']} max")
+    print(f"end-to-end latency:       {results['latency_seconds']['p50']:.2f} s p50, "
+          f"{results['latency_seconds']['max']:.2f} s max")
+    print(f"Groq calls per session:   {results['groq_calls_per_session']:.1f}")
+    print(f"tokens per quiz:          {results['tokens_per_quiz']['mean']:.0f} mean, "
+          f"{results['tokens_per_quiz']['max']} max")
+    print(f"cost per quiz:            ${results['cost_per_quiz']['mean']:.6f} mean, "
+          f"${results['cost_per_quiz']['max']:.6f} max")
+
+    if args.json:
+        with open(os.path.join(INVOCATION_DIR, args.json), "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
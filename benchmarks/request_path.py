@@ -0,0 +1,170 @@
+# Benchmark of the quiz request path against a local Groq stand-in
+#
+# Plays quizzes through services/groq_service.py (topics, custom topic
+# validation, questions, answer checks and explanations for wrong answers)
+# and reports latency percentiles per function, calls per quiz and tokens
+# per quiz. Use --max-p95/--max-calls-per-quiz/--max-tokens-per-quiz to
+# fail CI on regressions.
+#
+# Usage: python benchmarks/request_path.py [--quizzes N] [--latency S] ...
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from fake_groq import FakeGroqServer  # noqa: E402
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def call(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+
+def play_quiz(groq_service, timings, rng, mode, num_questions):
+    """One player: wheel topics, a custom topic check, the questions and answers"""
+    topics = timings.call("generate_topics", groq_service.generate_topics, 12)
+    timings.call("validate_topic", groq_service.validate_topic, "Ancient Egypt")
+    topic = rng.choice([t for t in topics if t] or ["History"])
+    questions = timings.call(
+        "generate_questions", groq_service.generate_questions, topic, num_questions, mode=mode
+    )
+    for question in questions:
+        answer = rng.choice("ABCD")
+        correct, correct_answer = timings.call(
+            "check_answer", groq_service.check_answer, question, answer
+        )
+        if not correct:
+            timings.call(
+                "get_explanation", groq_service.get_explanation, question, correct_answer
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz request path benchmark")
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="quizzes played at once")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--mode", default="batched", choices=["sequential", "concurrent", "batched"])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- seconds per request")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0,
+                        help="chance of a 429 response")
+    parser.add_argument("--client-rate-limits", action="store_true",
+                        help="keep the per-model request limits of the client")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-p95", type=float, help="fail if a p95 exceeds this (seconds)")
+    parser.add_argument("--max-calls-per-quiz", type=float)
+    parser.add_argument("--max-tokens-per-quiz", type=float)
+    args = parser.parse_args()
+
+    server = FakeGroqServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_probability=args.rate_limit_probability,
+        seed=args.seed,
+    ).start()
+    os.environ["GROQ_BASE_URL"] = server.base_url
+
+    from services import groq_service
+    from services.groq_client import groq_client
+    if not args.client_rate_limits:
+        groq_client.buckets.clear()
+
+    timings = Timings()
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(
+                play_quiz, groq_service, timings, random.Random(rng.random()),
+                args.mode, args.questions,
+            )
+            for _ in range(args.quizzes)
+        ]
+        for future in futures:
+            future.result()
+    wall_time = time.perf_counter() - start
+    stats = server.snapshot()
+    server.stop()
+
+    results = {
+        "quizzes": args.quizzes,
+        "wall_seconds": wall_time,
+        "quizzes_per_second": args.quizzes / wall_time,
+        "calls_per_quiz": stats["requests"] / args.quizzes,
+        "rate_limited_per_quiz": stats["rate_limited"] / args.quizzes,
+        "prompt_tokens_per_quiz": stats["prompt_tokens"] / args.quizzes,
+        "completion_tokens_per_quiz": stats["completion_tokens"] / args.quizzes,
+        "tokens_per_quiz": (stats["prompt_tokens"] + stats["completion_tokens"]) / args.quizzes,
+        "functions": {
+            name: {
+                "calls": len(samples),
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+            }
+            for name, samples in sorted(timings.samples.items())
+        },
+    }
+
+    print(f"{'function':<20}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in results["functions"].items():
+        print(
+            f"{name:<20}{result['calls']:>7}{result['p50'] * 1000:>10.1f}"
+            f"{result['p95'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+        )
+    print()
+    print(f"quizzes/s:        {results['quizzes_per_second']:.2f}")
+    print(f"calls per quiz:   {results['calls_per_quiz']:.1f}"
+          f" ({results['rate_limited_per_quiz']:.1f} rate limited)")
+    print(f"tokens per quiz:  {results['tokens_per_quiz']:.0f}"
+          f" ({results['prompt_tokens_per_quiz']:.0f} prompt,"
+          f" {results['completion_tokens_per_quiz']:.0f} completion)")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+    failures = []
+    if args.max_p95 is not None:
+        failures += [
+            f"{name} p95 {result['p95']:.3f}s > {args.max_p95}s"
+            for name, result in results["functions"].items()
+            if result["p95"] > args.max_p95
+        ]
+    if args.max_calls_per_quiz is not None and results["calls_per_quiz"] > args.max_calls_per_quiz:
+        failures.append(f"{results['calls_per_quiz']:.1f} calls per quiz > {args.max_calls_per_quiz}")
+    if args.max_tokens_per_quiz is not None and results["tokens_per_quiz"] > args.max_tokens_per_quiz:
+        failures.append(f"{results['tokens_per_quiz']:.0f} tokens per quiz > {args.max_tokens_per_quiz}")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Benchmark of the memory used per player session
+#
+# Builds many mid-game sessions (questions loaded, a few answered, one
+# explanation) in the former representation (separate lists and dicts in
+# st.session_state, one copy of the questions per session) and as a
+# QuizSession with shared questions, and reports the memory per session.
+#
+# Usage: python benchmarks/session_memory.py [--sessions N] [--questions Q]
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from models.question import OPTION_LABELS, Question, intern_question  # noqa: E402
+from models.session import QuizSession  # noqa: E402
+
+EXPLANATION = " ".join(["This is a detailed explanation of the correct answer."] * 12)
+
+
+def bank_questions(num_questions, shared_questions):
+    """Questions as loaded from the question bank, a new copy for every session"""
+    return [Question.from_dict(question.to_dict()) for question in shared_questions[:num_questions]]
+
+
+def legacy_session(questions, topics, answered):
+    """The former session state: one key per field, lists of strings"""
+    state = {
+        "running": True,
+        "topic": topics[0],
+        "num_topics": len(topics),
+        "topics": list(topics),
+        "custom_topic": False,
+        "current_question_idx": answered,
+        "user_answers": [],
+        "correctness": [],
+        "explanations": {},
+        "is_sound_played": [False] * 5,
+        "selected_options": [None] * 5,
+        "questions": questions,
+        "start_time": 0.0,
+    }
+    for idx in range(answered):
+        answer = OPTION_LABELS[idx % 4]
+        state["user_answers"].append(answer)
+        correct = answer == questions[idx].correct
+        state["correctness"].append("Correct" if correct else str(questions[idx].correct))
+        if not correct and not state["explanations"]:
+            state["explanations"][idx] = EXPLANATION
+    return state
+
+
+def quiz_session(questions, topics, answered):
+    quiz = QuizSession(num_topics=len(topics), topics=tuple(topics), running=True, topic=topics[0])
+    quiz.questions = tuple(intern_question(question) for question in questions)
+    for idx in range(answered):
+        answer = OPTION_LABELS[idx % 4]
+        correct = answer == questions[idx].correct
+        if not correct and not quiz.explanations:
+            quiz.explanations[idx] = EXPLANATION
+        quiz.record_answer(answer, correct)
+    return quiz
+
+
+def measure(build, sessions):
+    """Traced memory per session of `sessions` sessions built by build()"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [build() for _ in range(sessions)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (after - before) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session memory benchmark")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--answered", type=int, default=3)
+    parser.add_argument("--shared-questions", type=int, default=50,
+                        help="distinct questions the sessions draw from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    shared = [
+        Question(
+            f"Which option is right for question {i} of the benchmark topic?",
+            {label: f"Option {label} of question {i}" for label in OPTION_LABELS},
+            rng.choice(OPTION_LABELS),
+        )
+        for i in range(args.shared_questions)
+    ]
+    topics = [f"Topic {i}" for i in range(12)]
+
+    def questions():
+        start = rng.randrange(len(shared) - args.questions + 1)
+        return bank_questions(args.questions, shared[start:])
+
+    # Keep the interned instances alive like the question bank cache does
+    interned = [intern_question(question) for question in shared]
+
+    legacy = measure(lambda: legacy_session(questions(), topics, args.answered), args.sessions)
+    compact = measure(lambda: quiz_session(questions(), topics, args.answered), args.sessions)
+    del interned
+
+    print(f"sessions:        {args.sessions} ({args.questions} questions, {args.answered} answered)")
+    print(f"legacy state:    {legacy / 1024:.2f} KiB per session")
+    print(f"QuizSession:     {compact / 1024:.2f} KiB per session")
+    print(f"saved:           {100 * (1 - compact / legacy):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Startup benchmark: cold import time per module
+#
+# Usage: python benchmarks/startup.py [--repeat N] [module ...]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+MODULES = [
+    "config",
+    "models.question",
+    "services.groq_service",
+    "services.audio_service",
+    "services.question_bank",
+    "utils.spinning_wheel",
+    "utils.validators",
+    "models.session",
+    "main",
+]
+
+IMPORT_SNIPPET = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def time_import(module):
+    """Import a module in a fresh interpreter and return the seconds it took"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=os.path.dirname(SRC_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time per module")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    print(f"{'module':<28}{'median ms':>12}{'min ms':>10}")
+    for module in args.modules:
+        timings = [time_import(module) for _ in range(args.repeat)]
+        print(
+            f"{module:<28}{statistics.median(timings) * 1000:>12.1f}"
+            f"{min(timings) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Build the question bank offline
+#
+# Generates questions for many topics ahead of time (e.g. overnight), so that
+# players get stored questions instead of waiting for the Groq API. The
+# questions go into the question bank used by the app and/or a JSONL or
+# Parquet file. Every question is validated like generated questions in the
+# app: text, exactly four options A-D and a correct answer.
+#
+# Progress is checkpointed after every topic; running the same command again
+# resumes an interrupted build.
+#
+# Usage: python src/build_question_bank.py --topics History Jazz --questions 30
+#        python src/build_question_bank.py --generate-topics 200 --output bank.parquet
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import EXPLANATION_POLICY, QUESTION_BANK_PATH, QUESTION_GENERATION_MODE
+from services.groq_service import generate_questions, generate_topics
+from services.question_bank import QuestionBank, normalize_topic
+from utils.dedup import DuplicateFilter
+
+OUTPUT_FORMATS = ("jsonl", "parquet")
+MAX_TOPIC_ROUNDS = 10  # generate_topics calls to collect the requested topics
+
+
+def collect_topics(num_topics, generate=generate_topics):
+    """num_topics distinct generated topics (fewer if the API keeps repeating itself)"""
+    topics, keys = [], set()
+    for _ in range(MAX_TOPIC_ROUNDS):
+        if len(topics) >= num_topics:
+            break
+        added = False
+        for topic in generate(num_topics - len(topics), keep_extra=True):
+            key = normalize_topic(topic)
+            if key and key not in keys:
+                keys.add(key)
+                topics.append(topic.strip())
+                added = True
+        if not added:
+            break
+    return topics[:num_topics]
+
+
+def generate_topic_questions(topic, num_questions, batch_size, explanations=False,
+                             generate=generate_questions):
+    """
+    Up to num_questions valid questions about a topic without
+    near-duplicates, generated batch_size at a time until a batch brings
+    nothing new.
+
+    Returns: (list of questions, number of invalid questions dropped)
+    """
+    questions, dedup, rejected = [], DuplicateFilter(), 0
+    while len(questions) < num_questions:
+        batch = generate(
+            topic,
+            min(batch_size, num_questions - len(questions)),
+            mode=QUESTION_GENERATION_MODE,
+            explanations=explanations,
+            existing=questions,
+        )
+        added = 0
+        for question in batch:
+            try:
+                question.validate()
+            except ValueError:
+                rejected += 1
+                continue
+            if dedup.add(question):
+                questions.append(question)
+                added += 1
+        if not added:
+            break
+    return questions[:num_questions], rejected
+
+
+class Checkpoint:
+    """
+    Progress of a build: the topics, the ones that are done, and the size
+    of the records file after the last finished topic. Saved atomically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.topics = None
+        self.done = {}  # topic -> number of questions
+        self.records_size = 0
+        if os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            self.topics = data["topics"]
+            self.done = data["done"]
+            self.records_size = data["records_size"]
+
+    def save(self):
+        data = {"topics": self.topics, "done": self.done, "records_size": self.records_size}
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(data, file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_parquet(records_path, path):
+    """Convert the JSONL records to a Parquet file (needs pyarrow)"""
+    try:
+        import pyarrow.json
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+    pyarrow.parquet.write_table(pyarrow.json.read_json(records_path), path)
+
+
+class QuestionBankBuilder:
+    """
+    Generates the questions of many topics with at most `concurrency`
+    topics in flight. Results are written by the calling thread: added to
+    `bank` (unless None) and appended to the records file, after which the
+    topic is marked done in the checkpoint.
+    """
+
+    def __init__(self, checkpoint_path, output=None, output_format="jsonl", bank=None,
+                 num_questions=20, batch_size=10, concurrency=4, explanations=False,
+                 generate=generate_questions):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.output = output
+        self.output_format = output_format
+        self.bank = bank
+        self.num_questions = num_questions
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.explanations = explanations
+        self.generate = generate
+
+        # Parquet files can't be appended to, so records are collected as JSONL first
+        self.records_path = None
+        if output:
+            self.records_path = output if output_format == "jsonl" else output + ".partial.jsonl"
+
+    def build(self, topics):
+        """
+        Build the bank for the topics; a resumed build keeps the topics it
+        was started with. Returns a summary of the build.
+        """
+        checkpoint = self.checkpoint
+        if checkpoint.topics is None:
+            checkpoint.topics = list(topics)
+            checkpoint.save()
+        todo = [topic for topic in checkpoint.topics if topic not in checkpoint.done]
+        summary = {"topics": len(checkpoint.topics), "resumed": len(checkpoint.done),
+                   "questions": 0, "rejected": 0, "failed": {}}
+
+        records = None
+        if self.records_path:
+            # Drop records written after the last checkpoint
+            records = open(self.records_path, "a+b")
+            records.truncate(checkpoint.records_size)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = {
+                    executor.submit(
+                        generate_topic_questions, topic, self.num_questions,
+                        self.batch_size, self.explanations, self.generate,
+                    ): topic
+                    for topic in todo
+                }
+                for future in as_completed(futures):
+                    topic = futures[future]
+                    try:
+                        questions, rejected = future.result()
+                    except Exception as e:
+                        summary["failed"][topic] = str(e)
+                        continue
+                    self._store(topic, questions, records)
+                    summary["questions"] += len(questions)
+                    summary["rejected"] += rejected
+        finally:
+            if records:
+                records.close()
+
+        if not summary["failed"]:
+            if self.output_format == "parquet" and self.records_path:
+                write_parquet(self.records_path, self.output)
+                os.remove(self.records_path)
+            checkpoint.remove()
+        return summary
+
+    def _store(self, topic, questions, records):
+        if self.bank is not None:
+            self.bank.add(topic, questions)
+        if records:
+            for question in questions:
+                record = {"topic": topic, **question.to_dict()}
+                records.write((json.dumps(record) + "\n").encode())
+            records.flush()
+            os.fsync(records.fileno())
+            self.checkpoint.records_size = records.tell()
+        self.checkpoint.done[topic] = len(questions)
+        self.checkpoint.save()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the question bank offline")
+    topics = parser.add_mutually_exclusive_group(required=True)
+    topics.add_argument("--topics", nargs="+", help="topics to generate questions for")
+    topics.add_argument("--topics-file", help="file with one topic per line")
+    topics.add_argument("--generate-topics", type=int, metavar="N",
+                        help="generate N random topics")
+    parser.add_argument("--questions", type=int, default=20,
+                        help="questions per topic (the bank keeps QUESTION_BANK_MAX_PER_TOPIC)")
+    parser.add_argument("--batch-size", type=int, default=10, help="questions per API call")
+    parser.add_argument("--concurrency", type=int, default=4, help="topics generated at a time")
+    parser.add_argument("--explanations", action="store_true",
+                        help="also generate explanations (default: when EXPLANATION_POLICY is batch)")
+    parser.add_argument("--output", help="also write the questions to this .jsonl or .parquet file")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="output format (default: from the file extension)")
+    parser.add_argument("--bank", default=QUESTION_BANK_PATH, help="question bank database")
+    parser.add_argument("--no-bank", action="store_true", help="don't add to the question bank")
+    parser.add_argument("--checkpoint", help="progress file (default: next to the output or bank)")
+    args = parser.parse_args(argv)
+
+    if args.no_bank and not args.output:
+        parser.error("--no-bank needs --output")
+    output_format = args.format or ("parquet" if (args.output or "").endswith(".parquet") else "jsonl")
+    checkpoint_path = args.checkpoint or (args.output or args.bank) + ".checkpoint.json"
+
+    builder = QuestionBankBuilder(
+        checkpoint_path,
+        output=args.output,
+        output_format=output_format,
+        bank=None if args.no_bank else QuestionBank(path=args.bank),
+        num_questions=args.questions,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        explanations=args.explanations or EXPLANATION_POLICY == "batch",
+    )
+    if builder.checkpoint.topics is not None:
+        topics = builder.checkpoint.topics
+        print(f"Resuming: {len(builder.checkpoint.done)}/{len(topics)} topics done")
+    elif args.topics:
+        topics = args.topics
+    elif args.topics_file:
+        with open(args.topics_file) as file:
+            topics = [line.strip() for line in file if line.strip()]
+    else:
+        topics = collect_topics(args.generate_topics)
+
+    summary = builder.build(topics)
+    print(f"topics:    {summary['topics'] - len(summary['failed'])}/{summary['topics']} done")
+    print(f"questions: {summary['questions']} added, {summary['rejected']} invalid ones dropped")
+    for topic, error in summary["failed"].items():
+        print(f"failed:    {topic}: {error}")
+    if summary["failed"]:
+        print("Run the same command again to retry the failed topics.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
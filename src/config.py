@@ -1,13 +1,199 @@
 # Configuration and environment setup
 from dotenv import load_dotenv
 import os
-from groq import Groq
+import threading
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Groq client
-GROQ_CLIENT = Groq(api_key=os.environ["GROQ_API_KEY"])
+_groq_clients = {}
+_groq_client_lock = threading.Lock()
+
+
+# Groq connection pool and request limits
+GROQ_MAX_CONNECTIONS = 20
+GROQ_REQUEST_TIMEOUT = 20.0  # seconds
+GROQ_MAX_RETRIES = 3
+GROQ_RETRY_BACKOFF = 0.5  # seconds, doubled per retry
+GROQ_RETRY_MAX_DELAY = 8.0  # seconds
+
+# Requests per minute per model
+GROQ_RATE_LIMITS = {
+    "llama3-8b-8192": 30,
+    "gemma2-9b-it": 30,
+}
+
+
+def _get_client(asynchronous):
+    """Create a Groq client on first use, importing groq only then"""
+    if asynchronous not in _groq_clients:
+        with _groq_client_lock:
+            if asynchronous not in _groq_clients:
+                import httpx
+                from groq import AsyncGroq, Groq
+                client_class, http_client_class = (
+                    (AsyncGroq, httpx.AsyncClient) if asynchronous else (Groq, httpx.Client)
+                )
+                _groq_clients[asynchronous] = client_class(
+                    api_key=os.environ["GROQ_API_KEY"],
+                    timeout=GROQ_REQUEST_TIMEOUT,
+                    # Retries are handled by services.groq_client
+                    max_retries=0,
+                    http_client=http_client_class(
+                        limits=httpx.Limits(
+                            max_connections=GROQ_MAX_CONNECTIONS,
+                            max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+                        ),
+                        timeout=GROQ_REQUEST_TIMEOUT,
+                    ),
+                )
+    return _groq_clients[asynchronous]
+
+
+def get_groq_client():
+    return _get_client(asynchronous=False)
+
+
+def get_async_groq_client():
+    """
+    The asyncio Groq client. Its connections belong to the event loop of
+    services.groq_service, so it is only used from that loop.
+    """
+    return _get_client(asynchronous=True)
+
+
+class _LazyGroqClient:
+    """Stands in for a Groq client and creates it on first attribute access"""
+
+    def __init__(self, get_client):
+        self._get_client = get_client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+
+# Groq clients, initialized lazily
+GROQ_CLIENT = _LazyGroqClient(get_groq_client)
+GROQ_ASYNC_CLIENT = _LazyGroqClient(get_async_groq_client)
+
+# Question generation: "sequential", "concurrent" or "batched"
+QUESTION_GENERATION_MODE = os.environ.get("QUESTION_GENERATION_MODE", "batched")
+
+# How many parallel rounds are used to replace duplicate questions
+MAX_DEDUP_ROUNDS = 2
+
+# Completion token limits (max_tokens) per kind of Groq call; "topic",
+# "question" and "question_explanation" are per requested topic or question
+MAX_COMPLETION_TOKENS = {
+    "validate_topic": 10,
+    "topic": 16,
+    "question": 200,
+    "question_explanation": 80,
+    "explanation": 400,
+    "short_explanation": 100,
+}
+MAX_TOPIC_TOKENS = 32  # user topics are cut to this length in prompts
+# Dollars per million (prompt, completion) tokens, for cost reports
+GROQ_TOKEN_PRICES = {
+    "llama3-8b-8192": (0.05, 0.08),
+    "gemma2-9b-it": (0.20, 0.20),
+}
+
+# Keys of the questions a player had, so they are not asked again; only
+# the most recent ones are kept (and stored with the session)
+SEEN_QUESTIONS_LIMIT = 1000
+
+# Questions whose stems and correct answers are both at least this similar
+# (Jaccard similarity of character trigrams) are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.5
+
+# How often a question is requested again when the response can't be parsed
+MAX_PARSE_ATTEMPTS = 3
+# Parsed responses kept per process, so a repeated response is parsed once
+QUESTION_PARSE_CACHE_SIZE = 1024
+
+# Question bank (SQLite cache of generated questions per topic)
+QUESTION_BANK_PATH = os.environ.get("QUESTION_BANK_PATH", "question_bank.db")
+QUESTION_BANK_TTL = 7 * 24 * 60 * 60  # seconds
+QUESTION_BANK_MAX_PER_TOPIC = 50
+QUESTION_BANK_MAX_QUESTIONS = 5000
+QUESTION_BANK_LRU_TOPICS = 64
+QUESTION_BANK_REFILL_SIZE = 10
+
+# Background threads that prefetch questions while the wheel spins
+PREFETCH_WORKERS = 4
+
+# Questions per quiz; 0 for an endless quiz that ends when the player stops
+QUIZ_LENGTH = int(os.environ.get("QUIZ_LENGTH", 5))
+# Questions fetched at a time, and kept ready ahead of the current one
+QUESTION_BATCH_SIZE = 5
+QUESTION_LOOKAHEAD = 2
+# Answered questions kept (and shown) per quiz; older ones only count
+# towards the score, so long quizzes don't grow the session
+QUIZ_HISTORY_SIZE = 10
+
+# Seconds between refreshes of the elapsed time while a quiz is running
+TIMER_REFRESH_INTERVAL = 1.0
+
+# Wheel animation: "client" (CSS animation in the browser) or "frames"
+WHEEL_ANIMATION_MODE = os.environ.get("WHEEL_ANIMATION_MODE", "client")
+WHEEL_SPIN_DURATION = 3  # seconds
+
+# Process-wide pool of wheel topics, refilled in the background
+TOPIC_POOL_MIN_SIZE = 60  # refill when fewer topics are left
+TOPIC_POOL_REFILL_SIZE = 40
+TOPIC_POOL_PATH = os.environ.get("TOPIC_POOL_PATH")  # optional JSON file
+
+# Topics handed out while the pool is still empty
+DEFAULT_TOPICS = [
+    "Ancient Egypt", "World War II", "The Roman Empire", "Space Exploration",
+    "Python Programming", "Greek Mythology", "The Renaissance", "Famous Inventors",
+    "Dinosaurs", "The Olympic Games", "Classical Music", "World Geography",
+    "The Human Body", "Famous Painters", "The Cold War", "Ocean Life",
+    "Medieval Europe", "The Solar System", "Football", "Nobel Prize Winners",
+    "Chemistry", "Movies of the 90s", "The French Revolution", "Volcanoes",
+    "Famous Explorers", "Ancient China", "Computer History", "World Religions",
+    "The Industrial Revolution", "Mathematics",
+]
+
+# Cache of custom topic validation verdicts
+TOPIC_VERDICT_CACHE_SIZE = 10000
+TOPIC_VERDICT_TTL = 24 * 60 * 60  # seconds
+# Background threads asking the API about custom topics, and seconds
+# between checks of the script thread for their verdict
+TOPIC_VALIDATION_WORKERS = 4
+TOPIC_CHECK_INTERVAL = 0.5
+
+# Background threads that stream explanations for wrong answers
+EXPLANATION_WORKERS = 4
+EXPLANATION_REFRESH_INTERVAL = 0.5  # seconds
+
+# When short explanations are generated for all questions of a quiz:
+# "lazy" (only after a wrong answer), "batch" (in the same request as the
+# questions) or "background" (in a low-priority queue after generation)
+EXPLANATION_POLICY = os.environ.get("EXPLANATION_POLICY", "lazy")
+
+# Where sessions are stored so that games survive restarts and can move
+# between app processes: "memory" (this process only, e.g. page reloads),
+# "sqlite" (processes of one machine) or "redis" (any machine)
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", "sessions.db")
+SESSION_STORE_URL = os.environ.get("SESSION_STORE_URL", "redis://localhost:6379/0")
+SESSION_STORE_MAX_SESSIONS = 10000  # memory store only
+SESSION_TTL = 24 * 60 * 60  # seconds without changes before a session expires
+
+# Metrics: serve them for Prometheus on this port (e.g. 9464) and/or show
+# them in a debug panel in the sidebar (METRICS_DEBUG_PANEL=1)
+METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+METRICS_DEBUG_PANEL = os.environ.get("METRICS_DEBUG_PANEL") == "1"
+
+# Where sounds are played: "browser" (on the player's device), "pygame"
+# (on the machine running the app) or "none"
+AUDIO_BACKEND = os.environ.get("AUDIO_BACKEND", "browser")
+# Optional URL template of the sound files, e.g. "app/static/audio/{file}"
+# with Streamlit's static file serving; without it sounds are sent inline
+AUDIO_ASSET_URL = os.environ.get("AUDIO_ASSET_URL")
+AUDIO_CHANNELS = 8  # sounds the pygame backend can play at the same time
 
 # Audio file paths
 AUDIO_PATHS = {
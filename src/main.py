@@ -1,41 +1,87 @@
 # Main Streamlit app
 import streamlit as st
-import re
 import time
 from models.session import SessionState
 from utils.validators import get_valid_custom_topic
 from utils.spinning_wheel import SpinningWheel
+from utils.timer import render_elapsed_time
+from utils.wheel_outcome import segment_at
 from services.audio_service import audio
-from services.groq_service import check_answer, get_explanation
-
-
+from models.question import OPTION_LABELS
+from config import EXPLANATION_REFRESH_INTERVAL, METRICS_DEBUG_PANEL, METRICS_PORT
+from services.explanation_stream import ExplanationStream, start_explanation
+from services.groq_service import check_answer
+from services.metrics import metrics
+from services.token_budget import charge_to, current_account, record_quiz
+
+
+def finished_explanation(explanations, idx):
+    """The text of an explanation, stored in place of its finished stream"""
+    explanation = explanations[idx]
+    if isinstance(explanation, ExplanationStream):
+        text = explanation.text
+        if explanation.error:
+            text = "The explanation could not be loaded."
+        explanation = explanations[idx] = text
+    return explanation
+
+
+@st.fragment(run_every=EXPLANATION_REFRESH_INTERVAL)
+def render_explanation_stream(explanations, idx):
+    """
+    Show an explanation while it streams in. Once it is complete the app
+    is rerun, which shows it without this fragment, so that the fragment
+    stops refreshing.
+    """
+    explanation = explanations[idx]
+    if not isinstance(explanation, ExplanationStream):
+        st.write(explanation)
+    elif not explanation.done:
+        st.write(explanation.text + " ▌")
+    else:
+        finished_explanation(explanations, idx)
+        st.rerun()
+
+
+def render_metrics_panel():
+    """Debug panel with the metrics of this process and the Groq usage of this game"""
+    with st.sidebar.expander("Metrics"):
+        st.table(metrics.summary())
+    account = current_account()
+    if account is not None:
+        with st.sidebar.expander("Groq usage of this game"):
+            st.table(account.report())
+
+
+@metrics.timed("app_rerun_duration_seconds")
 def main():
     st.set_page_config(page_title="Quiz Game")
     st.title("📚 Quiz Game")
 
-    # Initialize session state variables
-    SessionState.initialize()
+    # Initialize the game of this session
+    quiz = SessionState.initialize()
+    # Charge the Groq calls of this run, also in the background, to the game
+    charge_to(quiz.tokens)
 
-    if not st.session_state.running:
-        if st.session_state.custom_topic:
-            st.session_state.topic = get_valid_custom_topic()
-        if st.session_state.topic:
-            st.success(f"The chosen topic is {st.session_state.topic}")
+    if not quiz.running:
+        if quiz.custom_topic:
+            quiz.topic = get_valid_custom_topic(
+                on_topic=lambda topic: SessionState.prefetch(topic, validate=True)
+            )
+        if quiz.topic:
+            st.success(f"The chosen topic is {quiz.topic}")
             if st.button("Start the quiz"):
                 audio.play_sound('play')
 
-                st.session_state.running = True
+                quiz.running = True
                 st.rerun()
-        elif not st.session_state.custom_topic:
+        elif not quiz.custom_topic:
             st.subheader("Spin the wheel to get a random topic for a quiz!")
             # Initialize the spinning wheel
             wheel = SpinningWheel()
 
             # Initialize the wheel and get the frames
-            frames, final_angle = wheel.initialize_wheel(
-                st.session_state.topics,
-                st.session_state.num_topics
-            )
+            frames, final_angle = wheel.initialize_wheel(quiz.topics, quiz.num_topics)
 
             # Create three columns
             col1, col2, col3 = st.columns([2, 1.2, 1])
@@ -45,86 +91,76 @@ def main():
                 st.write('or')
             with col3:
                 if st.button("🔒 Custom topic"):
-                    st.session_state.custom_topic = True
+                    quiz.custom_topic = True
                     st.rerun()
             with col1:
                 # Streamlit button to trigger animation
                 if st.button("Determine the quiz topic"):
                     audio.play_sound('spin')
 
+                    topic = quiz.topics[segment_at(final_angle, quiz.num_topics)]
+
+                    # Generate the questions while the wheel spins
+                    SessionState.prefetch(topic)
+
                     # Simulate frame updates for animation
                     wheel.animate_spin(frames)
 
-                    st.session_state.topic = st.session_state.topics[
-                        st.session_state.num_topics
-                        - 1
-                        - (final_angle % 360) // (360 // st.session_state.num_topics)
-                    ]
+                    quiz.topic = topic
                     st.rerun()
     else:  # Quiz based on chosen topic
         SessionState.start_game()
 
-        questions = st.session_state.questions
+        # The next question is usually fetched while the previous one was answered
+        current_question = SessionState.current_question()
 
         st.write(
             "Welcome to the Quiz Game! Answer the following multiple-choice questions:"
         )
 
-        # Display all previously answered questions
-        for idx in range(st.session_state.current_question_idx):
-            question = questions[idx]
-            user_answer = st.session_state.user_answers[idx]
-            correctness = st.session_state.correctness[idx]
+        # Display the previously answered questions that are kept
+        if quiz.offset:
+            st.caption(f"{quiz.offset} earlier questions are not shown.")
+        for idx in quiz.history:
+            question = quiz.question(idx)
+            user_answer = quiz.user_answer(idx)
+            correct = quiz.is_correct(idx)
 
-            if correctness == "Correct":
+            if correct:
                 answer_text = f":green[{user_answer}]"
-                correctness_text = f":green[{correctness}]"
+                correctness_text = ":green[Correct]"
             else:
                 answer_text = f":red[{user_answer}]"
-                correctness_text = f":orange[{correctness}]"
+                correctness_text = f":orange[{question.correct}]"
 
             st.markdown(f"**Question {idx + 1}:** {question}")
             st.markdown(
                 f"Your answer: **{answer_text}**, Correct answer: **{correctness_text}**"
             )
 
-            if correctness != "Correct":
+            if not correct:
                 # Use an expander to show explanations when available
-                if idx in st.session_state.explanations:
+                if idx in quiz.explanations:
                     with st.expander(f"Explanation for Question {idx + 1}"):
-                        st.write(st.session_state.explanations[idx])
+                        explanation = quiz.explanations[idx]
+                        if isinstance(explanation, ExplanationStream) and not explanation.done:
+                            render_explanation_stream(quiz.explanations, idx)
+                        else:
+                            st.write(finished_explanation(quiz.explanations, idx))
 
         # Display the current question
-        if st.session_state.current_question_idx < len(questions):
-            current_idx = st.session_state.current_question_idx
-            current_question = questions[current_idx]
+        if current_question and not quiz.finished:
+            current_idx = quiz.current_question_idx
 
-            st.markdown(f"**Question {current_idx + 1}:** {current_question}")
+            st.markdown(f"**Question {current_idx + 1}:** {current_question.stem}")
 
-            # Extract options from the question text
-            options = re.findall(r"[A-D]\)\s.*", current_question)
-            if not options:
-                st.error(
-                    "Error parsing the question options. Please check the question format."
-                )
-                st.stop()
-
-            options = [opt.split(")", 1)[1].strip() for opt in options]
-            options = [opt for opt in options if opt]  # Remove empty strings
-
-            # Ensure there are exactly 4 options
-            if len(options) != 4:
-                st.error("Each question must have exactly four options (A, B, C, D).")
-                st.stop()
-
-            # Map options back to their labels
-            option_labels = ["A", "B", "C", "D"]
-            option_dict = dict(zip(option_labels, options))
+            # The options were parsed when the question was generated
+            option_dict = current_question.options
 
             # Radio button for selecting an answer
             selected_option = st.radio(
                 "Choose your answer:",
-                options=option_labels,
+                options=OPTION_LABELS,
                 index=None,
                 format_func=lambda x: f"{x}) {option_dict[x]}",
             )
@@ -135,41 +171,43 @@ def main():
                 else:
                     audio.play_sound('submit')
 
-                    # Record the user's answer
-                    st.session_state.user_answers.append(selected_option)
-
                     # Check if the answer is correct
                     correct, correct_answer = check_answer(
                         current_question, selected_option
                     )
-                    if correct:
-                        st.session_state.correctness.append("Correct")
-                    else:
-                        st.session_state.correctness.append(correct_answer)
-                        if current_idx not in st.session_state.explanations:
-                            # Fetch explanation
-                            explanation = get_explanation(
-                                questions[current_idx], correct_answer
-                            )
-                            st.session_state.explanations[current_idx] = explanation
-
-                    # Move to the next question
-                    st.session_state.current_question_idx += 1
+                    if not correct and current_idx not in quiz.explanations:
+                        # Use the generated explanation or stream one in the background
+                        explanation = current_question.explanation or start_explanation(
+                            current_question, correct_answer
+                        )
+                        quiz.explanations[current_idx] = explanation
+
+                    # Record the answer, which moves to the next question
+                    quiz.record_answer(selected_option, correct)
                     st.rerun()
 
-            if selected_option and (not st.session_state.is_sound_played[
-                current_idx - 1] or selected_option != st.session_state.selected_options):
-                st.session_state.is_sound_played[current_idx - 1] = True
-                st.session_state.selected_options = selected_option
+            # An endless quiz goes on until the player stops it
+            if not quiz.length and st.button("Finish quiz"):
+                quiz.ended = True
+                st.rerun()
+
+            if selected_option and (quiz.option_sound_idx != current_idx
+                                    or selected_option != quiz.selected_option):
+                quiz.option_sound_idx = current_idx
+                quiz.selected_option = selected_option
                 audio.play_sound('option')
 
         # After all questions are answered
-        if st.session_state.current_question_idx == len(questions):
-            st.session_state.elapsed_time = time.time() - st.session_state.start_time
-            audio.play_sound('end_game')
+        if quiz.finished:
+            if not quiz.elapsed_time:
+                # First run of the game over screen; it is shown until Play Again
+                quiz.elapsed_time = time.time() - quiz.start_time
+                quiz.cancel_fetching()
+                record_quiz(quiz.tokens)
+                audio.play_sound('end_game')
             st.markdown("### 🎉 Game Over!")
-            correct_count = st.session_state.correctness.count("Correct")
-            total_questions = len(questions)
+            correct_count = quiz.correct_count
+            total_questions = quiz.current_question_idx
             accuracy = (
                 (correct_count / total_questions) * 100 if total_questions > 0 else 0
             )
@@ -177,17 +215,22 @@ def main():
             st.markdown(
                 f"**Your accuracy:** {correct_count}/{total_questions} ({accuracy:.2f}%)"
             )
-            st.markdown(f"**Total time: {st.session_state.elapsed_time:.1f} seconds**")
+            st.markdown(f"**Total time: {quiz.elapsed_time:.1f} seconds**")
             st.markdown("**Thank you for playing!**")
-            SessionState.reset()
             if st.button("Play Again"):
+                SessionState.reset()
                 st.rerun()
-        elif st.session_state.running:
-            st.session_state.elapsed_time = time.time() - st.session_state.start_time
-            st.write(f"Elapsed time: {st.session_state.elapsed_time:.1f} seconds")
-            time.sleep(0.1)
-            st.rerun()
+        elif quiz.running:
+            render_elapsed_time(quiz.start_time)
 
 
 if __name__ == "__main__":
-    main()
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    try:
+        main()
+    finally:
+        # Also after st.rerun(), which ends the run with an exception
+        SessionState.sync()
+    if METRICS_DEBUG_PANEL:
+        render_metrics_panel()
@@ -0,0 +1,117 @@
+# Structured multiple-choice question
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+from models.question_parser import (
+    FOUR_OPTIONS_MESSAGE,
+    NO_ANSWER_MESSAGE,
+    NO_TEXT_MESSAGE,
+    OPTION_LABELS,
+    parse_question,
+    resolve_answer,
+)
+
+NUMBERING_PATTERN = re.compile(r"^\W*\d+[.)]\s*")
+WORD_PATTERN = re.compile(r"\w+")
+
+# One shared instance per distinct question for as long as it is in use
+_interned = weakref.WeakValueDictionary()
+_intern_lock = threading.Lock()
+
+
+@dataclass
+class Question:
+    stem: str
+    options: dict
+    correct: str
+    explanation: Optional[str] = None
+
+    @property
+    def key(self):
+        """
+        The stem without numbering, casing and punctuation, used to detect
+        duplicate questions. The whole stem is used, since questions sharing
+        their first line, e.g. a preamble, can still differ.
+        """
+        stem = NUMBERING_PATTERN.sub("", self.stem.strip())
+        return " ".join(WORD_PATTERN.findall(stem.lower()))
+
+    @property
+    def text(self):
+        """The question with its options, as shown to the user"""
+        lines = [self.stem]
+        lines += [f"{label}) {self.options[label]}" for label in OPTION_LABELS]
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.text
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a question generated by the LLM, see parse_question for the
+        accepted formats. Raises ValueError if the text is not a question.
+        """
+        stem, options, correct, explanation = parse_question(text)
+        return cls(stem=stem, options=dict(options), correct=correct, explanation=explanation)
+
+    def validate(self):
+        """
+        Check the format that parse requires: text, exactly four non-empty
+        options A-D and a correct answer among them. Raises ValueError.
+        """
+        if tuple(sorted(self.options)) != OPTION_LABELS or not all(
+            isinstance(option, str) and option.strip() for option in self.options.values()
+        ):
+            raise ValueError(FOUR_OPTIONS_MESSAGE)
+        if self.correct not in OPTION_LABELS:
+            raise ValueError(NO_ANSWER_MESSAGE)
+        if not self.stem.strip():
+            raise ValueError(NO_TEXT_MESSAGE)
+
+    def to_dict(self):
+        """The structured representation accepted by from_dict"""
+        return {
+            "question": self.stem,
+            "options": dict(self.options),
+            "answer": self.correct,
+            "explanation": self.explanation,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a question from a structured (JSON) response of the form
+        {"question": ..., "options": {"A": ..., ...}, "answer": "A", "explanation": ...}
+        Raises ValueError if a field is missing or invalid.
+        """
+        try:
+            stem = str(data["question"]).strip()
+            options = {label: str(data["options"][label]).strip() for label in OPTION_LABELS}
+            correct = resolve_answer(str(data["answer"]), options.items())
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid question data: {e}")
+
+        if not stem or not all(options.values()) or correct is None:
+            raise ValueError("Invalid question data.")
+
+        explanation = data.get("explanation")
+        return cls(
+            stem=stem,
+            options=options,
+            correct=correct,
+            explanation=str(explanation).strip() if explanation else None,
+        )
+
+
+def intern_question(question):
+    """
+    Returns the shared instance of an equal question, registering this one
+    if there is none, so that sessions playing the same question reference
+    one object instead of each holding a copy
+    """
+    key = (question.text, question.correct)
+    with _intern_lock:
+        return _interned.setdefault(key, question)
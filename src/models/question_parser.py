@@ -0,0 +1,165 @@
+# Parser of the questions generated by the LLM
+import re
+from functools import lru_cache
+from config import QUESTION_PARSE_CACHE_SIZE
+
+OPTION_LABELS = ("A", "B", "C", "D")
+
+FOUR_OPTIONS_MESSAGE = "Each question must have exactly four options (A, B, C, D)."
+NO_ANSWER_MESSAGE = "The question does not specify the correct answer."
+NO_TEXT_MESSAGE = "The question has no text."
+
+# An option on its own line: an optional list bullet, then the label as
+# A) A. A: (A) or [A], optionally in bold, then the text of the option
+OPTION_PATTERN = re.compile(
+    r"""
+    ^[ \t]*(?:[-*+•][ \t]+)?(?:\*\*|__)?
+    (?:\(([A-D])\)|\[([A-D])\]|([A-D])[).:])
+    (?:\*\*|__)?[ \t]+(\S.*?)[ \t]*$
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+# Options written on one line, like "A) 3 B) 4 C) 5 D) 6"
+INLINE_OPTION_PATTERN = re.compile(
+    r"(?<!\S)\(?([A-D])\)[ \t]+(\S.*?)(?=[ \t]+\(?[A-D]\)[ \t]|[ \t]*$)", re.MULTILINE
+)
+# The answer line, "Answer: B", "**Correct answer:** (B)", "The correct
+# option is B) ..." or "Answer: Paris"; the group is what follows the colon
+ANSWER_PATTERN = re.compile(
+    r"""
+    ^[ \t]*(?:[-*+•][ \t]+)?[*_]*[ \t]*
+    (?i:(?:the[ \t]+)?(?:correct[ \t]+)?(?:answer|option)(?:[ \t]+is)?)
+    [ \t]*[*_]*[ \t]*[:\-]?[ \t]*(.+?)[ \t]*$
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+# A bare label, only when nothing can be taken for the start of an answer
+# text: "B", "(B)", "[B]", "B)", "B:", "B." or "B. <text of option B>"
+ANSWER_LABEL_PATTERN = re.compile(r"^[(\[]?([A-Da-d])(?:[)\]:].*|\.?|\.[ \t]+(.+))$")
+EXPLANATION_PATTERN = re.compile(
+    r"^[ \t]*(?:[-*+•][ \t]+)?[*_]*[ \t]*explanation[ \t]*[*_]*[ \t]*:[*_ \t]*(.+)",
+    re.MULTILINE | re.IGNORECASE | re.DOTALL,
+)
+# "Question:" or "**Question 3:**" in front of the stem
+QUESTION_LABEL_PATTERN = re.compile(
+    r"^[*_ \t]*question[ \t]*(?:\d+[ \t]*[:.)]|:)[*_ \t]*", re.IGNORECASE
+)
+# A line introducing the question rather than asking it, like "Here is a
+# multiple choice question about History:" or "Sure! Here's one:"
+PREAMBLE_PATTERN = re.compile(
+    r"^[*_ \t]*(?:sure|okay|ok|certainly|of course|absolutely|here(?:'s|\s+is|\s+are)|below\s+is)\b",
+    re.IGNORECASE,
+)
+# Words without underscores, which are mostly markdown emphasis
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def _strip_emphasis(text):
+    """Remove bold markers around a text, or a dangling closing one"""
+    text = text.strip()
+    for marker in ("**", "__"):
+        if text.startswith(marker) and text.endswith(marker) and len(text) > 4:
+            text = text[2:-2].strip()
+        elif text.endswith(marker) and text.count(marker) % 2:
+            text = text[:-2].rstrip()
+    return text
+
+
+def _find_options(text):
+    """
+    The matches of the options A to D: the first run of option lines
+    labelled A, B, C, D in this order, so that a stem starting with e.g.
+    "A. Lincoln" is not taken for an option. Falls back to options written
+    on a single line. Returns None if there are no four options.
+    """
+    matches = list(OPTION_PATTERN.finditer(text))
+    labels = [next(filter(None, match.group(1, 2, 3))) for match in matches]
+    for start in range(len(matches) - len(OPTION_LABELS) + 1):
+        if tuple(labels[start:start + len(OPTION_LABELS)]) == OPTION_LABELS:
+            return [
+                (label, match.group(4), match.start())
+                for label, match in zip(OPTION_LABELS, matches[start:])
+            ]
+
+    matches = list(INLINE_OPTION_PATTERN.finditer(text))
+    for start in range(len(matches) - len(OPTION_LABELS) + 1):
+        window = matches[start:start + len(OPTION_LABELS)]
+        if tuple(match.group(1) for match in window) == OPTION_LABELS:
+            return [(match.group(1), match.group(2), match.start()) for match in window]
+    return None
+
+
+def _strip_preamble(text):
+    """Remove the lines introducing the question in front of its stem"""
+    lines = text.strip().split("\n")
+    while len(lines) > 1 and (not lines[0].strip() or PREAMBLE_PATTERN.match(lines[0])):
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _normalize(text):
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+def resolve_answer(answer, options):
+    """
+    The label of the option that an answer names, or None. An answer that
+    is the text of exactly one option names that option, so that e.g.
+    "C. S. Lewis" or "D-Day" are not taken for the labels C and D. Otherwise
+    the answer must be a bare label, see ANSWER_LABEL_PATTERN.
+    options are (label, text) pairs.
+    """
+    answer = answer.strip().strip("*_ \t")
+    normalized = _normalize(answer)
+    labels = [label for label, option in options if _normalize(option) == normalized]
+    if normalized and len(labels) == 1:
+        return labels[0]
+
+    match = ANSWER_LABEL_PATTERN.match(answer)
+    if not match:
+        return None
+    label = match.group(1).upper()
+    if match.group(2) is not None:
+        # "B. <text>" only if the text is the one of option B
+        if _normalize(match.group(2)) != _normalize(dict(options).get(label, "")):
+            return None
+    return label
+
+
+def _find_answer(text, options):
+    """The label of the correct answer, from the first answer line naming one"""
+    for match in ANSWER_PATTERN.finditer(text):
+        label = resolve_answer(match.group(1), options)
+        if label is not None:
+            return label
+    return None
+
+
+@lru_cache(maxsize=QUESTION_PARSE_CACHE_SIZE)
+def parse_question(text):
+    """
+    Parse a question generated by the LLM into
+    (stem, ((label, option), ...), correct label, explanation or None).
+    Accepts the common ways of writing options (A), A., (A), bullets, bold)
+    and answers, and drops a preamble like "Here is a question:". Results are cached, so a repeated response is parsed once.
+    Raises ValueError if the text is not a complete question.
+    """
+    found = _find_options(text)
+    if found is None:
+        raise ValueError(FOUR_OPTIONS_MESSAGE)
+    options = tuple((label, _strip_emphasis(option)) for label, option, _ in found)
+    if not all(option for _, option in options):
+        raise ValueError(FOUR_OPTIONS_MESSAGE)
+
+    correct = _find_answer(text[found[0][2]:], options)
+    if correct is None:
+        raise ValueError(NO_ANSWER_MESSAGE)
+
+    stem = QUESTION_LABEL_PATTERN.sub("", _strip_preamble(text[:found[0][2]]))
+    stem = _strip_emphasis(stem)
+    if not stem:
+        raise ValueError(NO_TEXT_MESSAGE)
+
+    explanation = EXPLANATION_PATTERN.search(text, found[0][2])
+    explanation = explanation.group(1).strip() if explanation else None
+    return stem, options, correct, explanation or None
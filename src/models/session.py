@@ -1,47 +1,293 @@
 # Session state management
 import streamlit as st
+import json
 import random
 import time
-from services.groq_service import generate_questions, generate_topics
+import uuid
+from array import array
+from dataclasses import dataclass, field
+from typing import Optional
+from config import EXPLANATION_POLICY, QUESTION_BATCH_SIZE, QUIZ_HISTORY_SIZE, QUIZ_LENGTH
+from models.question import OPTION_LABELS, Question, intern_question
+from services.cancellation import CancelScope
+from services.explanation_stream import pregenerate_explanations
+from services.prefetch import QuestionFeed, prefetch_questions
+from services.session_store import session_store
+from services.token_budget import TokenAccount
+from services.topic_pool import topic_pool
+from utils.dedup import RecentKeys
+
+# Wheel properties
+NUM_SEGMENTS = [3, 4, 5, 6, 8, 9, 10, 12, 15, 18, 20, 24, 30]
+
+# Scalar QuizSession fields, stored together in the "meta" field
+META_FIELDS = (
+    "num_topics", "running", "topic", "custom_topic", "length", "offset",
+    "dropped_correct", "ended", "selected_option", "option_sound_idx",
+    "start_time", "elapsed_time",
+)
+
+# URL query parameter that identifies a session across reloads and processes
+SESSION_PARAM = "session"
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+@dataclass(slots=True)
+class QuizSession:
+    """
+    Everything about the current game of one player. Answers and their
+    correctness are kept as one byte per answered question, and questions
+    are shared instances (see intern_question) rather than copies.
+
+    Only the last QUIZ_HISTORY_SIZE answered questions are kept, plus the
+    current one; `offset` is the number of questions dropped before them.
+    Question indices are always counted from the start of the quiz.
+    """
+    num_topics: int
+    topics: tuple
+    running: bool = False
+    topic: Optional[str] = None
+    custom_topic: bool = False
+    length: int = QUIZ_LENGTH  # 0 for an endless quiz
+    offset: int = 0
+    dropped_correct: int = 0  # correct answers among the dropped questions
+    ended: bool = False  # stopped by the player, or out of questions
+    questions: tuple = ()
+    answers: array = field(default_factory=lambda: array("B"))  # index into OPTION_LABELS
+    correctness: array = field(default_factory=lambda: array("B"))  # 1 if correct
+    explanations: dict = field(default_factory=dict)  # question index -> explanation
+    selected_option: Optional[str] = None
+    option_sound_idx: int = -1  # question the option sound was last played for
+    start_time: float = 0.0
+    elapsed_time: float = 0.0
+    tokens: TokenAccount = field(default_factory=TokenAccount)  # Groq usage of this game
+    prefetch: Optional[tuple] = None  # (topic, Future, CancelScope)
+    feed: Optional[QuestionFeed] = None
+
+    @property
+    def current_question_idx(self):
+        return self.offset + len(self.answers)
+
+    @property
+    def current_question(self):
+        """The question being answered, if it has been fetched"""
+        if len(self.questions) > len(self.answers):
+            return self.questions[len(self.answers)]
+        return None
+
+    @property
+    def remaining(self):
+        """Questions still to be fetched, None for an endless quiz"""
+        if not self.length:
+            return None
+        return max(0, self.length - self.offset - len(self.questions))
+
+    @property
+    def finished(self):
+        return self.ended or bool(self.length) and self.current_question_idx >= self.length
+
+    @property
+    def history(self):
+        """Indices of the answered questions that are kept"""
+        return range(self.offset, self.current_question_idx)
+
+    def question(self, idx):
+        return self.questions[idx - self.offset]
+
+    def cancel_fetching(self):
+        """Stop generating questions for this game, e.g. when it is left"""
+        if self.prefetch:
+            self.prefetch[2].cancel()
+            self.prefetch = None
+        if self.feed:
+            self.feed.close()
+
+    def add_question(self, question):
+        self.questions += (question,)
+
+    def record_answer(self, option, correct):
+        """Store the answer to the current question, dropping the oldest ones"""
+        self.answers.append(OPTION_LABELS.index(option))
+        self.correctness.append(1 if correct else 0)
+        while len(self.answers) > QUIZ_HISTORY_SIZE:
+            self.explanations.pop(self.offset, None)
+            self.dropped_correct += self.correctness.pop(0)
+            self.answers.pop(0)
+            self.questions = self.questions[1:]
+            self.offset += 1
+
+    def user_answer(self, idx):
+        return OPTION_LABELS[self.answers[idx - self.offset]]
+
+    def is_correct(self, idx):
+        return bool(self.correctness[idx - self.offset])
+
+    @property
+    def correct_count(self):
+        return self.dropped_correct + sum(self.correctness)
+
+    def to_fields(self):
+        """
+        Compact representation for a session store: a few named byte
+        strings, so that e.g. answering a question doesn't rewrite the
+        questions. Explanations that are still streaming are left out.
+        """
+        return {
+            "meta": _dumps({name: getattr(self, name) for name in META_FIELDS}),
+            "topics": _dumps(self.topics),
+            "questions": _dumps([question.to_dict() for question in self.questions]),
+            "answers": self.answers.tobytes(),
+            "correctness": self.correctness.tobytes(),
+            "explanations": _dumps({
+                idx: text for idx, text in self.explanations.items() if isinstance(text, str)
+            }),
+            "tokens": _dumps(self.tokens.to_dict()),
+        }
+
+    @classmethod
+    def from_fields(cls, fields):
+        """Rebuild a session from the fields of to_fields"""
+        quiz = cls(topics=tuple(json.loads(fields["topics"])), **json.loads(fields["meta"]))
+        quiz.questions = tuple(
+            intern_question(Question.from_dict(data)) for data in json.loads(fields["questions"])
+        )
+        quiz.answers.frombytes(fields["answers"])
+        quiz.correctness.frombytes(fields["correctness"])
+        quiz.explanations = {
+            int(idx): text for idx, text in json.loads(fields["explanations"]).items()
+        }
+        quiz.tokens = TokenAccount.from_dict(json.loads(fields.get("tokens", b"{}")))
+        return quiz
+
 
 class SessionState:
+    @staticmethod
+    def session_id():
+        """
+        Identifier of the player, kept in the URL so that a reload or a
+        reconnection to another app process finds the stored session
+        """
+        session_id = st.query_params.get(SESSION_PARAM)
+        if not session_id:
+            session_id = st.query_params[SESSION_PARAM] = uuid.uuid4().hex
+        return session_id
+
     @staticmethod
     def initialize():
-        """Initialize all session state variables"""
-        if "running" not in st.session_state:
-            st.session_state.running = False
-        if "topic" not in st.session_state:
-            st.session_state.topic = None
-        if "num_topics" not in st.session_state:
-            # Wheel properties
-            num_segments = [3, 4, 5, 6, 8, 9, 10, 12, 15, 18, 20, 24, 30]
-            st.session_state.num_topics = random.choice(num_segments)
-        if "topics" not in st.session_state:
-            st.session_state.topics = generate_topics(st.session_state.num_topics)
-        if "custom_topic" not in st.session_state:
-            st.session_state.custom_topic = False
-        if "current_question_idx" not in st.session_state:
-            st.session_state.current_question_idx = 0
-        if "user_answers" not in st.session_state:
-            st.session_state.user_answers = []
-        if "correctness" not in st.session_state:
-            st.session_state.correctness = []
-        if "explanations" not in st.session_state:
-            st.session_state.explanations = {}
-        if "is_sound_played" not in st.session_state:
-            st.session_state.is_sound_played = [False] * 5
-        if "selected_options" not in st.session_state:
-            st.session_state.selected_options = [None] * 5
+        """Initialize the game of this session, restoring a stored one if any"""
+        if "quiz" not in st.session_state:
+            quiz = SessionState._restore()
+            if quiz is None:
+                num_topics = random.choice(NUM_SEGMENTS)
+                quiz = QuizSession(
+                    num_topics=num_topics,
+                    topics=tuple(topic_pool.take(num_topics)),
+                )
+            st.session_state.quiz = quiz
+        return st.session_state.quiz
 
+    @staticmethod
+    def _restore():
+        """Load the stored session, if this process doesn't know it yet"""
+        if "synced" in st.session_state:
+            return None
+        try:
+            fields = session_store.load(SessionState.session_id())
+        except Exception:
+            # A new game is started if the store can't be reached
+            fields = {}
+        st.session_state.synced = {name: hash(value) for name, value in fields.items()}
+        if "seen" in fields:
+            st.session_state.seen_questions = RecentKeys(json.loads(fields["seen"]))
+        try:
+            return QuizSession.from_fields(fields) if "meta" in fields else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def sync():
+        """Write the fields of the session that changed since the last sync"""
+        quiz = st.session_state.get("quiz")
+        fields = quiz.to_fields() if quiz else {}
+        fields["seen"] = _dumps(list(st.session_state.get("seen_questions", ())))
+
+        synced = st.session_state.setdefault("synced", {})
+        changed = {name: value for name, value in fields.items() if synced.get(name) != hash(value)}
+        removed = [name for name in synced if name not in fields]
+        if not changed and not removed:
+            return
+        try:
+            session_store.save(SessionState.session_id(), changed, removed)
+        except Exception:
+            # The game goes on in this process; the next run tries again
+            return
+        for name in removed:
+            del synced[name]
+        synced.update((name, hash(value)) for name, value in changed.items())
+
+    @staticmethod
+    def prefetch(topic, validate=False):
+        """Start generating the first questions for a topic in the background"""
+        quiz = st.session_state.quiz
+        if quiz.prefetch and quiz.prefetch[0] == topic:
+            return
+        # The questions of a topic the player moved away from are not needed
+        quiz.cancel_fetching()
+        seen = st.session_state.setdefault("seen_questions", RecentKeys())
+        num_questions = min(QUESTION_BATCH_SIZE, quiz.length or QUESTION_BATCH_SIZE)
+        scope = CancelScope()
+        future = prefetch_questions(topic, seen, validate, num_questions, scope)
+        quiz.prefetch = (topic, future, scope)
 
     @staticmethod
     def start_game():
-        if "questions" not in st.session_state:
-            st.session_state.questions = generate_questions(st.session_state.topic)
-            st.session_state.start_time = time.time()
+        """Start feeding questions, and the timer, when the quiz begins"""
+        quiz = st.session_state.quiz
+        if quiz.feed is None:
+            seen = st.session_state.setdefault("seen_questions", RecentKeys())
+            questions = ()
+
+            # Use the questions prefetched for this topic, if any
+            pending, quiz.prefetch = quiz.prefetch, None
+            if pending and pending[0] == quiz.topic:
+                try:
+                    questions = pending[1].result() or ()
+                except Exception:
+                    questions = ()
+            elif pending:
+                pending[2].cancel()
+
+            quiz.feed = QuestionFeed(quiz.topic, seen, questions, limit=quiz.remaining)
+            if not quiz.start_time:
+                quiz.start_time = time.time()
+
+    @staticmethod
+    def current_question():
+        """
+        The question to answer now, taking the next one from the feed once
+        the previous one is answered. Ends the quiz when none are left.
+        """
+        quiz = st.session_state.quiz
+        if quiz.current_question is None and not quiz.finished:
+            question = quiz.feed.take()
+            if question is None:
+                quiz.ended = True
+                return None
+            question = intern_question(question)
+            quiz.add_question(question)
+            if EXPLANATION_POLICY != "lazy":
+                pregenerate_explanations([question])
+        return quiz.current_question
 
     @staticmethod
     def reset():
-        """Reset session state for a new game"""
-        for key in st.session_state.keys():
-            del st.session_state[key]
\ No newline at end of file
+        """
+        Start a new game on the next run, remembering the questions already
+        seen. Questions still being generated for this game are cancelled.
+        """
+        quiz = st.session_state.pop("quiz", None)
+        if quiz is not None:
+            quiz.cancel_fetching()
@@ -0,0 +1,370 @@
+# Groq API related functions, for asyncio code
+import asyncio
+import json
+from config import MAX_DEDUP_ROUNDS, MAX_PARSE_ATTEMPTS, MAX_TOPIC_TOKENS
+from models.question import Question
+from services.groq_client import groq_client, record_usage
+from services.metrics import metrics
+from services.token_budget import (
+    completion_budget,
+    estimate_prompt_tokens,
+    record_call,
+    truncate,
+)
+from utils.dedup import DuplicateFilter
+
+INVALID_TOPIC_MESSAGE = "Please enter a real topic."
+
+
+class UnparseableQuestionError(ValueError):
+    """The API kept answering with text that is not a question"""
+
+
+# Prompt parts asking for a short explanation along with a question
+SHORT_EXPLANATION_LINE = (
+    "Finally add a line 'Explanation: ' with one or two sentences on why "
+    "that answer is correct. "
+)
+SHORT_EXPLANATION_FIELD = (
+    ', "explanation": "<one or two sentences on why that answer is correct>"'
+)
+
+
+async def validate_topic(topic):
+    """
+    Validate if the topic is coherent using Groq API
+    Returns: tuple (is_valid, message)
+    """
+    topic = truncate(topic, MAX_TOPIC_TOKENS)
+    prompt = f"""
+    Analyze if the following topic is a coherent subject for a quiz: "{topic}"
+    Only respond with either "VALID" if it's a real topic (like "history", "python programming", "ancient egypt", etc.)
+    or "INVALID" if it's gibberish, random characters, or not a real topic.
+    Response:
+    """
+
+    try:
+        completion = await groq_client.acreate(
+            model="gemma2-9b-it",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            max_tokens=completion_budget("validate_topic"),
+            call="validate_topic",
+        )
+        response = completion.choices[0].message.content.strip()
+        return response == "VALID", "" if response == "VALID" else INVALID_TOPIC_MESSAGE
+    except Exception as e:
+        return False, f"Error validating topic: {str(e)}"
+
+
+async def generate_topics(num_topics, keep_extra=False):
+    """
+    Generates a list of random topics
+    that'll be displayed in the wheel
+    using the Groq API.
+    With keep_extra=True a few more topics than needed are requested and
+    returned, e.g. to stock a pool of topics.
+    """
+    count = num_topics + 5 if keep_extra else num_topics
+    response = await groq_client.acreate(
+        messages=[
+            {
+                "role": "user",
+                "content": f"Your output MUST consist of EXACTLY {count} different topics for quiz, separated ONLY by a newline. Don't write something like Here is the output: before, just the words, not numerated",
+            }
+        ],
+        model="gemma2-9b-it",
+        max_tokens=completion_budget("topic", count),
+        call="topics",
+    )
+    array = response.choices[0].message.content.split("\n")
+    if keep_extra:
+        return [topic.strip() for topic in array if topic.strip()]
+    return array[:num_topics]
+
+
+async def generate_questions(topic, num_questions=5, mode="sequential", explanations=False, existing=()):
+    """
+    Generates a list of multiple-choice questions using the Groq API.
+    Every question is parsed into a Question (stem, options A-D and the
+    correct answer) once, at generation time. Near-duplicates of each other
+    or of `existing` are dropped locally and replaced, so prompts don't
+    grow with the number of questions. Questions that can't be parsed
+    after MAX_PARSE_ATTEMPTS requests, or keep repeating others, are left
+    out, so fewer than num_questions may be returned; callers regenerate
+    them later.
+
+    Args:
+        topic (str): The quiz topic
+        num_questions (int): How many questions to generate
+        mode (str): "sequential" (one call per question), "concurrent"
+            (parallel calls) or "batched" (a single call returning all
+            questions as JSON)
+        explanations (bool): Also generate a short explanation of the
+            correct answer for every question
+        existing (iterable of Question): Questions not to repeat, e.g. the
+            ones already cached for the topic
+    """
+    topic = truncate(topic, MAX_TOPIC_TOKENS)
+    dedup = DuplicateFilter(existing)
+    if mode == "concurrent":
+        return await _generate_questions_concurrent(topic, num_questions, dedup, explanations=explanations)
+    if mode == "batched":
+        return await _generate_questions_batched(topic, num_questions, dedup, explanations)
+    if mode != "sequential":
+        raise ValueError(f"Unknown question generation mode: {mode}")
+
+    questions = []
+    for idx in range(num_questions):
+        hint = _aspect_hint(idx, num_questions)
+        try:
+            question = await _request_unique_question(topic, dedup, hint, explanations)
+        except UnparseableQuestionError:
+            continue
+        if question is not None:
+            questions.append(question)
+    return questions
+
+
+def _question_budget(num_questions, explanations):
+    """max_tokens for a response with num_questions questions"""
+    budget = completion_budget("question", num_questions)
+    if explanations:
+        budget += completion_budget("question_explanation", num_questions)
+    return budget
+
+
+def _aspect_hint(idx, num_questions):
+    return (
+        f" This is question {idx + 1} of {num_questions}, "
+        f"so focus on a different aspect of the topic."
+    )
+
+
+async def _request_question(topic, hint="", explanations=False, avoid=None):
+    """
+    Ask the Groq API for a single question, optionally one that differs
+    from the question `avoid`. Unparseable responses are requested again,
+    up to MAX_PARSE_ATTEMPTS times.
+    """
+    prompt = (
+        f"Ask a multiple choice question about {topic}. "
+        f"Provide options A, B, C, D, each on its own line formatted like 'A) ...'. "
+        f"Then add a line 'Answer: ' followed by the letter of the correct option. "
+        f"{SHORT_EXPLANATION_LINE if explanations else ''}"
+        f"{f'Ask about something else than: {avoid.stem!r}' if avoid else ''}"
+        f"{hint}"
+    )
+
+    error = None
+    for _ in range(MAX_PARSE_ATTEMPTS):
+        response = await groq_client.acreate(
+            messages=[{"role": "user", "content": prompt}],
+            model="llama3-8b-8192",
+            max_tokens=_question_budget(1, explanations),
+            call="question",
+        )
+
+        try:
+            return Question.parse(response.choices[0].message.content.strip())
+        except ValueError as e:
+            metrics.increment("question_parse_failures_total")
+            error = e
+    raise UnparseableQuestionError(f"Could not generate a valid question: {error}")
+
+
+async def _request_unique_question(topic, dedup, hint="", explanations=False):
+    """
+    Request a question until it is not a near-duplicate, asking for
+    something else than the repeated question. Returns None if the
+    MAX_DEDUP_ROUNDS replacements are duplicates too; callers get fewer
+    questions and generate more later.
+    """
+    avoid = None
+    for _ in range(MAX_DEDUP_ROUNDS + 1):
+        question = await _request_question(topic, hint, explanations, avoid)
+        if dedup.add(question):
+            return question
+        metrics.increment("question_duplicates_total")
+        avoid = dedup.duplicate_of(question)
+    return None
+
+
+def _add_unique(questions, candidates, num_questions, dedup):
+    """
+    Append the candidates that are not near-duplicates, up to num_questions.
+    Returns the questions that the rejected candidates repeat.
+    """
+    repeated = []
+    for candidate in candidates:
+        if len(questions) >= num_questions:
+            break
+        if dedup.add(candidate):
+            questions.append(candidate)
+        else:
+            metrics.increment("question_duplicates_total")
+            duplicate = dedup.duplicate_of(candidate)
+            if duplicate is not None:
+                repeated.append(duplicate)
+    return repeated
+
+
+async def _generate_questions_concurrent(topic, num_questions, dedup, questions=None,
+                                         explanations=False, repeated=()):
+    """
+    Requests the missing questions at the same time (asyncio.gather) and
+    drops near-duplicates. Duplicates are replaced in another round, each
+    replacement asked to differ from a question that was repeated; after
+    MAX_DEDUP_ROUNDS the remaining questions are requested one by one.
+    Requests that don't yield a parseable question are not replaced.
+    """
+    questions = list(questions or [])
+    repeated = list(repeated)
+    for _ in range(MAX_DEDUP_ROUNDS):
+        missing = num_questions - len(questions)
+        if missing <= 0:
+            break
+
+        requests = [
+            (_aspect_hint(len(questions) + i, num_questions),
+             repeated[i % len(repeated)] if repeated else None)
+            for i in range(missing)
+        ]
+        results = await asyncio.gather(
+            *(_request_question(topic, hint, explanations, avoid) for hint, avoid in requests),
+            return_exceptions=True,
+        )
+        candidates = []
+        for result in results:
+            if isinstance(result, UnparseableQuestionError):
+                num_questions -= 1
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                candidates.append(result)
+        repeated = _add_unique(questions, candidates, num_questions, dedup)
+
+    for _ in range(num_questions - len(questions)):
+        try:
+            question = await _request_unique_question(topic, dedup, explanations=explanations)
+        except UnparseableQuestionError:
+            continue
+        if question is not None:
+            questions.append(question)
+    return questions
+
+
+async def _generate_questions_batched(topic, num_questions, dedup, explanations=False):
+    """
+    Requests all questions in a single structured (JSON) response.
+    Missing or duplicate questions are topped up concurrently.
+    """
+    prompt = (
+        f"Ask {num_questions} different multiple choice questions about {topic}. "
+        f'Respond ONLY with a JSON object of the form {{"questions": [{{"question": '
+        f'"<question text>", "options": {{"A": "...", "B": "...", "C": "...", '
+        f'"D": "..."}}, "answer": "<letter of the correct option>"'
+        f'{SHORT_EXPLANATION_FIELD if explanations else ""}}}, ...]}} '
+        f"containing exactly {num_questions} questions."
+    )
+
+    response = await groq_client.acreate(
+        messages=[{"role": "user", "content": prompt}],
+        model="llama3-8b-8192",
+        response_format={"type": "json_object"},
+        max_tokens=_question_budget(num_questions, explanations),
+        call="questions",
+    )
+
+    try:
+        items = json.loads(response.choices[0].message.content)["questions"]
+    except (ValueError, KeyError, TypeError):
+        items = []
+
+    candidates = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            candidates.append(Question.from_dict(item))
+        except ValueError:
+            continue
+
+    questions = []
+    repeated = _add_unique(questions, candidates, num_questions, dedup)
+    return await _generate_questions_concurrent(
+        topic, num_questions, dedup, questions, explanations, repeated
+    )
+
+
+async def check_answer(question, user_answer):
+    """
+    Check if the user's answer is correct. The correct answer is known since
+    the question was generated, so no API call is needed.
+
+    Args:
+        question (Question): The parsed question
+        user_answer (str): User's answer (single uppercase letter A, B, C, or D)
+
+    Returns:
+        tuple (is_correct: bool, correct_answer: str)
+    """
+    return user_answer == question.correct, question.correct
+
+
+async def get_explanation(question, correct_answer, stream=False, short=False):
+    """
+    Retrieves a detailed explanation for the correct answer.
+    With stream=True an async generator is returned that yields the
+    explanation in pieces as they arrive. With short=True the explanation
+    is limited to one or two sentences.
+    """
+    if short:
+        request = "In one or two sentences, explain why this is the correct answer."
+    else:
+        request = "Please provide a detailed explanation for why this is the correct answer."
+    prompt = (
+        f"Question: {question}\n"
+        f"The correct answer is: {correct_answer}.\n"
+        f"{request}"
+    )
+
+    call = "short_explanation" if short else "explanation"
+    if stream:
+        return _stream_explanation(prompt, call)
+
+    response = await groq_client.acreate(
+        messages=[{"role": "user", "content": prompt}],
+        model="llama3-8b-8192",
+        max_tokens=completion_budget(call),
+        call=call,
+    )
+
+    explanation = response.choices[0].message.content.strip()
+    return explanation
+
+
+async def _stream_explanation(prompt, call="explanation"):
+    """Yield the pieces of a streamed explanation"""
+    messages = [{"role": "user", "content": prompt}]
+    chunks = await groq_client.acreate(
+        messages=messages,
+        model="llama3-8b-8192",
+        stream=True,
+        max_tokens=completion_budget(call),
+    )
+
+    usage = reason = None
+    try:
+        with metrics.timer("groq_stream_duration_seconds", model="llama3-8b-8192"):
+            async for chunk in chunks:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    usage = getattr(x_groq, "usage", None)
+                    record_usage("llama3-8b-8192", usage)
+                if chunk.choices:
+                    reason = chunk.choices[0].finish_reason or reason
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+    finally:
+        record_call(call, "llama3-8b-8192", estimate_prompt_tokens(messages), usage, reason)
@@ -1,26 +1,139 @@
 # Audio handling functions
-from pygame import mixer
-from config import AUDIO_PATHS
+import base64
+import json
+import os
+import threading
+import streamlit as st
+from config import AUDIO_ASSET_URL, AUDIO_BACKEND, AUDIO_CHANNELS, AUDIO_PATHS
+from services.metrics import metrics
 
+# pygame is only imported by the pygame backend, on first use
+mixer = None
 
-class AudioService:
-    def __init__(self):
-        mixer.init()
+
+def _get_mixer():
+    global mixer
+    if mixer is None:
+        from pygame import mixer as pygame_mixer
+        mixer = pygame_mixer
+    return mixer
+
+
+class NullAudioBackend:
+    """Plays nothing, for headless servers and tests"""
+
+    def play(self, sound_name):
+        pass
+
+
+class PygameAudioBackend:
+    """
+    Plays sounds on the machine running the app. The mixer is initialized
+    and each sound decoded on first use; sounds play without blocking on a
+    pool of `channels` channels, the oldest sound making way when all are
+    busy. Without pygame or an audio device nothing is played.
+    """
+
+    def __init__(self, paths=AUDIO_PATHS, channels=AUDIO_CHANNELS):
+        self.paths = paths
+        self.channels = channels
         self.sounds = {}
-        self._load_sounds()
+        self.initialized = False
+        self.available = False
+        self._lock = threading.Lock()
+
+    def _init_mixer(self):
+        """Initialize the mixer once; returns whether sounds can be played"""
+        if not self.initialized:
+            self.initialized = True
+            try:
+                _get_mixer().init()
+                mixer.set_num_channels(self.channels)
+                self.available = True
+            except Exception:
+                self.available = False
+        return self.available
 
+    def _sound(self, sound_name):
+        """The decoded sound, loaded on first use"""
+        if sound_name not in self.sounds and sound_name in self.paths:
+            self.sounds[sound_name] = mixer.Sound(self.paths[sound_name])
+        return self.sounds.get(sound_name)
 
-    def _load_sounds(self):
-        """Load all sound files into memory"""
-        for name, path in AUDIO_PATHS.items():
-            self.sounds[name] = mixer.Sound(path)
+    def play(self, sound_name):
+        with self._lock:
+            sound = self._sound(sound_name) if self._init_mixer() else None
+        if sound is not None:
+            mixer.find_channel(True).play(sound)
 
 
+class BrowserAudioBackend:
+    """
+    Plays sounds in the player's browser. Every MP3 is sent as is, at most
+    once per browser session: inline the first time it is played, or, with
+    asset_url (e.g. "app/static/audio/{file}"), as a URL the browser caches.
+    After that a sound is triggered by a tiny script.
+    """
+
+    def __init__(self, paths=AUDIO_PATHS, asset_url=AUDIO_ASSET_URL):
+        self.paths = paths
+        self.asset_url = asset_url
+        self._sources = {}  # sound name -> URL, built once per process
+        self._lock = threading.Lock()
+
+    def _source(self, sound_name):
+        with self._lock:
+            if sound_name not in self._sources:
+                path = self.paths[sound_name]
+                if self.asset_url:
+                    source = self.asset_url.format(name=sound_name, file=os.path.basename(path))
+                else:
+                    with open(path, "rb") as file:
+                        data = base64.b64encode(file.read()).decode()
+                    source = f"data:audio/mpeg;base64,{data}"
+                self._sources[sound_name] = source
+            return self._sources[sound_name]
+
+    def play(self, sound_name):
+        if sound_name not in self.paths:
+            return
+        sent = st.session_state.setdefault("sent_sounds", set())
+        source = None if sound_name in sent else self._source(sound_name)
+        sent.add(sound_name)
+        # A new number every time, so that the same sound can play again
+        plays = st.session_state["sound_plays"] = st.session_state.get("sound_plays", 0) + 1
+        st.html(
+            f"<script data-play='{plays}'>(() => {{"
+            f"const sounds = window.quizSounds = window.quizSounds || {{}};"
+            f"const name = {json.dumps(sound_name)}, source = {json.dumps(source)};"
+            f"if (source) sounds[name] = new Audio(source);"
+            f"const sound = sounds[name];"
+            f"if (sound) {{ sound.currentTime = 0; sound.play().catch(() => {{}}); }}"
+            f"}})();</script>",
+            unsafe_allow_javascript=True,
+        )
+
+
+def create_audio_backend(kind=AUDIO_BACKEND):
+    """The audio backend configured by AUDIO_BACKEND"""
+    if kind == "browser":
+        return BrowserAudioBackend()
+    if kind == "pygame":
+        return PygameAudioBackend()
+    if kind == "none":
+        return NullAudioBackend()
+    raise ValueError(f"Unknown audio backend: {kind}")
+
+
+class AudioService:
+    def __init__(self, backend=None):
+        self.backend = backend or create_audio_backend()
+
     def play_sound(self, sound_name: str):
         """Play a sound by its name"""
-        if sound_name in self.sounds:
-            self.sounds[sound_name].play()
+        with metrics.timer("audio_play_duration_seconds", sound=sound_name):
+            self.backend.play(sound_name)
 
 
 # Create a singleton instance
-audio = AudioService()
\ No newline at end of file
+audio = AudioService()
@@ -0,0 +1,82 @@
+# Cancellation of background Groq work that is no longer needed
+import contextvars
+import threading
+import time
+
+# Scope of the work running in this context, see CancelScope.run
+_scope = contextvars.ContextVar("cancel_scope", default=None)
+
+
+class Cancelled(Exception):
+    """The work was cancelled, e.g. the player moved on to another topic"""
+
+
+class CancelScope:
+    """
+    Cancels the Groq calls of a piece of background work, e.g. fetching
+    the questions of a topic the player no longer plays. No further
+    requests, retries or rate-limit waits are made for the work, and the
+    asyncio tasks running it (see groq_service.run) are cancelled, which
+    aborts the requests they have in flight.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """
+        Call callback when the scope is cancelled, or now if it is. Returns
+        a function that removes the callback again.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def run(self, function, *args, **kwargs):
+        """Call function with this scope as the current one"""
+        token = _scope.set(self)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _scope.reset(token)
+
+
+def current_scope():
+    return _scope.get()
+
+
+def check_cancelled():
+    """Raise Cancelled if the current work was cancelled"""
+    scope = _scope.get()
+    if scope is not None and scope.cancelled:
+        raise Cancelled()
+
+
+def sleep(seconds):
+    """time.sleep that is cut short, with Cancelled, by a cancellation"""
+    scope = _scope.get()
+    if scope is None:
+        time.sleep(seconds)
+    elif scope._event.wait(seconds):
+        raise Cancelled()
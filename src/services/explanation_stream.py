@@ -0,0 +1,69 @@
+# Explanations generated in the background while the quiz goes on
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import EXPLANATION_WORKERS
+from services.groq_service import get_explanation
+from services.token_budget import submit
+
+_executor = ThreadPoolExecutor(max_workers=EXPLANATION_WORKERS)
+
+# Single thread, so pregeneration never competes with explanations a
+# player is waiting for
+_low_priority_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class ExplanationStream:
+    """
+    Collects the pieces of a streamed explanation. The text so far can be
+    read at any time; `done` is set once the explanation is complete.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._lock = threading.Lock()
+        self.done = False
+        self.error = None
+
+    @property
+    def text(self):
+        with self._lock:
+            return "".join(self._parts).strip()
+
+    def consume(self, chunks):
+        """Read all pieces from an iterable of strings"""
+        try:
+            for chunk in chunks:
+                with self._lock:
+                    self._parts.append(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+
+def start_explanation(question, correct_answer):
+    """Start streaming the explanation for a question in the background"""
+    explanation = ExplanationStream()
+    submit(
+        _executor,
+        lambda: explanation.consume(get_explanation(question, correct_answer, stream=True)),
+    )
+    return explanation
+
+
+def pregenerate_explanations(questions):
+    """
+    Queue short explanations for the questions that don't have one yet.
+    Each explanation is stored on its question once it is generated.
+    Returns the futures of the queued questions.
+    """
+    return [
+        submit(_low_priority_executor, _add_short_explanation, question)
+        for question in questions
+        if not question.explanation
+    ]
+
+
+def _add_short_explanation(question):
+    if not question.explanation:
+        question.explanation = get_explanation(question, question.correct, short=True)
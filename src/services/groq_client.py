@@ -0,0 +1,294 @@
+# Shared layer for all Groq API requests
+import asyncio
+import json
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from config import (
+    GROQ_ASYNC_CLIENT,
+    GROQ_CLIENT,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_RETRIES,
+    GROQ_RATE_LIMITS,
+    GROQ_REQUEST_TIMEOUT,
+    GROQ_RETRY_BACKOFF,
+    GROQ_RETRY_MAX_DELAY,
+)
+from services.cancellation import Cancelled, check_cancelled, sleep
+from services.metrics import metrics
+from services.token_budget import estimate_prompt_tokens, record_call
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _wait_time(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a request may be made, or the work is cancelled"""
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if not wait:
+                return
+            sleep(wait)
+
+    async def acquire_async(self):
+        """acquire for asyncio code, waiting without blocking the event loop"""
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Make the next requests wait, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and connection errors are retried"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    from groq import APIConnectionError
+    return isinstance(error, APIConnectionError)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, if any"""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def record_usage(model, usage):
+    """Count the prompt and completion tokens of a response"""
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            metrics.increment("groq_tokens_total", tokens, model=model, type=kind)
+
+
+def finish_reason(response):
+    """Why the completion ended, e.g. "length" when it hit max_tokens"""
+    try:
+        return response.choices[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return None
+
+
+class GroqClient:
+    """
+    Wraps the Groq client with a bound on concurrent requests, a token
+    bucket per model, jittered exponential retries, a request timeout and
+    coalescing of identical requests that are in flight at the same time.
+    Cancelled work (see services.cancellation) makes no further requests.
+    create uses the Groq client, acreate the asyncio one (async_client).
+    """
+
+    def __init__(
+        self,
+        client=GROQ_CLIENT,
+        async_client=GROQ_ASYNC_CLIENT,
+        max_concurrency=GROQ_MAX_CONNECTIONS,
+        rate_limits=GROQ_RATE_LIMITS,
+        timeout=GROQ_REQUEST_TIMEOUT,
+        max_retries=GROQ_MAX_RETRIES,
+        backoff=GROQ_RETRY_BACKOFF,
+        max_delay=GROQ_RETRY_MAX_DELAY,
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.buckets = {
+            model: TokenBucket(per_minute / 60, per_minute)
+            for model, per_minute in rate_limits.items()
+        }
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._async_semaphores = weakref.WeakKeyDictionary()  # event loop -> Semaphore
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def create(self, call="other", **kwargs):
+        """
+        Same arguments as client.chat.completions.create, plus the kind of
+        call for token accounting. Identical non-streaming requests made
+        while one is in flight share its result; its tokens are charged
+        once, to the account of the request that was sent, since they were
+        spent once. The usage of streams is recorded by their consumer, see
+        token_budget.record_call.
+        """
+        if kwargs.get("stream"):
+            return self._create_with_retries(kwargs, call)
+
+        key, future, owner = self._join(kwargs)
+        if not owner:
+            metrics.increment("groq_coalesced_requests_total", call=call)
+            try:
+                return future.result()
+            except Cancelled:
+                # The work of the request's owner was cancelled, not ours
+                check_cancelled()
+                return self.create(call, **kwargs)
+
+        try:
+            future.set_result(self._create_with_retries(kwargs, call))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    async def acreate(self, call="other", **kwargs):
+        """
+        create for asyncio code, on the asyncio Groq client. Requests are
+        coalesced with identical ones of create and acreate alike.
+        Cancelling the task aborts the request in flight.
+        """
+        if kwargs.get("stream"):
+            return await self._acreate_with_retries(kwargs, call)
+
+        key, future, owner = self._join(kwargs)
+        if not owner:
+            metrics.increment("groq_coalesced_requests_total", call=call)
+            try:
+                # Shielded, so that cancelling this waiter leaves the request alone
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except Cancelled:
+                check_cancelled()
+                return await self.acreate(call, **kwargs)
+
+        try:
+            future.set_result(await self._acreate_with_retries(kwargs, call))
+        except asyncio.CancelledError:
+            # The waiters make the request themselves, see create
+            future.set_exception(Cancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def _join(self, kwargs):
+        """
+        The future of the request, shared by identical requests in flight,
+        and whether this caller owns it, i.e. has to make the request
+        """
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return key, future, False
+            future = self._in_flight[key] = Future()
+            return key, future, True
+
+    def _create_with_retries(self, kwargs, call):
+        kwargs.setdefault("timeout", self.timeout)
+        model = kwargs.get("model")
+        bucket = self.buckets.get(model)
+        for attempt in range(self.max_retries + 1):
+            check_cancelled()
+            if bucket:
+                bucket.acquire()
+            start = time.perf_counter()
+            try:
+                with self._semaphore:
+                    response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                delay = self._failed(e, attempt, model, bucket, start)
+                if delay:
+                    sleep(delay)
+            else:
+                return self._succeeded(response, kwargs, call, start)
+
+    async def _acreate_with_retries(self, kwargs, call):
+        kwargs.setdefault("timeout", self.timeout)
+        model = kwargs.get("model")
+        bucket = self.buckets.get(model)
+        for attempt in range(self.max_retries + 1):
+            check_cancelled()
+            if bucket:
+                await bucket.acquire_async()
+            start = time.perf_counter()
+            try:
+                async with self._loop_semaphore():
+                    response = await self.async_client.chat.completions.create(**kwargs)
+            except Exception as e:
+                delay = self._failed(e, attempt, model, bucket, start)
+                if delay:
+                    await asyncio.sleep(delay)
+            else:
+                return self._succeeded(response, kwargs, call, start)
+
+    def _loop_semaphore(self):
+        """The bound on concurrent requests of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_semaphores:
+                self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return self._async_semaphores[loop]
+
+    def _failed(self, error, attempt, model, bucket, start):
+        """
+        Account for a failed attempt and re-raise the error unless it is
+        retried. Returns the seconds to wait before the next attempt.
+        """
+        metrics.observe("groq_request_duration_seconds", time.perf_counter() - start, model=model)
+        metrics.increment("groq_requests_total", model=model, status="error")
+        if attempt == self.max_retries or not is_retryable(error):
+            raise error
+        metrics.increment("groq_retries_total", model=model)
+        delay = min(self.max_delay, self.backoff * 2 ** attempt)
+        delay *= random.uniform(0.5, 1.5)
+        server_delay = retry_after(error)
+        if server_delay is not None and bucket:
+            # Hold back every request for this model, including ours
+            bucket.pause(max(delay, server_delay))
+            return 0
+        return max(delay, server_delay or 0)
+
+    def _succeeded(self, response, kwargs, call, start):
+        """Account for a successful request; returns its response"""
+        model = kwargs.get("model")
+        metrics.observe("groq_request_duration_seconds", time.perf_counter() - start, model=model)
+        metrics.increment("groq_requests_total", model=model, status="ok")
+        # Streams report their usage in the last chunk instead
+        if not kwargs.get("stream"):
+            usage = getattr(response, "usage", None)
+            record_usage(model, usage)
+            estimated_prompt = estimate_prompt_tokens(kwargs.get("messages", ()))
+            record_call(call, model, estimated_prompt, usage, finish_reason(response))
+        return response
+
+
+# Create a singleton instance
+groq_client = GroqClient()
@@ -1,128 +1,133 @@
-# Groq API related functions
-from config import GROQ_CLIENT
-
-
-def validate_topic(topic):
+# Groq API related functions, for synchronous code
+#
+# Thin wrappers that run the coroutines of services.async_groq_service on
+# one event loop in a background thread, so the app's threads (the script
+# thread, prefetching, explanation streams) keep a blocking API while the
+# requests share the asyncio client and its connections.
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from services import async_groq_service
+from services.async_groq_service import INVALID_TOPIC_MESSAGE, UnparseableQuestionError  # noqa: F401
+from services.cancellation import Cancelled, current_scope
+from services.metrics import metrics
+
+_loop = None
+_loop_lock = threading.Lock()
+
+# Marks the end of an async generator, see _iterate
+_END = object()
+
+
+def _event_loop():
+    """The event loop of the Groq calls, started on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="groq-event-loop", daemon=True).start()
+    return _loop
+
+
+def _start(coroutine):
     """
-    Validate if the topic is coherent using Groq API
-    Returns: tuple (is_valid, message)
-    """
-    prompt = f"""
-    Analyze if the following topic is a coherent subject for a quiz: "{topic}"
-    Only respond with either "VALID" if it's a real topic (like "history", "python programming", "ancient egypt", etc.)
-    or "INVALID" if it's gibberish, random characters, or not a real topic.
-    Response:
+    Schedule a coroutine on the event loop, in the caller's context, so
+    its calls are charged to the caller's token account. Cancelling the
+    caller's CancelScope cancels it. Returns (future, unregister function).
     """
+    future = asyncio.run_coroutine_threadsafe(coroutine, _event_loop())
+    scope = current_scope()
+    return future, scope.on_cancel(future.cancel) if scope is not None else (lambda: None)
 
-    try:
-        completion = GROQ_CLIENT.chat.completions.create(
-            model="gemma2-9b-it",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0,
-            max_tokens=10
-        )
-        response = completion.choices[0].message.content.strip()
-        return response == "VALID", "" if response == "VALID" else "Please enter a real topic."
-    except Exception as e:
-        return False, f"Error validating topic: {str(e)}"
-
-
-def generate_topics(num_topics):
+
+def run(coroutine):
     """
-    Generates a list of random topics
-    that'll be displayed in the wheel
-    using the Groq API.
+    Run a coroutine on the event loop of the Groq calls and wait for its
+    result, see _start. Raises Cancelled if the caller's work is cancelled.
     """
-    response = GROQ_CLIENT.chat.completions.create(
-        messages=[
-            {
-                "role": "user",
-                "content": f"Your output MUST consist of EXACTLY {num_topics+5} different topics for quiz, separated ONLY by a newline. Don't write something like Here is the output: before, just the words, not numerated",
-            }
-        ],
-        model="gemma2-9b-it",
-    )
-    array = response.choices[0].message.content.split("\n")
-    return array[:num_topics]
-
-
-def generate_questions(topic, num_questions=5):
+    future, remove = _start(coroutine)
+    try:
+        return future.result()
+    except concurrent.futures.CancelledError:
+        raise Cancelled() from None
+    finally:
+        remove()
+
+
+def _iterate(generator):
     """
-    Generates a list of multiple-choice questions using the Groq API.
+    Iterate an async generator from synchronous code. One task pumps its
+    items into a queue, so every item crosses threads once and the stream
+    doesn't wait for the consumer; stopping early cancels the task.
     """
-    questions = []
-    for _ in range(num_questions):
-        prompt = (
-            f"Ask a multiple choice question about {topic}. "
-            f"Provide options A, B, C, D. Make sure it's different from these "
-            f"existing questions: {questions}"
-        )
+    items = queue.SimpleQueue()
 
-        response = GROQ_CLIENT.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama3-8b-8192",
-        )
+    async def pump():
+        try:
+            async for item in generator:
+                items.put(item)
+        finally:
+            items.put(_END)
 
-        question = response.choices[0].message.content.strip()
-        questions.append(question)
-    return questions
+    future, remove = _start(pump())
+    try:
+        while (item := items.get()) is not _END:
+            yield item
+        future.result()
+    except concurrent.futures.CancelledError:
+        raise Cancelled() from None
+    finally:
+        remove()
+        future.cancel()
 
 
-def check_answer(question, user_answer):
+@metrics.timed("groq_service_call_duration_seconds", function="validate_topic")
+def validate_topic(topic):
     """
-    Check if the user's answer is correct using Groq LLM.
+    Validate if the topic is coherent using Groq API
+    Returns: tuple (is_valid, message)
+    """
+    return run(async_groq_service.validate_topic(topic))
 
-    Args:
-        question (str): The full question text including all answer options
-        user_answer (str): User's answer (single uppercase letter A, B, C, or D)
 
-    Returns:
-        tuple (is_correct: bool, correct_answer: str)
-    """
+@metrics.timed("groq_service_call_duration_seconds", function="generate_topics")
+def generate_topics(num_topics, keep_extra=False):
+    """Generates a list of random topics, see async_groq_service.generate_topics"""
+    return run(async_groq_service.generate_topics(num_topics, keep_extra))
 
-    # Create the prompt for the LLM
-    prompt = f"""
-    Question: {question}
 
-    Please provide ONLY a single uppercase letter (A, B, C, or D) representing the correct answer. 
-    Do not provide any explanation or additional text.
+@metrics.timed("groq_service_call_duration_seconds", function="generate_questions")
+def generate_questions(topic, num_questions=5, mode="sequential", explanations=False, existing=()):
     """
+    Generates a list of multiple-choice questions using the Groq API, see
+    async_groq_service.generate_questions. In "concurrent" mode the
+    requests are made at the same time on the event loop.
+    """
+    return run(async_groq_service.generate_questions(
+        topic, num_questions, mode, explanations, existing
+    ))
 
-    # Make API call to Groq
-    chat_completion = GROQ_CLIENT.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama3-8b-8192",
-        temperature=0.5,
-        max_tokens=1
-    )
-
-    # Extract the correct answer
-    correct_answer = chat_completion.choices[0].message.content.strip()
 
-    # Validate LLM response
-    if correct_answer[0] not in ['A', 'B', 'C', 'D']:
-        return False, 'Unknown'
+@metrics.timed("groq_service_call_duration_seconds", function="check_answer")
+def check_answer(question, user_answer):
+    """
+    Check if the user's answer is correct. The correct answer is known since
+    the question was generated, so no API call is needed.
 
-    # Compare answers
-    return user_answer == correct_answer, correct_answer
+    Returns:
+        tuple (is_correct: bool, correct_answer: str)
+    """
+    return run(async_groq_service.check_answer(question, user_answer))
 
 
-def get_explanation(question, correct_answer):
+@metrics.timed("groq_service_call_duration_seconds", function="get_explanation")
+def get_explanation(question, correct_answer, stream=False, short=False):
     """
     Retrieves a detailed explanation for the correct answer.
+    With stream=True a generator is returned that yields the explanation
+    in pieces as they arrive. With short=True the explanation is limited
+    to one or two sentences.
     """
-    prompt = (
-        f"Question: {question}\n"
-        f"The correct answer is: {correct_answer}.\n"
-        f"Please provide a detailed explanation for why this is the correct answer."
-    )
-
-    response = GROQ_CLIENT.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama3-8b-8192",
-    )
-
-    explanation = response.choices[0].message.content.strip()
-    return explanation
\ No newline at end of file
+    explanation = run(async_groq_service.get_explanation(question, correct_answer, stream, short))
+    return _iterate(explanation) if stream else explanation
@@ -0,0 +1,195 @@
+# Lightweight in-process metrics with a Prometheus text export
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """Count, sum, max and cumulative bucket counts of observed values"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and duration histograms, identified by a
+    metric name and a set of labels. Exported in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {label key: value}
+        self._gauges = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: Histogram}
+        self._server = None
+
+    def increment(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge, a value that can go up and down"""
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, **labels):
+        """
+        Record a value, e.g. a duration in seconds, in a histogram. The
+        buckets of a series are the ones of its first observation.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(key, Histogram(buckets)).observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Record the duration of a block in the `name` histogram. Exceptions
+        also increment the `<name>_errors_total` counter; Streamlit's rerun
+        and stop signals are not exceptions and are not counted.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator version of timer"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def export_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {count}"
+                        )
+                    lines.append(
+                        f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}"
+                    )
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Rows for the debug panel: one per histogram series with its count,
+        mean and max (in milliseconds for durations), and one per counter
+        and gauge series
+        """
+        rows = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                for key, histogram in sorted(series.items()):
+                    row = {"metric": name + _format_labels(key), "count": histogram.count}
+                    if name.endswith("_seconds"):
+                        row["mean ms"] = round(1000 * histogram.sum / histogram.count, 1)
+                        row["max ms"] = round(1000 * histogram.max, 1)
+                    else:
+                        row["mean"] = round(histogram.sum / histogram.count, 6)
+                        row["max"] = round(histogram.max, 6)
+                    rows.append(row)
+            for name, series in sorted(self._counters.items()):
+                for key, value in sorted(series.items()):
+                    rows.append({"metric": name + _format_labels(key), "count": value})
+            for name, series in sorted(self._gauges.items()):
+                for key, value in sorted(series.items()):
+                    rows.append({"metric": name + _format_labels(key), "value": value})
+        return rows
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serve /metrics for Prometheus on a background thread, once per process"""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_error(404)
+                        return
+                    data = metrics.export_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            return self._server
+
+
+# Create a singleton instance
+metrics = Metrics()
@@ -0,0 +1,132 @@
+# Background prefetching of quiz questions
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import PREFETCH_WORKERS, QUESTION_BATCH_SIZE, QUESTION_LOOKAHEAD
+from services.cancellation import CancelScope
+from services.topic_validator import topic_validator
+from services.question_bank import question_bank
+from services.token_budget import submit
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+
+
+def prefetch_questions(topic, seen=(), validate=False, num_questions=QUESTION_BATCH_SIZE,
+                       scope=None):
+    """
+    Starts fetching the questions for a topic in a background thread.
+    With validate=True the topic is validated first and the future
+    resolves to None if it is not a real topic. Cancelling `scope` stops
+    the Groq calls of the fetch; the future then raises Cancelled.
+
+    Returns: concurrent.futures.Future with the list of questions
+    """
+    scope = scope or CancelScope()
+    return submit(_executor, scope.run, _fetch_questions, topic, set(seen), validate, num_questions)
+
+
+def _fetch_questions(topic, seen, validate, num_questions):
+    if validate:
+        is_valid, _ = topic_validator.validate(topic)
+        if not is_valid:
+            return None
+    return question_bank.get_questions(topic, num_questions, seen=seen)
+
+
+class QuestionFeed:
+    """
+    Hands out the questions of one quiz one at a time. Questions are
+    fetched in batches on a background thread whenever fewer than
+    `lookahead` are ready, so the next question is usually there before
+    the player has answered the current one.
+
+    `seen` is the set of question keys the player already had; questions
+    are added to it when they are handed out. `limit` is the number of
+    questions the quiz still needs, or None for an endless quiz. close()
+    cancels the fetching when the quiz is over or abandoned.
+    """
+
+    def __init__(self, topic, seen, questions=(), limit=None,
+                 batch_size=QUESTION_BATCH_SIZE, lookahead=QUESTION_LOOKAHEAD):
+        self.topic = topic
+        self.seen = seen
+        self.limit = limit
+        self.batch_size = batch_size
+        self.lookahead = lookahead
+
+        self._lock = threading.Lock()
+        self._ready = deque()
+        self._pending = None
+        self._requested = 0
+        self._exhausted = False
+        self._closed = False
+        self._scope = CancelScope()
+        with self._lock:
+            self._ready.extend(list(questions)[:limit])
+            self._requested = len(self._ready)
+            self._fill()
+
+    def _fill(self):
+        """Start fetching the next batch if it is needed (lock held)"""
+        if self._pending is not None or self._exhausted or self._closed \
+                or len(self._ready) >= self.lookahead:
+            return
+        count = self.batch_size
+        if self.limit is not None:
+            count = min(count, self.limit - self._requested)
+        if count <= 0:
+            return
+        self._requested += count
+        exclude = set(self.seen)
+        exclude.update(question.key for question in self._ready)
+        self._pending = submit(_executor, self._scope.run, self._fetch, count, exclude)
+
+    def _fetch(self, count, exclude):
+        try:
+            questions = question_bank.get_questions(self.topic, count, seen=exclude)
+        except Exception:
+            questions = []
+        with self._lock:
+            if self._closed:
+                self._pending = None
+                return
+            # Newly generated questions may still repeat one the player had,
+            # or each other
+            exclude = set(self.seen)
+            exclude.update(question.key for question in self._ready)
+            unique = []
+            for question in questions:
+                if question.key not in exclude:
+                    exclude.add(question.key)
+                    unique.append(question)
+            questions = unique[:count]
+            self._ready.extend(questions)
+            self._requested -= count - len(questions)
+            # Without new questions the topic is used up (or the API is down)
+            self._exhausted = not questions
+            self._pending = None
+            self._fill()
+
+    def close(self):
+        """Stop fetching; questions that are ready can still be taken"""
+        with self._lock:
+            self._closed = True
+        self._scope.cancel()
+
+    def take(self, timeout=None):
+        """
+        The next question, waiting for it if it is still being fetched.
+        Returns None when the quiz has no more questions.
+        """
+        while True:
+            with self._lock:
+                if self._ready:
+                    question = self._ready.popleft()
+                    self.seen.add(question.key)
+                    self._fill()
+                    return question
+                self._fill()
+                pending = self._pending
+            if pending is None:
+                return None
+            pending.result(timeout)
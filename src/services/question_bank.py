@@ -0,0 +1,189 @@
+# Persistent question bank in front of the question generation
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    EXPLANATION_POLICY,
+    QUESTION_BANK_PATH,
+    QUESTION_BANK_TTL,
+    QUESTION_BANK_MAX_PER_TOPIC,
+    QUESTION_BANK_MAX_QUESTIONS,
+    QUESTION_BANK_LRU_TOPICS,
+    QUESTION_BANK_REFILL_SIZE,
+    QUESTION_GENERATION_MODE,
+)
+from models.question import Question
+from services.groq_service import generate_questions
+
+
+def normalize_topic(topic):
+    """Lowercase the topic and collapse punctuation and whitespace"""
+    return " ".join(re.findall(r"\w+", topic.lower()))
+
+
+class QuestionBank:
+    """
+    Caches generated questions per topic in SQLite, with an in-process LRU
+    of recently used topics in front of it. Questions expire after `ttl`
+    seconds; the oldest questions are evicted when a topic holds more than
+    `max_per_topic` questions or the bank more than `max_questions`.
+    """
+
+    def __init__(
+        self,
+        path=QUESTION_BANK_PATH,
+        ttl=QUESTION_BANK_TTL,
+        max_per_topic=QUESTION_BANK_MAX_PER_TOPIC,
+        max_questions=QUESTION_BANK_MAX_QUESTIONS,
+        lru_topics=QUESTION_BANK_LRU_TOPICS,
+        refill_size=QUESTION_BANK_REFILL_SIZE,
+        generate=generate_questions,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_per_topic = max_per_topic
+        self.max_questions = max_questions
+        self.lru_topics = lru_topics
+        self.refill_size = refill_size
+        self.generate = generate
+
+        self._lock = threading.RLock()
+        self._db = None
+        self._cache = OrderedDict()  # topic -> list of (created, Question)
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=2)
+
+    def _connection(self):
+        """Open the database on first use"""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "topic TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, "
+                "created REAL NOT NULL, PRIMARY KEY (topic, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS questions_created ON questions (created)"
+            )
+        return self._db
+
+    def _load(self, topic):
+        """Get the non-expired questions of a normalized topic"""
+        expiry = time.time() - self.ttl
+        with self._lock:
+            if topic in self._cache:
+                self._cache.move_to_end(topic)
+                entries = [entry for entry in self._cache[topic] if entry[0] > expiry]
+            else:
+                rows = self._connection().execute(
+                    "SELECT created, data FROM questions WHERE topic = ? AND created > ?",
+                    (topic, expiry),
+                ).fetchall()
+                entries = [(created, Question.from_dict(json.loads(data))) for created, data in rows]
+            self._remember(topic, entries)
+            return [question for _, question in entries]
+
+    def _remember(self, topic, entries):
+        """Put a topic in the LRU, evicting the least recently used topic"""
+        self._cache[topic] = entries
+        self._cache.move_to_end(topic)
+        while len(self._cache) > self.lru_topics:
+            self._cache.popitem(last=False)
+
+    def add(self, topic, questions):
+        """Store questions for a topic, skipping ones that are already known"""
+        topic = normalize_topic(topic)
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO questions (topic, key, data, created) VALUES (?, ?, ?, ?)",
+                    [(topic, q.key, json.dumps(q.to_dict()), now) for q in questions],
+                )
+                self._evict(db, topic)
+            self._cache.pop(topic, None)
+
+    def _evict(self, db, topic):
+        """Remove expired questions and the oldest ones above the size limits"""
+        db.execute("DELETE FROM questions WHERE created <= ?", (time.time() - self.ttl,))
+        db.execute(
+            "DELETE FROM questions WHERE topic = ? AND rowid NOT IN ("
+            "SELECT rowid FROM questions WHERE topic = ? ORDER BY created DESC LIMIT ?)",
+            (topic, topic, self.max_per_topic),
+        )
+        excess = db.execute("SELECT COUNT(*) FROM questions").fetchone()[0] - self.max_questions
+        if excess > 0:
+            evicted = {
+                row[0] for row in db.execute(
+                    "SELECT DISTINCT topic FROM questions WHERE rowid IN ("
+                    "SELECT rowid FROM questions ORDER BY created LIMIT ?)", (excess,)
+                )
+            }
+            db.execute(
+                "DELETE FROM questions WHERE rowid IN ("
+                "SELECT rowid FROM questions ORDER BY created LIMIT ?)", (excess,)
+            )
+            for evicted_topic in evicted:
+                self._cache.pop(evicted_topic, None)
+
+    def get_questions(self, topic, num_questions=5, seen=()):
+        """
+        Returns num_questions questions about the topic, preferring a random
+        subset of cached questions whose keys are not in `seen`. Missing
+        questions are generated right away; when the cache is running low, or
+        some questions could not be generated (e.g. unparseable responses),
+        it is refilled in the background.
+        """
+        key = normalize_topic(topic)
+        unseen = [question for question in self._load(key) if question.key not in seen]
+        questions = random.sample(unseen, min(num_questions, len(unseen)))
+
+        missing = num_questions - len(questions)
+        if missing > 0:
+            known = {question.key for question in questions}
+            generated = self._generate(topic, missing)
+            generated = [question for question in generated if question.key not in known]
+            self.add(topic, generated)
+            questions += generated[:missing]
+            if len(generated) < missing:
+                self.refill(topic)
+        elif len(unseen) - len(questions) < num_questions:
+            self.refill(topic)
+
+        return questions
+
+    def _generate(self, topic, num_questions):
+        """Generate questions that are no near-duplicates of the cached ones"""
+        return self.generate(
+            topic,
+            num_questions,
+            mode=QUESTION_GENERATION_MODE,
+            explanations=EXPLANATION_POLICY == "batch",
+            existing=self._load(normalize_topic(topic)),
+        )
+
+    def refill(self, topic):
+        """Generate new questions for a topic in the background"""
+        key = normalize_topic(topic)
+        with self._lock:
+            if key in self._refilling:
+                return None
+            self._refilling.add(key)
+        return self._executor.submit(self._refill, topic, key)
+
+    def _refill(self, topic, key):
+        try:
+            self.add(topic, self._generate(topic, self.refill_size))
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+
+# Create a singleton instance
+question_bank = QuestionBank()
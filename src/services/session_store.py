@@ -0,0 +1,278 @@
+# Server-side storage of player sessions, shared by all app processes
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlparse
+from config import (
+    SESSION_STORE,
+    SESSION_STORE_MAX_SESSIONS,
+    SESSION_STORE_PATH,
+    SESSION_STORE_URL,
+    SESSION_TTL,
+)
+
+
+class SessionStore(ABC):
+    """
+    Stores every session as a set of named byte strings (fields), so that a
+    change to one part of a session only rewrites that field.
+    """
+
+    @abstractmethod
+    def load(self, session_id):
+        """All fields of a session, or an empty dict if it is unknown or expired"""
+
+    @abstractmethod
+    def save(self, session_id, changed, removed=()):
+        """Write the changed fields ({name: bytes}) and delete the removed ones"""
+
+    @abstractmethod
+    def delete(self, session_id):
+        """Forget a session"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions in this process only, e.g. to restore a game after a page
+    reload. The least recently used sessions are evicted above max_sessions.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_STORE_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session id -> (updated, fields)
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0] <= time.time() - self.ttl:
+                return {}
+            self._sessions.move_to_end(session_id)
+            return dict(entry[1])
+
+    def save(self, session_id, changed, removed=()):
+        with self._lock:
+            _, fields = self._sessions.pop(session_id, (None, {}))
+            fields.update(changed)
+            for name in removed:
+                fields.pop(name, None)
+            self._sessions[session_id] = (time.time(), fields)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database, shared by the processes of one machine"""
+
+    def __init__(self, path=SESSION_STORE_PATH, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self):
+        """Open the database on first use"""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS session_fields ("
+                "session TEXT NOT NULL, name TEXT NOT NULL, value BLOB NOT NULL, "
+                "PRIMARY KEY (session, name))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session TEXT PRIMARY KEY, updated REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        return self._db
+
+    def load(self, session_id):
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT updated FROM sessions WHERE session = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[0] <= time.time() - self.ttl:
+                return {}
+            rows = db.execute(
+                "SELECT name, value FROM session_fields WHERE session = ?", (session_id,)
+            ).fetchall()
+            return {name: bytes(value) for name, value in rows}
+
+    def save(self, session_id, changed, removed=()):
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO session_fields (session, name, value) VALUES (?, ?, ?)",
+                    [(session_id, name, value) for name, value in changed.items()],
+                )
+                db.executemany(
+                    "DELETE FROM session_fields WHERE session = ? AND name = ?",
+                    [(session_id, name) for name in removed],
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO sessions (session, updated) VALUES (?, ?)",
+                    (session_id, now),
+                )
+                self._evict(db, now)
+
+    def _evict(self, db, now):
+        """Remove the expired sessions"""
+        expired = [
+            row[0] for row in db.execute(
+                "SELECT session FROM sessions WHERE updated <= ?", (now - self.ttl,)
+            )
+        ]
+        for session_id in expired:
+            self._delete(db, session_id)
+
+    def _delete(self, db, session_id):
+        db.execute("DELETE FROM session_fields WHERE session = ?", (session_id,))
+        db.execute("DELETE FROM sessions WHERE session = ?", (session_id,))
+
+    def delete(self, session_id):
+        with self._lock:
+            db = self._connection()
+            with db:
+                self._delete(db, session_id)
+
+
+class RedisError(Exception):
+    """Error reply of a Redis server"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in Redis (or anything speaking its protocol), shared by the
+    processes of all machines. Every session is a hash that expires after
+    `ttl` seconds without changes. Speaks RESP over a plain socket, so no
+    Redis client library is needed.
+    """
+
+    def __init__(self, url=SESSION_STORE_URL, ttl=SESSION_TTL, timeout=5.0, prefix="quiz:session:"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._socket = None
+        self._reader = None
+
+    def _connect(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._socket.makefile("rb")
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(setup)
+
+    def _close(self):
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = self._reader = None
+
+    @staticmethod
+    def _encode(command):
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            # Returned rather than raised, so the other replies are still read
+            return RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _send(self, commands):
+        """Send the commands in one round trip and return their replies"""
+        self._socket.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *commands):
+        """Run commands as a pipeline, reconnecting once if the connection dropped"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._connect()
+                    return self._send(commands)
+                except (ConnectionError, OSError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def load(self, session_id):
+        reply = self.execute(("HGETALL", self.prefix + session_id))[0] or []
+        return {reply[i].decode(): reply[i + 1] for i in range(0, len(reply), 2)}
+
+    def save(self, session_id, changed, removed=()):
+        key = self.prefix + session_id
+        commands = []
+        if changed:
+            commands.append(("HSET", key, *(
+                part for name, value in changed.items() for part in (name, value)
+            )))
+        if removed:
+            commands.append(("HDEL", key, *removed))
+        commands.append(("EXPIRE", key, int(self.ttl)))
+        self.execute(*commands)
+
+    def delete(self, session_id):
+        self.execute(("DEL", self.prefix + session_id))
+
+
+def create_session_store(kind=SESSION_STORE):
+    """The session store configured by SESSION_STORE"""
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session store: {kind}")
+
+
+# Create a singleton instance
+session_store = create_session_store()
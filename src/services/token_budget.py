@@ -0,0 +1,141 @@
+# Token budgets and accounting of Groq calls
+import contextvars
+import math
+import threading
+from config import GROQ_TOKEN_PRICES, MAX_COMPLETION_TOKENS
+from services.metrics import metrics
+
+# Rough size of a token, good enough for budgets of English prompts
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators of a chat message
+
+# Upper bounds of the per-quiz histograms
+TOKEN_BUCKETS = (500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+COST_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.05)
+
+# Account of the quiz that Groq calls are made for, see charge_to
+_account = contextvars.ContextVar("token_account", default=None)
+
+
+def estimate_tokens(text):
+    """Local estimate of the number of tokens of a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_prompt_tokens(messages):
+    return sum(
+        estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def truncate(text, max_tokens):
+    """Cut text to about max_tokens tokens, e.g. user input in a prompt"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def completion_budget(call, items=1):
+    """max_tokens for a kind of call, for `items` topics or questions"""
+    return MAX_COMPLETION_TOKENS[call] * items
+
+
+def cost(model, prompt_tokens, completion_tokens):
+    """Price in dollars of the tokens of a model, 0 if the price is unknown"""
+    prompt_price, completion_price = GROQ_TOKEN_PRICES.get(model, (0, 0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+class TokenAccount:
+    """
+    Tokens used by the Groq calls made for one quiz, per kind of call.
+    Calls are charged to the account set with charge_to, also from the
+    background threads started with submit.
+    """
+
+    FIELDS = ("requests", "estimated_prompt", "prompt", "completion", "truncated", "cost")
+
+    def __init__(self, calls=None):
+        self._lock = threading.Lock()
+        self.calls = calls or {}  # call -> {field: total}
+
+    def record(self, call, model, estimated_prompt, prompt, completion, truncated=False):
+        with self._lock:
+            totals = self.calls.setdefault(call, dict.fromkeys(self.FIELDS, 0))
+            totals["requests"] += 1
+            totals["estimated_prompt"] += estimated_prompt
+            totals["prompt"] += prompt
+            totals["completion"] += completion
+            totals["truncated"] += int(truncated)
+            totals["cost"] += cost(model, prompt, completion)
+
+    def totals(self):
+        """Totals over all calls"""
+        with self._lock:
+            return {
+                field: sum(totals[field] for totals in self.calls.values())
+                for field in self.FIELDS
+            }
+
+    def report(self):
+        """Rows of a cost report: one per kind of call and a total"""
+        with self._lock:
+            rows = [dict(call=call, **totals) for call, totals in sorted(self.calls.items())]
+        rows.append(dict(call="total", **self.totals()))
+        for row in rows:
+            row["cost"] = round(row["cost"], 6)
+        return rows
+
+    def to_dict(self):
+        with self._lock:
+            return {call: dict(totals) for call, totals in self.calls.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({call: dict(totals) for call, totals in data.items()})
+
+
+def charge_to(account):
+    """
+    Charge the Groq calls made by this thread, from now on, to the account.
+    Returns a token for contextvars reset.
+    """
+    return _account.set(account)
+
+
+def current_account():
+    return _account.get()
+
+
+def submit(executor, function, *args, **kwargs):
+    """executor.submit that keeps charging the caller's account"""
+    context = contextvars.copy_context()
+    return executor.submit(context.run, function, *args, **kwargs)
+
+
+def record_call(call, model, estimated_prompt, usage, finish_reason=None):
+    """
+    Account for a finished call: metrics per kind of call and the current
+    quiz's account. usage is the usage of the response, if any.
+    """
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    prompt = prompt if isinstance(prompt, int) else estimated_prompt
+    completion = completion if isinstance(completion, int) else 0
+    truncated = finish_reason == "length"
+
+    metrics.increment("groq_estimated_prompt_tokens_total", estimated_prompt, call=call)
+    if truncated:
+        # The completion hit max_tokens; the budget of this call may be too small
+        metrics.increment("groq_truncated_responses_total", call=call)
+    account = _account.get()
+    if account is not None:
+        account.record(call, model, estimated_prompt, prompt, completion, truncated)
+
+
+def record_quiz(account):
+    """Add the usage of a finished quiz to the per-quiz histograms"""
+    totals = account.totals()
+    for kind in ("prompt", "completion"):
+        metrics.observe("quiz_tokens", totals[kind], buckets=TOKEN_BUCKETS, type=kind)
+    metrics.observe("quiz_cost_dollars", totals["cost"], buckets=COST_BUCKETS)
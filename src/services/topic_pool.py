@@ -0,0 +1,126 @@
+# Process-wide pool of wheel topics
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DEFAULT_TOPICS,
+    TOPIC_POOL_MIN_SIZE,
+    TOPIC_POOL_REFILL_SIZE,
+    TOPIC_POOL_PATH,
+)
+from services.groq_service import generate_topics
+from services.metrics import metrics
+from services.question_bank import normalize_topic
+
+
+class TopicPool:
+    """
+    Keeps a stock of distinct generated topics that is shared by all
+    sessions, so a new session gets its wheel topics without waiting for
+    the Groq API. The pool is refilled in the background when it runs low
+    and can optionally be persisted to a JSON file.
+    """
+
+    def __init__(
+        self,
+        min_size=TOPIC_POOL_MIN_SIZE,
+        refill_size=TOPIC_POOL_REFILL_SIZE,
+        path=TOPIC_POOL_PATH,
+        generate=generate_topics,
+    ):
+        self.min_size = min_size
+        self.refill_size = refill_size
+        self.path = path
+        self.generate = generate
+
+        self._lock = threading.Lock()
+        self._topics = []
+        self._recent = deque(maxlen=4 * min_size)  # keys of topics handed out
+        self._refilling = False
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._load()
+
+    def _load(self):
+        """Read the persisted topics, if persistence is enabled"""
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as file:
+                    self.add(json.load(file), save=False)
+            except (OSError, ValueError):
+                pass
+
+    def _save(self):
+        if self.path:
+            with open(self.path, "w") as file:
+                json.dump(self._topics, file)
+
+    def add(self, topics, save=True):
+        """Add topics to the pool, skipping duplicates and recently used ones"""
+        with self._lock:
+            known = {normalize_topic(topic) for topic in self._topics}
+            known.update(self._recent)
+            for topic in topics:
+                key = normalize_topic(topic)
+                if key and key not in known:
+                    known.add(key)
+                    self._topics.append(topic)
+            metrics.set("topic_pool_topics", len(self._topics))
+            if save:
+                self._save()
+
+    def take(self, num_topics):
+        """
+        Hand out num_topics distinct topics right away. If the pool holds too
+        few, the rest is taken from DEFAULT_TOPICS. A background refill is
+        started when the pool runs low.
+        """
+        with self._lock:
+            count = min(num_topics, len(self._topics))
+            indices = set(random.sample(range(len(self._topics)), count))
+            topics = [self._topics[i] for i in indices]
+            self._topics = [t for i, t in enumerate(self._topics) if i not in indices]
+            self._recent.extend(normalize_topic(topic) for topic in topics)
+
+            if len(topics) < num_topics:
+                metrics.increment("topic_pool_fallbacks_total")
+                taken = {normalize_topic(topic) for topic in topics}
+                defaults = [t for t in DEFAULT_TOPICS if normalize_topic(t) not in taken]
+                topics += random.sample(defaults, min(num_topics - len(topics), len(defaults)))
+            metrics.set("topic_pool_topics", len(self._topics))
+            self._save()
+
+        if self.depth() < self.min_size:
+            self.refill()
+        return topics
+
+    def depth(self):
+        """Number of topics currently in the pool"""
+        with self._lock:
+            return len(self._topics)
+
+    def refill(self):
+        """Generate new topics in the background, unless a refill is running"""
+        with self._lock:
+            if self._refilling:
+                return None
+            self._refilling = True
+        return self._executor.submit(self._refill)
+
+    def _refill(self):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            self.add(self.generate(self.refill_size, keep_extra=True))
+            status = "ok"
+        finally:
+            metrics.observe("topic_pool_refill_duration_seconds", time.perf_counter() - start, status=status)
+            with self._lock:
+                self._refilling = False
+
+
+# Create a singleton instance
+topic_pool = TopicPool()
@@ -0,0 +1,189 @@
+# Cached custom topic validation with a local pre-classifier
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DEFAULT_TOPICS,
+    TOPIC_VALIDATION_WORKERS,
+    TOPIC_VERDICT_CACHE_SIZE,
+    TOPIC_VERDICT_TTL,
+)
+from services.groq_service import INVALID_TOPIC_MESSAGE, validate_topic
+from services.question_bank import normalize_topic
+from services.token_budget import submit
+
+_executor = ThreadPoolExecutor(max_workers=TOPIC_VALIDATION_WORKERS)
+
+# Words that are never a quiz topic on their own
+STOP_WORDS = {
+    "a", "about", "after", "again", "all", "also", "although", "an", "and", "any",
+    "are", "as", "at", "be", "because", "been", "before", "but", "by", "can",
+    "could", "do", "does", "for", "from", "had", "has", "have", "he", "her",
+    "here", "him", "his", "how", "i", "if", "in", "into", "is", "it", "its",
+    "just", "me", "my", "no", "not", "of", "on", "or", "our", "she", "so",
+    "some", "than", "that", "the", "their", "them", "then", "there", "these",
+    "they", "this", "those", "though", "to", "too", "under", "until", "up",
+    "us", "very", "was", "we", "were", "what", "when", "where", "which",
+    "while", "who", "why", "will", "with", "would", "yes", "yet", "you", "your",
+}
+
+# Runs of neighbouring keys, typical for keyboard mashing
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm")
+KEYBOARD_RUN_LENGTH = 5
+
+VOWELS = set("aeiouy")
+CONSONANT_RUN = re.compile(r"[bcdfghjklmnpqrstvwxz]{7,}")
+REPEATED_CHARACTER = re.compile(r"(\w)\1{3,}")
+
+
+def _has_keyboard_run(word):
+    for row in KEYBOARD_ROWS:
+        for i in range(len(row) - KEYBOARD_RUN_LENGTH + 1):
+            run = row[i:i + KEYBOARD_RUN_LENGTH]
+            if run in word or run[::-1] in word:
+                return True
+    return False
+
+
+def classify_locally(topic, known_topics=()):
+    """
+    Decide obvious cases without an API call.
+    Returns True for known topics, False for stop words and gibberish
+    (keyboard runs, long consonant runs, repeated characters, words without
+    vowels) and None when the Groq API has to decide. Words typed in capitals
+    are often acronyms ("HTTPS", "LGBTQ"), so their lack of vowels is left
+    to the API.
+    """
+    key = normalize_topic(topic)
+    if key in known_topics:
+        return True
+
+    words = key.split()
+    if not words or all(word in STOP_WORDS for word in words):
+        return False
+
+    acronyms = {word.lower() for word in re.findall(r"\w+", topic) if word.isupper()}
+    for word in words:
+        if not word.isalpha():
+            continue
+        if _has_keyboard_run(word) or REPEATED_CHARACTER.search(word):
+            return False
+        if word in acronyms:
+            continue
+        if CONSONANT_RUN.search(word) or len(word) >= 5 and not VOWELS & set(word):
+            return False
+    return None
+
+
+class TopicValidator:
+    """
+    Validates custom topics, remembering the verdict per normalized topic
+    so reruns and prefetches don't ask the Groq API again. Failed API calls
+    are not cached. API calls run on a background thread and are shared by
+    everyone validating the same topic meanwhile, so the script thread can
+    poll with check instead of waiting.
+    """
+
+    def __init__(
+        self,
+        known_topics=DEFAULT_TOPICS,
+        max_size=TOPIC_VERDICT_CACHE_SIZE,
+        ttl=TOPIC_VERDICT_TTL,
+        validate=validate_topic,
+    ):
+        self.known_topics = {normalize_topic(topic) for topic in known_topics}
+        self.max_size = max_size
+        self.ttl = ttl
+        self.validate_remotely = validate
+
+        self._lock = threading.Lock()
+        self._verdicts = OrderedDict()  # topic -> (is_valid, message, time)
+        self._pending = {}  # topic -> Future of the API call
+        self.stats = {"local": 0, "cached": 0, "remote": 0}
+
+    def validate(self, topic):
+        """
+        Validate a topic like groq_service.validate_topic, waiting for the
+        API if it has to decide
+        Returns: tuple (is_valid, message)
+        """
+        verdict = self._known(topic)
+        if verdict is not None:
+            return verdict
+        return self._result(topic, self._remote(topic))
+
+    def check(self, topic):
+        """
+        validate without waiting: the verdict if it is known, otherwise None
+        while the API decides in the background (see pending)
+        """
+        verdict = self._known(topic)
+        if verdict is not None:
+            return verdict
+        future = self._remote(topic)
+        return self._result(topic, future) if future.done() else None
+
+    def pending(self, topic):
+        """Whether the API is still deciding on the topic"""
+        with self._lock:
+            future = self._pending.get(normalize_topic(topic))
+        return future is not None and not future.done()
+
+    def _known(self, topic):
+        """The cached or obvious verdict, or None if the API has to decide"""
+        key = normalize_topic(topic)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict and time.time() - verdict[2] < self.ttl:
+                self._verdicts.move_to_end(key)
+                self.stats["cached"] += 1
+                return verdict[0], verdict[1]
+
+        local = classify_locally(topic, self.known_topics)
+        if local is None:
+            return None
+        result = (True, "") if local else (False, INVALID_TOPIC_MESSAGE)
+        with self._lock:
+            self.stats["local"] += 1
+        self._store(key, result)
+        return result
+
+    def _remote(self, topic):
+        """The API call for the topic, started unless one is in flight"""
+        key = normalize_topic(topic)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = submit(_executor, self._ask_api, topic, key)
+        return future
+
+    def _ask_api(self, topic, key):
+        result = self.validate_remotely(topic)
+        with self._lock:
+            self.stats["remote"] += 1
+        if result[0] or result[1] == INVALID_TOPIC_MESSAGE:
+            self._store(key, result)
+        # Otherwise an API error, asked again next time
+        return result
+
+    def _result(self, topic, future):
+        """The result of a finished API call, which is then forgotten"""
+        result = future.result()
+        key = normalize_topic(topic)
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._verdicts[key] = (result[0], result[1], time.time())
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_size:
+                self._verdicts.popitem(last=False)
+
+
+# Create a singleton instance
+topic_validator = TopicValidator()
@@ -0,0 +1,107 @@
+# Near-duplicate detection of questions
+import re
+from config import NEAR_DUPLICATE_THRESHOLD, SEEN_QUESTIONS_LIMIT
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Words that don't tell two questions apart
+STOP_WORDS = frozenset("""
+    a an the of in on at to for by with from and or as is are was were be been
+    being has have had do does did which what who whom whose when where why how
+    this that these those it its our your their there following one called
+    known name named
+""".split())
+
+
+def shingles(text):
+    """
+    Character trigrams of the meaningful words of a text, so that
+    rephrasings and different word forms still share most shingles
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    words = [word for word in words if word not in STOP_WORDS] or words
+    result = set()
+    for word in words:
+        padded = f" {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(a, b):
+    """Jaccard similarity of two shingle sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateFilter:
+    """
+    Remembers questions and tells whether a new one is a near-duplicate of
+    one of them: the same key, or a similar stem with a similar correct
+    answer. Both must be similar, so that e.g. the first and the second
+    president of a country are different questions.
+    """
+
+    def __init__(self, questions=(), threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._keys = {}  # key -> question
+        self._entries = []  # (question, stem shingles, answer shingles)
+        for question in questions:
+            self.add(question, check=False)
+
+    @staticmethod
+    def _signature(question):
+        return shingles(question.stem), shingles(question.options.get(question.correct, ""))
+
+    def duplicate_of(self, question):
+        """The remembered question that this one repeats, or None"""
+        if question.key in self._keys:
+            return self._keys[question.key]
+        stem, answer = self._signature(question)
+        for other, other_stem, other_answer in self._entries:
+            if similarity(answer, other_answer) >= self.threshold \
+                    and similarity(stem, other_stem) >= self.threshold:
+                return other
+        return None
+
+    def add(self, question, check=True):
+        """
+        Remember the question unless it is a duplicate (or has no text);
+        returns whether it was added
+        """
+        if check and (not question.key or self.duplicate_of(question) is not None):
+            return False
+        self._keys[question.key] = question
+        self._entries.append((question, *self._signature(question)))
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RecentKeys:
+    """
+    Set of the keys of the last `maxlen` questions a player had, in the
+    order they were seen; adding beyond maxlen forgets the oldest key
+    """
+
+    def __init__(self, keys=(), maxlen=SEEN_QUESTIONS_LIMIT):
+        self.maxlen = maxlen
+        self._keys = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        self._keys.pop(key, None)
+        self._keys[key] = None
+        if len(self._keys) > self.maxlen:
+            del self._keys[next(iter(self._keys))]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
@@ -1,22 +1,135 @@
 # Create and animate spinning wheel
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import numpy as np
+import math
 import random
 import time
 import streamlit as st
+from functools import lru_cache
+from html import escape
+from config import WHEEL_ANIMATION_MODE, WHEEL_SPIN_DURATION
+from services.metrics import metrics
+from utils.wheel_outcome import spin_angle
+
+WHEEL_SIZE = 400
+WHEEL_RADIUS = 190
+
+
+def rainbow(x):
+    """
+    RGBA color for x in [0, 1], the same formula as matplotlib's
+    "rainbow" colormap (purple - blue - green - yellow - red)
+    """
+    def clip(value):
+        return min(1.0, max(0.0, value))
+
+    return (
+        clip(abs(2 * x - 0.5)),
+        clip(math.sin(math.pi * x)),
+        clip(math.cos(math.pi * x / 2)),
+        1.0,
+    )
+
+
+@lru_cache(maxsize=32)
+def wheel_colors(num_segments):
+    """Segment colors, computed once per number of segments"""
+    if num_segments == 1:
+        return (rainbow(0.0),)
+    return tuple(rainbow(i / (num_segments - 1)) for i in range(num_segments))
+
+
+@lru_cache(maxsize=128)
+def wheel_svg(topics, num_segments):
+    """
+    Pre-render the wheel as SVG markup. The first segment starts at
+    12 o'clock and the segments go clockwise, like the Plotly pie.
+    Cached per (topics, num_segments), so topics must be a tuple.
+    """
+    center = WHEEL_SIZE / 2
+    segment_angle = 2 * math.pi / num_segments
+
+    def point(angle, radius):
+        return center + radius * math.sin(angle), center - radius * math.cos(angle)
+
+    segments = []
+    for i, (topic, color) in enumerate(zip(topics, wheel_colors(num_segments))):
+        start, end = i * segment_angle, (i + 1) * segment_angle
+        x0, y0 = point(start, WHEEL_RADIUS)
+        x1, y1 = point(end, WHEEL_RADIUS)
+        large_arc = 1 if end - start > math.pi else 0
+        fill = "rgb({:.0f},{:.0f},{:.0f})".format(*(255 * c for c in color[:3]))
+        segments.append(
+            f'<path d="M{center},{center} L{x0:.2f},{y0:.2f} '
+            f'A{WHEEL_RADIUS},{WHEEL_RADIUS} 0 {large_arc} 1 {x1:.2f},{y1:.2f} Z" '
+            f'fill="{fill}"/>'
+        )
+
+        # Label along the middle of the segment, reading outwards
+        middle = (start + end) / 2
+        tx, ty = point(middle, WHEEL_RADIUS * 0.6)
+        segments.append(
+            f'<text x="{tx:.2f}" y="{ty:.2f}" font-size="10" text-anchor="middle" '
+            f'dominant-baseline="middle" '
+            f'transform="rotate({math.degrees(middle) - 90:.2f} {tx:.2f} {ty:.2f})">'
+            f"{escape(str(topic))}</text>"
+        )
+
+    return "".join(segments)
 
 
 class SpinningWheel:
-    def __init__(self):
+    def __init__(self, mode=WHEEL_ANIMATION_MODE, rng=random):
+        """
+        mode "client" renders the wheel as SVG and lets the browser animate
+        the spin with CSS (one payload). mode "frames" sends a Plotly figure
+        per animation frame from the server. Pass a seeded random.Random as
+        rng to reproduce spins.
+        """
+        self.mode = mode
+        self.rng = rng
         self.plot_placeholder = None
+        self.topics = None
+        self.num_segments = None
+        self.final_angle = None
+
+
+    def create_final_angle(self, num_segments):
+        """Random final rotation that never ends on a segment border"""
+        return spin_angle(num_segments, self.rng)
+
+
+    def render_wheel_html(self, rotation=0, duration=0):
+        """The wheel as HTML, rotated clockwise by `rotation` degrees in `duration` seconds"""
+        center = WHEEL_SIZE / 2
+        segments = wheel_svg(tuple(self.topics), self.num_segments)
+        animation = ""
+        if duration:
+            # Same deceleration as the frames: 1 - (1 - t) ** 3
+            animation = (
+                f"<style>@keyframes wheel-spin-{rotation} "
+                f"{{from {{transform: rotate(0deg);}} to {{transform: rotate({rotation}deg);}}}}</style>"
+            )
+            style = (
+                f"transform: rotate({rotation}deg); transform-origin: {center}px {center}px; "
+                f"animation: wheel-spin-{rotation} {duration}s cubic-bezier(0.33, 1, 0.68, 1);"
+            )
+        else:
+            style = f"transform: rotate({rotation}deg); transform-origin: {center}px {center}px;"
+
+        return (
+            f'<div style="display: flex; justify-content: center;">'
+            f'<svg viewBox="0 -25 {WHEEL_SIZE} {WHEEL_SIZE + 25}" width="{WHEEL_SIZE}">'
+            f'<g style="{style}">{segments}</g>'
+            f'<polygon points="{center - 10},-22 {center + 10},-22 {center},0" fill="black"/>'
+            f"</svg></div>{animation}"
+        )
 
 
-    def create_frames_and_plot(self, values, num_segments):
+    @metrics.timed("wheel_duration_seconds", step="create_frames_and_plot")
+    def create_frames_and_plot(self, values, num_segments, max_rotation_angle=None):
         # Create the initial pie chart
         fig = go.Figure()
-        colors = plt.cm.rainbow(np.linspace(0, 1, num_segments))
-        colors = [tuple(c) for c in colors]
+        colors = list(wheel_colors(num_segments))
 
         # Add the initial pie chart
         fig.add_trace(
@@ -33,10 +146,9 @@ class SpinningWheel:
             )
         )
 
-        # Set the initial rotation angle
-        max_rotation_angle = (lambda x: x + 1 if x % (360 // num_segments) == 0 else x)(
-            random.randint(0, 1080) + 1080
-        )
+        # The spin's outcome is decided before any frame is built
+        if max_rotation_angle is None:
+            max_rotation_angle = self.create_final_angle(num_segments)
 
         # Create frames for the animation with a decelerating effect
         frames = []
@@ -85,16 +197,36 @@ class SpinningWheel:
 
 
     def initialize_wheel(self, topics, num_topics):
+        self.topics = topics
+        self.num_segments = num_topics
+        self.plot_placeholder = st.empty()
+        self.final_angle = self.create_final_angle(num_topics)
+
+        if self.mode == "client":
+            # No frames needed, the browser animates the pre-rendered wheel
+            self.plot_placeholder.html(self.render_wheel_html())
+            return None, self.final_angle
+
         # Create the animated plot
-        fig, frames, final_angle = self.create_frames_and_plot(topics, num_topics)
+        fig, frames, final_angle = self.create_frames_and_plot(
+            topics, num_topics, self.final_angle
+        )
         self.add_pointer_to_figure(fig)
         # Display the plotly figure
-        self.plot_placeholder = st.empty()
         self.plot_placeholder.plotly_chart(fig, config={"displayModeBar": False})
         return frames, final_angle
 
 
+    @metrics.timed("wheel_duration_seconds", step="animate_spin")
     def animate_spin(self, frames):
+        if self.mode == "client":
+            self.plot_placeholder.html(
+                self.render_wheel_html(self.final_angle, WHEEL_SPIN_DURATION)
+            )
+            # Keep the page until the browser has finished the animation
+            time.sleep(WHEEL_SPIN_DURATION)
+            return
+
         for frame in frames:
             fig = go.Figure(data=frame.data)
             self.add_pointer_to_figure(fig)
@@ -0,0 +1,14 @@
+# Elapsed time display that refreshes without rerunning the whole script
+import time
+import streamlit as st
+from config import TIMER_REFRESH_INTERVAL
+
+
+@st.fragment(run_every=TIMER_REFRESH_INTERVAL)
+def render_elapsed_time(start_time):
+    """
+    Show the time elapsed since start_time. Only this fragment is rerun
+    every TIMER_REFRESH_INTERVAL seconds, not the whole app.
+    """
+    elapsed_time = time.time() - start_time
+    st.write(f"Elapsed time: {elapsed_time:.1f} seconds")
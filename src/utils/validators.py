@@ -1,11 +1,25 @@
 # Input validation functions
 import streamlit as st
 import re
-from services.groq_service import validate_topic
+from config import TOPIC_CHECK_INTERVAL
+from services.topic_validator import topic_validator
 
 
-def get_valid_custom_topic():
-    """Get and validate topic input from user"""
+@st.fragment(run_every=TOPIC_CHECK_INTERVAL)
+def _rerun_when_checked(topic):
+    """Rerun the app once the verdict on the topic is in"""
+    if not topic_validator.pending(topic):
+        st.rerun()
+
+
+def get_valid_custom_topic(on_topic=None):
+    """
+    Get and validate topic input from user.
+    on_topic is called with the topic before the (slow) server-side
+    validation, e.g. to start prefetching the questions. That validation
+    runs in the background; until it is done None is returned and the app
+    is rerun when it is.
+    """
     topic = st.text_input("Enter your quiz topic:")
 
     if topic:
@@ -21,7 +35,15 @@ def get_valid_custom_topic():
             st.error("Topic cannot be just numbers or special characters.")
             return None
 
-        is_valid, message = validate_topic(topic)
+        if on_topic:
+            on_topic(topic)
+
+        verdict = topic_validator.check(topic)
+        if verdict is None:
+            st.caption("Checking the topic…")
+            _rerun_when_checked(topic)
+            return None
+        is_valid, message = verdict
 
         if is_valid:
             return topic
@@ -0,0 +1,44 @@
+# Outcome of a wheel spin, without rendering the wheel
+import random
+from dataclasses import dataclass
+
+# A spin turns the wheel clockwise by three to six full turns
+MIN_ROTATION = 1080
+MAX_ROTATION = 2160
+
+
+@dataclass(frozen=True, slots=True)
+class WheelOutcome:
+    angle: int  # clockwise rotation in degrees
+    segment: int  # index of the segment under the pointer
+
+
+def segment_at(angle, num_segments):
+    """
+    Index of the segment under the pointer (12 o'clock) after rotating the
+    wheel clockwise by `angle` degrees. Segment 0 starts at 12 o'clock and
+    the segments go clockwise, like the rendered wheel.
+    """
+    # The pointer now points at what was at -angle before the spin
+    position = (-angle) % 360
+    return int(position * num_segments // 360) % num_segments
+
+
+def spin_angle(num_segments, rng=random):
+    """Random final rotation that never ends on a segment border"""
+    angle = rng.randint(MIN_ROTATION, MAX_ROTATION)
+    if angle * num_segments % 360 == 0:
+        angle += 1
+    return angle
+
+
+def spin(num_segments, rng=None, seed=None):
+    """
+    Spin a wheel of num_segments segments. Pass a random.Random as rng, or
+    a seed, to reproduce a spin; spins with the same seed have the same
+    outcome.
+    """
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
+    angle = spin_angle(num_segments, rng)
+    return WheelOutcome(angle, segment_at(angle, num_segments))
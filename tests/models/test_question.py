@@ -0,0 +1,80 @@
+import pytest
+from models.question import Question
+
+
+def test_parse_question():
+    """Test that stem, options and answer are extracted from the text"""
+    question = Question.parse(
+        "1. What is Python?\n"
+        "A) A programming language\n"
+        "B) A snake\n"
+        "C) A type of fruit\n"
+        "D) A movie\n"
+        "Answer: A"
+    )
+
+    assert question.stem == "1. What is Python?"
+    assert question.options == {
+        "A": "A programming language",
+        "B": "A snake",
+        "C": "A type of fruit",
+        "D": "A movie",
+    }
+    assert question.correct == "A"
+    assert question.explanation is None
+
+
+def test_parse_question_with_explanation():
+    """Test that a markdown answer line and an explanation are recognized"""
+    question = Question.parse(
+        "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\n"
+        "**Answer:** B\nExplanation: Two plus two equals four."
+    )
+
+    assert question.correct == "B"
+    assert question.explanation == "Two plus two equals four."
+
+
+@pytest.mark.parametrize("text", [
+    "What is Python?\nA) A language\nB) A snake\nAnswer: A",
+    "What is Python?\nA) A language\nB) A snake\nC) A fruit\nD) A movie",
+    "A) A language\nB) A snake\nC) A fruit\nD) A movie\nAnswer: A",
+])
+def test_parse_invalid_question(text):
+    """Test that questions with missing parts are rejected"""
+    with pytest.raises(ValueError):
+        Question.parse(text)
+
+
+def test_text_contains_options():
+    """Test that the text representation lists all options"""
+    question = Question("What is Python?", {"A": "1", "B": "2", "C": "3", "D": "4"}, "A")
+
+    assert str(question) == "What is Python?\nA) 1\nB) 2\nC) 3\nD) 4"
+    assert Question.parse(question.text + "\nAnswer: A") == question
+
+
+def test_from_dict():
+    """Test building a question from a structured response"""
+    question = Question.from_dict({
+        "question": "What is Python?",
+        "options": {"A": "1", "B": "2", "C": "3", "D": "4"},
+        "answer": "c",
+    })
+
+    assert question.correct == "C"
+
+    with pytest.raises(ValueError):
+        Question.from_dict({"question": "What is Python?", "options": {"A": "1"}, "answer": "A"})
+
+
+def test_validate():
+    """Test that validate applies the format check of parse"""
+    Question.parse("What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: B").validate()
+
+    with pytest.raises(ValueError, match="four options"):
+        Question("Q?", {"A": "1", "B": "2", "C": "3"}, "A").validate()
+    with pytest.raises(ValueError, match="four options"):
+        Question("Q?", {"A": "1", "B": "2", "C": "3", "D": " "}, "A").validate()
+    with pytest.raises(ValueError, match="correct answer"):
+        Question("Q?", {"A": "1", "B": "2", "C": "3", "D": "4"}, "E").validate()
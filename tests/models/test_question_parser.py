@@ -0,0 +1,105 @@
+import pytest
+from models.question import Question
+from models.question_parser import parse_question
+
+OPTIONS = (("A", "3"), ("B", "4"), ("C", "5"), ("D", "22"))
+
+
+@pytest.mark.parametrize("text", [
+    "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: B",
+    "What is 2 + 2?\nA. 3\nB. 4\nC. 5\nD. 22\nAnswer: B",
+    "What is 2 + 2?\n(A) 3\n(B) 4\n(C) 5\n(D) 22\nCorrect answer: (B)",
+    "What is 2 + 2?\n- A) 3\n- B) 4\n- C) 5\n- D) 22\n\nThe correct answer is B",
+    "**Question 1:** What is 2 + 2?\n* **A)** 3\n* **B)** 4\n* **C)** 5\n* **D)** 22\n**Answer:** B) 4",
+    "What is 2 + 2?\n**A) 3**\n**B) 4**\n**C) 5**\n**D) 22**\nAnswer: b",
+    "What is 2 + 2? A) 3 B) 4 C) 5 D) 22\nAnswer: B",
+    "What is 2 + 2?\nA: 3\nB: 4\nC: 5\nD: 22\nAnswer: 4",
+])
+def test_option_and_answer_variants(text):
+    """Test the formats in which the LLM writes options and answers"""
+    assert parse_question(text) == ("What is 2 + 2?", OPTIONS, "B", None)
+
+
+def test_stem_starting_like_an_option():
+    """Test that only a run of options A to D counts as the options"""
+    stem, options, correct, _ = parse_question(
+        "A. Lincoln was president during which war?\n"
+        "A. Civil War\nB. World War I\nC. Korean War\nD. War of 1812\nAnswer: A"
+    )
+
+    assert stem == "A. Lincoln was president during which war?"
+    assert options[0] == ("A", "Civil War")
+    assert correct == "A"
+
+
+def test_explanation():
+    """Test that the explanation after the answer is kept"""
+    _, _, _, explanation = parse_question(
+        "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: B\n**Explanation:** Two and two is four."
+    )
+
+    assert explanation == "Two and two is four."
+
+
+@pytest.mark.parametrize("text", [
+    "What is 2 + 2?\nA) 3\nB) 4\nAnswer: A",
+    "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: a language",
+    "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: 7",
+    "Question:\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: A",
+])
+def test_incomplete_questions(text):
+    """Test that texts without options, answer or stem are rejected"""
+    with pytest.raises(ValueError):
+        parse_question(text)
+
+
+def test_parsed_once():
+    """Test that a repeated response is parsed once, into separate questions"""
+    text = "What is 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 22\nAnswer: B"
+    parse_question.cache_clear()
+
+    first = Question.parse(text)
+    second = Question.parse(text)
+    first.options["A"] = "changed"
+
+    assert parse_question.cache_info().hits == 1
+    assert second.options["A"] == "3"
+
+
+@pytest.mark.parametrize("options, answer, correct", [
+    (("Tolkien", "C. S. Lewis", "Rowling", "Pullman"), "C. S. Lewis", "B"),
+    (("D-Day", "Pearl Harbor", "Midway", "Dunkirk"), "D-Day", "A"),
+    (("D-Day", "Pearl Harbor", "Midway", "Dunkirk"), "D. Dunkirk", "D"),
+])
+def test_answer_text_starting_like_a_label(options, answer, correct):
+    """Test that an answer naming an option is not read as a label"""
+    text = "Which one?\n" + "\n".join(
+        f"{label}) {option}" for label, option in zip("ABCD", options)
+    )
+
+    assert parse_question(f"{text}\nAnswer: {answer}")[2] == correct
+    assert Question.from_dict({
+        "question": "Which one?", "options": dict(zip("ABCD", options)), "answer": answer,
+    }).correct == correct
+
+
+def test_unknown_answer_text_is_rejected():
+    """Test that an answer starting with a letter but naming no option is rejected"""
+    with pytest.raises(ValueError):
+        parse_question("Which one?\nA) D-Day\nB) Midway\nC) Dunkirk\nD) Normandy\nAnswer: D-Day landing")
+
+
+def test_preamble_is_dropped():
+    """Test that questions sharing a preamble keep their own stems and keys"""
+    first = Question.parse(
+        "Here is a multiple choice question about History:\n\n"
+        "Who was the first emperor of Rome?\nA) Augustus\nB) Nero\nC) Caesar\nD) Caligula\nAnswer: A"
+    )
+    second = Question.parse(
+        "Here is a multiple choice question about History:\n\n"
+        "In which year did the Western Roman Empire fall?\nA) 476\nB) 410\nC) 1453\nD) 800\nAnswer: A"
+    )
+
+    assert first.stem == "Who was the first emperor of Rome?"
+    assert second.stem == "In which year did the Western Roman Empire fall?"
+    assert first.key != second.key
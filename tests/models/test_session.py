@@ -1,7 +1,10 @@
 import pytest
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
-from models.session import SessionState
+from models.question import Question
+from config import QUIZ_HISTORY_SIZE
+from models.session import NUM_SEGMENTS, QuizSession, SessionState
 
 
 @pytest.fixture
@@ -14,84 +17,308 @@ def mock_streamlit_session():
 @pytest.fixture
 def mock_generate_functions():
     """Fixture to mock external generate functions"""
-    with patch('models.session.generate_topics') as mock_topics, \
-            patch('models.session.generate_questions') as mock_questions:
+    executor = ThreadPoolExecutor(max_workers=1)
+    with patch('models.session.topic_pool.take') as mock_topics, \
+            patch('services.prefetch.question_bank.get_questions') as mock_questions, \
+            patch('services.prefetch._executor', executor):
         mock_topics.return_value = ['Topic1', 'Topic2', 'Topic3']
         mock_questions.return_value = [
-            {'question': 'Q1', 'options': ['A', 'B', 'C'], 'correct_answer': 'A'},
-            {'question': 'Q2', 'options': ['X', 'Y', 'Z'], 'correct_answer': 'Y'}
+            Question('Q1', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'A'),
+            Question('Q2', {'A': 'W', 'B': 'X', 'C': 'Y', 'D': 'Z'}, 'C')
         ]
         yield mock_topics, mock_questions
+        # Let background fetches finish while the mocks are in place
+        executor.shutdown(wait=True)
 
 
 def test_initialize_sets_default_session_state(mock_streamlit_session, mock_generate_functions):
     """Test that initialize() sets all expected session state variables"""
-    SessionState.initialize()
-
-    # Check that all expected keys are set
-    expected_keys = [
-        'running', 'topic', 'num_topics', 'topics', 'custom_topic',
-        'current_question_idx', 'user_answers', 'correctness',
-        'explanations', 'is_sound_played', 'selected_options'
-    ]
-
-    for key in expected_keys:
-        assert key in st.session_state, f"{key} not initialized"
+    quiz = SessionState.initialize()
 
-    # Validate specific default values
-    assert st.session_state.running is False
-    assert st.session_state.topic is None
-    assert st.session_state.custom_topic is False
-    assert st.session_state.current_question_idx == 0
-    assert len(st.session_state.user_answers) == 0
-    assert len(st.session_state.correctness) == 0
-    assert isinstance(st.session_state.num_topics, int)
-    assert 3 <= st.session_state.num_topics <= 30
+    assert st.session_state.quiz is quiz
+    assert quiz.running is False
+    assert quiz.topic is None
+    assert quiz.custom_topic is False
+    assert quiz.current_question_idx == 0
+    assert len(quiz.answers) == 0
+    assert len(quiz.correctness) == 0
+    assert quiz.explanations == {}
+    assert quiz.topics == ('Topic1', 'Topic2', 'Topic3')
+    assert isinstance(quiz.num_topics, int)
+    assert 3 <= quiz.num_topics <= 30
 
 
-def test_initialize_uses_random_num_topics(mock_streamlit_session):
+def test_initialize_uses_random_num_topics(mock_streamlit_session, mock_generate_functions):
     """Test that num_topics is randomly selected from predefined segments"""
-    valid_segments = [3, 4, 5, 6, 8, 9, 10, 12, 15, 18, 20, 24, 30]
-
     SessionState.initialize()
 
-    assert st.session_state.num_topics in valid_segments
+    assert st.session_state.quiz.num_topics in NUM_SEGMENTS
 
 
 def test_start_game(mock_streamlit_session, mock_generate_functions):
-    """Test start_game() method sets questions and start time"""
+    """Test start_game() method starts the question feed and the timer"""
     # Simulate having a topic set
-    st.session_state.topic = 'Test Topic'
+    SessionState.initialize().topic = 'Test Topic'
 
     SessionState.start_game()
 
-    assert 'questions' in st.session_state
-    assert isinstance(st.session_state.questions, list)
-    assert 'start_time' in st.session_state
-    assert isinstance(st.session_state.start_time, float)
+    assert st.session_state.quiz.feed is not None
+    assert st.session_state.quiz.start_time > 0
+    assert SessionState.current_question().stem == 'Q1'
+    assert st.session_state.quiz.questions == (SessionState.current_question(),)
 
 
-def test_reset(mock_streamlit_session):
-    """Test reset() method clears all session state"""
-    # Populate session state with some dummy data
-    st.session_state.test_key = 'test_value'
-    st.session_state.another_key = 123
+def test_reset(mock_streamlit_session, mock_generate_functions):
+    """Test reset() method drops the game, so the next run starts a new one"""
+    SessionState.initialize()
 
     SessionState.reset()
 
-    # Verify session state is completely cleared
-    assert len(st.session_state.keys()) == 0
+    assert 'quiz' not in st.session_state
+    assert SessionState.initialize() is st.session_state.quiz
 
 
 def test_initialize_handles_repeated_calls(mock_streamlit_session, mock_generate_functions):
     """Test that repeated calls to initialize() don't cause errors"""
-    SessionState.initialize()
-    first_num_topics = st.session_state.num_topics
-    first_topics = st.session_state.topics
+    first = SessionState.initialize()
 
     # Call initialize again
-    SessionState.initialize()
+    assert SessionState.initialize() is first
+    mock_generate_functions[0].assert_called_once()
+
+
+def test_start_game_remembers_seen_questions(mock_streamlit_session, mock_generate_functions):
+    """Test that questions handed out are seen, passed to the bank and survive a reset"""
+    _, mock_questions = mock_generate_functions
+    SessionState.initialize().topic = 'Test Topic'
+
+    SessionState.start_game()
+    SessionState.current_question()
+    SessionState.reset()
+
+    assert set(st.session_state.seen_questions) == {'q1'}
+
+    SessionState.initialize().topic = 'Test Topic'
+    SessionState.start_game()
+    assert SessionState.current_question().stem == 'Q2'
+    assert {'q1'} in [call.kwargs['seen'] for call in mock_questions.call_args_list]
+
+
+def test_start_game_uses_prefetched_questions(mock_streamlit_session, mock_generate_functions):
+    """Test that the quiz starts with the questions prefetched for the topic"""
+    prefetched = [Question('P1', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'B')]
+    quiz = SessionState.initialize()
+
+    with patch('models.session.prefetch_questions') as mock_prefetch:
+        mock_prefetch.return_value.result.return_value = prefetched
+        SessionState.prefetch('Test Topic')
+        SessionState.prefetch('Test Topic')
+
+    quiz.topic = 'Test Topic'
+    SessionState.start_game()
+
+    mock_prefetch.assert_called_once()
+    assert SessionState.current_question() == prefetched[0]
+    assert quiz.prefetch is None
+
+
+def test_start_game_ignores_prefetch_for_other_topic(mock_streamlit_session, mock_generate_functions):
+    """Test that a prefetch for a different topic is not used"""
+    _, mock_questions = mock_generate_functions
+    quiz = SessionState.initialize()
+
+    with patch('models.session.prefetch_questions'):
+        SessionState.prefetch('Other Topic')
+
+    quiz.topic = 'Test Topic'
+    SessionState.start_game()
+    SessionState.current_question()
+
+    assert mock_questions.call_args_list[0].args[0] == 'Test Topic'
+
+
+def test_leaving_a_game_cancels_its_fetching(mock_streamlit_session, mock_generate_functions):
+    """Test that prefetches for another topic and a reset game stop generating"""
+    quiz = SessionState.initialize()
+
+    with patch('models.session.prefetch_questions'):
+        SessionState.prefetch('Other Topic')
+        first_scope = quiz.prefetch[2]
+        SessionState.prefetch('Test Topic')
+
+    assert first_scope.cancelled
+    quiz.topic = 'Test Topic'
+    SessionState.start_game()
+    SessionState.reset()
+
+    assert quiz.feed._scope.cancelled
+    assert "quiz" not in st.session_state
+
+
+@pytest.mark.parametrize("policy, expected_calls", [("lazy", 0), ("background", 1), ("batch", 1)])
+def test_start_game_explanation_policy(mock_streamlit_session, mock_generate_functions,
+                                       policy, expected_calls):
+    """Test that explanations are pregenerated unless the policy is lazy"""
+    SessionState.initialize().topic = 'Test Topic'
+
+    with patch('models.session.EXPLANATION_POLICY', policy), \
+            patch('models.session.pregenerate_explanations') as mock_pregenerate:
+        SessionState.start_game()
+        SessionState.current_question()
+
+    assert mock_pregenerate.call_count == expected_calls
+
+
+def test_start_game_interns_questions(mock_streamlit_session, mock_generate_functions):
+    """Test that sessions playing the same question share one instance"""
+    _, mock_questions = mock_generate_functions
+    SessionState.initialize().topic = 'Test Topic'
+    SessionState.start_game()
+    first = SessionState.current_question()
+
+    st.session_state.clear()
+    mock_questions.return_value = [Question(first.stem, dict(first.options), first.correct)]
+    SessionState.initialize().topic = 'Test Topic'
+    SessionState.start_game()
+
+    assert SessionState.current_question() is first
+
+
+def test_quiz_session_answers():
+    """Test that answers and their correctness are stored per question"""
+    quiz = QuizSession(num_topics=3, topics=('A', 'B', 'C'), length=2)
+    quiz.questions = (
+        Question('Q1', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'A'),
+        Question('Q2', {'A': 'W', 'B': 'X', 'C': 'Y', 'D': 'Z'}, 'C'),
+    )
+
+    quiz.record_answer('A', True)
+    assert quiz.current_question_idx == 1
+    assert not quiz.finished
+    quiz.record_answer('D', False)
+
+    assert quiz.finished
+    assert [quiz.user_answer(i) for i in range(2)] == ['A', 'D']
+    assert [quiz.is_correct(i) for i in range(2)] == [True, False]
+    assert quiz.correct_count == 1
+
+
+def test_quiz_session_fields_round_trip():
+    """Test that a stored session is rebuilt with its answers and explanations"""
+    quiz = QuizSession(num_topics=3, topics=('A', 'B', 'C'), running=True, topic='A')
+    quiz.questions = (
+        Question('Q1', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'A'),
+        Question('Q2', {'A': 'W', 'B': 'X', 'C': 'Y', 'D': 'Z'}, 'C'),
+    )
+    quiz.record_answer('B', False)
+    quiz.explanations = {0: 'Because.', 1: object()}  # the second is still streaming
+    quiz.tokens.record('questions', 'llama3-8b-8192', 120, 110, 900)
+
+    restored = QuizSession.from_fields(quiz.to_fields())
+
+    assert restored.questions == quiz.questions
+    assert restored.user_answer(0) == 'B'
+    assert not restored.is_correct(0)
+    assert restored.explanations == {0: 'Because.'}
+    assert (restored.running, restored.topic, restored.topics) == (True, 'A', ('A', 'B', 'C'))
+    assert restored.tokens.totals() == quiz.tokens.totals()
+
+
+def test_sync_writes_changed_fields_only(mock_streamlit_session, mock_generate_functions):
+    """Test that a sync after an answer doesn't rewrite the questions"""
+    with patch('models.session.session_store') as mock_store:
+        mock_store.load.return_value = {}
+        SessionState.initialize().topic = 'Test Topic'
+        SessionState.start_game()
+        SessionState.current_question()
+        SessionState.sync()
+        assert 'questions' in mock_store.save.call_args.args[1]
+
+        st.session_state.quiz.record_answer('A', True)
+        SessionState.sync()
+        changed = mock_store.save.call_args.args[1]
+        assert set(changed) == {'answers', 'correctness'}
+
+        SessionState.sync()
+        assert mock_store.save.call_count == 2
+
+
+def test_initialize_restores_stored_session(mock_streamlit_session, mock_generate_functions):
+    """Test that a game continues in a new process after a restart"""
+    with patch('models.session.session_store') as mock_store:
+        mock_store.load.return_value = {}
+        SessionState.initialize().topic = 'Test Topic'
+        SessionState.start_game()
+        SessionState.current_question()
+        st.session_state.quiz.record_answer('C', False)
+        SessionState.sync()
+        stored = mock_store.save.call_args.args[1]
+
+        # A new process: empty session state, same session id in the URL
+        st.session_state.clear()
+        mock_generate_functions[0].reset_mock()
+        mock_store.load.return_value = stored
+        quiz = SessionState.initialize()
+
+    assert quiz.topic == 'Test Topic'
+    assert quiz.current_question_idx == 1
+    assert set(st.session_state.seen_questions) == {'q1'}
+    mock_generate_functions[0].assert_not_called()
+
+
+def test_initialize_survives_failing_store(mock_streamlit_session, mock_generate_functions):
+    """Test that a new game starts when the stored session can't be loaded"""
+    with patch('models.session.session_store') as mock_store:
+        mock_store.load.side_effect = ConnectionError("store is down")
+        quiz = SessionState.initialize()
+
+    assert quiz.topics == ('Topic1', 'Topic2', 'Topic3')
+    assert st.session_state.synced == {}
+
+
+def test_reset_removes_stored_game(mock_streamlit_session, mock_generate_functions):
+    """Test that the stored game is removed on reset, keeping the seen questions"""
+    with patch('models.session.session_store') as mock_store:
+        mock_store.load.return_value = {}
+        SessionState.initialize()
+        SessionState.sync()
+        SessionState.reset()
+        SessionState.sync()
+
+    changed, removed = mock_store.save.call_args.args[1:]
+    assert changed == {}
+    assert 'meta' in removed and 'seen' not in removed
+
+
+def test_quiz_session_keeps_bounded_history():
+    """Test that a long quiz only keeps the most recent questions"""
+    quiz = QuizSession(num_topics=3, topics=('A', 'B', 'C'), length=0)
+    for i in range(25):
+        quiz.add_question(Question(f'Q{i}', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'A'))
+        quiz.explanations[i] = 'Because.'
+        quiz.record_answer('A' if i % 2 else 'B', bool(i % 2))
+
+    assert quiz.current_question_idx == 25
+    assert quiz.correct_count == 12
+    assert not quiz.finished
+    assert len(quiz.questions) == len(quiz.answers) == QUIZ_HISTORY_SIZE
+    assert list(quiz.history) == list(range(25 - QUIZ_HISTORY_SIZE, 25))
+    assert quiz.question(24).stem == 'Q24'
+    assert quiz.user_answer(24) == 'B'
+    assert min(quiz.explanations) == 25 - QUIZ_HISTORY_SIZE
+
+
+def test_endless_quiz_ends_when_questions_run_out(mock_streamlit_session, mock_generate_functions):
+    """Test that the quiz ends when the feed has no more questions"""
+    quiz = SessionState.initialize()
+    quiz.topic = 'Test Topic'
+    quiz.length = 0
+    SessionState.start_game()
+
+    for _ in range(2):
+        assert SessionState.current_question() is not None
+        quiz.record_answer('A', True)
 
-    # Verify state remains consistent
-    assert st.session_state.num_topics == first_num_topics
-    assert st.session_state.topics == first_topics
\ No newline at end of file
+    assert SessionState.current_question() is None
+    assert quiz.finished
+    assert quiz.current_question_idx == 2
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from services import async_groq_service
+
+QUESTIONS = {
+    "1": "What is Python?\nA) A language\nB) A snake\nC) A fruit\nD) A movie\nAnswer: A",
+    "2": "Who created Rust?\nA) Guido\nB) Graydon Hoare\nC) Linus\nD) Bjarne\nAnswer: B",
+    "3": "When was C released?\nA) 1960\nB) 1965\nC) 1972\nD) 1990\nAnswer: C",
+}
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits():
+    """Keep the shared client's token buckets for the other tests"""
+    with patch('services.async_groq_service.groq_client.buckets', {}):
+        yield
+
+
+def _mock_completion(content):
+    """Build an object shaped like a Groq chat completion"""
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    return completion
+
+
+def _mock_async_client(create):
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=create)
+    return client
+
+
+def test_concurrent_questions_are_requested_together():
+    """Test that concurrent mode has all question requests in flight at once"""
+    in_flight = []
+    peak = 0
+
+    async def create(**kwargs):
+        nonlocal peak
+        in_flight.append(kwargs)
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.remove(kwargs)
+        number = kwargs["messages"][0]["content"].split("This is question ")[1][0]
+        return _mock_completion(QUESTIONS[number])
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client(create)):
+        questions = asyncio.run(async_groq_service.generate_questions("Python", 3, mode="concurrent"))
+
+    assert peak == 3
+    assert [question.stem for question in questions] == [
+        "What is Python?", "Who created Rust?", "When was C released?",
+    ]
+
+
+def test_cancelling_the_task_aborts_the_requests():
+    """Test that cancelling generation cancels the requests in flight"""
+    started, aborted = asyncio.Event(), []
+
+    async def create(**kwargs):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            aborted.append(kwargs)
+            raise
+
+    async def generate_and_cancel():
+        task = asyncio.create_task(async_groq_service.generate_questions("Python", 2, mode="concurrent"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client(create)):
+        asyncio.run(generate_and_cancel())
+
+    assert len(aborted) == 2
+
+
+def test_streamed_explanation_is_an_async_generator():
+    """Test that a streamed explanation yields its pieces asynchronously"""
+    async def chunks():
+        for content in ["Python ", "rocks."]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = content
+            yield chunk
+
+    async def explain():
+        pieces = await async_groq_service.get_explanation("What is Python?", "A", stream=True)
+        return [piece async for piece in pieces]
+
+    async def create(**kwargs):
+        return chunks()
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client(create)):
+        assert asyncio.run(explain()) == ["Python ", "rocks."]
@@ -1,6 +1,13 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from services.audio_service import AudioService, AUDIO_PATHS
+from services.audio_service import (
+    AudioService,
+    AUDIO_PATHS,
+    BrowserAudioBackend,
+    NullAudioBackend,
+    PygameAudioBackend,
+    create_audio_backend,
+)
 
 
 @pytest.fixture
@@ -10,68 +17,108 @@ def mock_mixer():
         yield mock_mixer
 
 
-def test_audio_service_initialization(mock_mixer):
-    """Test that AudioService correctly initializes mixer"""
-    audio_service = AudioService()
-    mock_mixer.init.assert_called_once()
+@pytest.fixture
+def pygame_audio(mock_mixer):
+    """AudioService playing through a (mocked) pygame mixer"""
+    return AudioService(PygameAudioBackend())
 
 
-def test_load_sounds(mock_mixer):
-    """Test that _load_sounds method loads all sounds from AUDIO_PATHS"""
-    # Create a mock Sound object that can be compared
-    mock_sound = MagicMock()
-    mock_mixer.Sound.return_value = mock_sound
+def test_audio_service_initialization(mock_mixer, pygame_audio):
+    """Test that the mixer is initialized on first use only"""
+    mock_mixer.init.assert_not_called()
+
+    pygame_audio.play_sound('play')
+    pygame_audio.play_sound('spin')
+    mock_mixer.init.assert_called_once()
+    mock_mixer.set_num_channels.assert_called_once_with(pygame_audio.backend.channels)
 
-    # Create AudioService which will call _load_sounds
-    audio_service = AudioService()
 
-    # Verify mixer.Sound was called for each path
-    assert len(audio_service.sounds) == len(AUDIO_PATHS)
+def test_sounds_are_decoded_lazily(mock_mixer, pygame_audio):
+    """Test that a sound is decoded the first time it is played, once"""
+    pygame_audio.play_sound('play')
+    pygame_audio.play_sound('play')
 
-    # Check that each sound in AUDIO_PATHS was loaded
-    for name, path in AUDIO_PATHS.items():
-        assert name in audio_service.sounds
-        mock_mixer.Sound.assert_any_call(path)
+    mock_mixer.Sound.assert_called_once_with(AUDIO_PATHS['play'])
+    assert list(pygame_audio.backend.sounds) == ['play']
 
 
-def test_play_sound_existing(mock_mixer):
-    """Test playing an existing sound"""
-    # Create a mock Sound object
+def test_play_sound_existing(mock_mixer, pygame_audio):
+    """Test that a sound is played on a free channel without blocking"""
     mock_sound = MagicMock()
     mock_mixer.Sound.return_value = mock_sound
 
-    # Create AudioService
-    audio_service = AudioService()
-    sound_name = 'play'
+    pygame_audio.play_sound('play')
 
-    # Play the sound
-    audio_service.play_sound(sound_name)
+    mock_mixer.find_channel.assert_called_once_with(True)
+    mock_mixer.find_channel.return_value.play.assert_called_once_with(mock_sound)
 
-    # Verify the specific sound was played
-    audio_service.sounds[sound_name].play.assert_called_once()
 
-
-def test_play_sound_nonexistent(mock_mixer):
+def test_play_sound_nonexistent(mock_mixer, pygame_audio):
     """Test playing a non-existent sound does not raise an error"""
-    # Create AudioService
-    audio_service = AudioService()
+    pygame_audio.play_sound('nonexistent_sound')
 
-    # Attempt to play non-existent sound
-    audio_service.play_sound('nonexistent_sound')
-    # Should not raise any exceptions
+    mock_mixer.Sound.assert_not_called()
+    mock_mixer.find_channel.assert_not_called()
 
 
-@pytest.mark.parametrize("sound_name", list(AUDIO_PATHS.keys()))
-def test_all_sounds_playable(mock_mixer, sound_name):
-    """Verify that all sounds in AUDIO_PATHS can be played without error"""
-    # Create a mock Sound object
-    mock_sound = MagicMock()
-    mock_mixer.Sound.return_value = mock_sound
+def test_play_sound_without_audio_device(mock_mixer, pygame_audio):
+    """Test that sounds are skipped when the mixer cannot be initialized"""
+    mock_mixer.init.side_effect = RuntimeError("No available audio device")
 
-    # Create AudioService
-    audio_service = AudioService()
+    pygame_audio.play_sound('play')
+    pygame_audio.play_sound('spin')
 
+    mock_mixer.init.assert_called_once()
+    mock_mixer.Sound.assert_not_called()
+
+
+@pytest.mark.parametrize("sound_name", list(AUDIO_PATHS.keys()))
+def test_all_sounds_playable(mock_mixer, pygame_audio, sound_name):
+    """Verify that all sounds in AUDIO_PATHS can be played without error"""
     try:
-        audio_service.play_sound(sound_name)
+        pygame_audio.play_sound(sound_name)
     except Exception as e:
-        pytest.fail(f"Sound {sound_name} could not be played: {e}")
\ No newline at end of file
+        pytest.fail(f"Sound {sound_name} could not be played: {e}")
+
+
+def test_null_backend(mock_mixer):
+    """Test that the null backend doesn't touch the mixer"""
+    AudioService(NullAudioBackend()).play_sound('play')
+
+    mock_mixer.init.assert_not_called()
+
+
+def test_browser_backend_sends_each_sound_once(tmp_path):
+    """Test that a sound's data goes to the browser only the first time"""
+    path = tmp_path / "play.mp3"
+    path.write_bytes(b"ID3 mp3 data")
+    audio_service = AudioService(BrowserAudioBackend(paths={'play': str(path)}))
+
+    with patch('services.audio_service.st') as mock_st:
+        mock_st.session_state = {}
+        audio_service.play_sound('play')
+        audio_service.play_sound('play')
+        audio_service.play_sound('nonexistent_sound')
+
+    first, second = [call.args[0] for call in mock_st.html.call_args_list]
+    assert "data:audio/mpeg;base64,SUQzIG1wMyBkYXRh" in first
+    assert "base64" not in second
+
+
+def test_browser_backend_asset_url():
+    """Test that with an asset URL the browser loads the file itself"""
+    backend = BrowserAudioBackend(asset_url="app/static/audio/{file}")
+
+    with patch('services.audio_service.st') as mock_st:
+        mock_st.session_state = {}
+        backend.play('spin')
+
+    assert '"app/static/audio/spin.mp3"' in mock_st.html.call_args.args[0]
+
+
+def test_create_audio_backend():
+    """Test that unknown backends are rejected"""
+    assert isinstance(create_audio_backend("none"), NullAudioBackend)
+    assert isinstance(create_audio_backend("pygame"), PygameAudioBackend)
+    with pytest.raises(ValueError):
+        create_audio_backend("alsa")
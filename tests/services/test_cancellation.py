@@ -0,0 +1,42 @@
+import threading
+import time
+import pytest
+from services.cancellation import CancelScope, Cancelled, check_cancelled, current_scope, sleep
+
+
+def test_run_sets_the_current_scope():
+    """Test that the scope is current only while its work runs"""
+    scope = CancelScope()
+
+    assert scope.run(current_scope) is scope
+    assert current_scope() is None
+    check_cancelled()
+
+
+def test_cancel_interrupts_sleep():
+    """Test that a cancelled scope ends its sleeps early"""
+    scope = CancelScope()
+    threading.Timer(0.05, scope.cancel).start()
+
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        scope.run(sleep, 5)
+
+    assert time.monotonic() - start < 1
+    with pytest.raises(Cancelled):
+        scope.run(check_cancelled)
+
+
+def test_on_cancel_callbacks():
+    """Test that callbacks run once on cancellation, unless removed"""
+    scope = CancelScope()
+    called = []
+    scope.on_cancel(lambda: called.append("kept"))
+    remove = scope.on_cancel(lambda: called.append("removed"))
+    remove()
+
+    scope.cancel()
+    scope.cancel()
+    scope.on_cancel(lambda: called.append("late"))
+
+    assert called == ["kept", "late"]
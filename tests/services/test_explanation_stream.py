@@ -0,0 +1,69 @@
+import time
+from unittest.mock import patch
+from models.question import Question
+from services.explanation_stream import (
+    ExplanationStream,
+    pregenerate_explanations,
+    start_explanation,
+)
+
+
+def test_consume_collects_text():
+    """Test that the stream collects all pieces and is marked done"""
+    explanation = ExplanationStream()
+
+    explanation.consume(iter([" Python ", "is a ", "language. "]))
+
+    assert explanation.done
+    assert explanation.error is None
+    assert explanation.text == "Python is a language."
+
+
+def test_consume_records_errors():
+    """Test that an error ends the stream with the text received so far"""
+    def failing_chunks():
+        yield "Python"
+        raise ConnectionError("lost")
+
+    explanation = ExplanationStream()
+    explanation.consume(failing_chunks())
+
+    assert explanation.done
+    assert isinstance(explanation.error, ConnectionError)
+    assert explanation.text == "Python"
+
+
+def test_start_explanation_runs_in_background():
+    """Test that start_explanation returns before the explanation is complete"""
+    def slow_explanation(question, correct_answer, stream):
+        yield "Because "
+        time.sleep(0.2)
+        yield "it is."
+
+    with patch('services.explanation_stream.get_explanation', side_effect=slow_explanation):
+        explanation = start_explanation("Question", "A")
+
+        assert not explanation.done
+        for _ in range(50):
+            if explanation.done:
+                break
+            time.sleep(0.02)
+
+    assert explanation.text == "Because it is."
+
+
+def test_pregenerate_explanations():
+    """Test that short explanations are added to questions without one"""
+    questions = [
+        Question("Q1?", {"A": "1", "B": "2", "C": "3", "D": "4"}, "A"),
+        Question("Q2?", {"A": "1", "B": "2", "C": "3", "D": "4"}, "B", "Given."),
+    ]
+
+    with patch('services.explanation_stream.get_explanation', return_value="Short.") as mock_get:
+        futures = pregenerate_explanations(questions)
+        for future in futures:
+            future.result(timeout=5)
+
+    assert len(futures) == 1
+    mock_get.assert_called_once_with(questions[0], "A", short=True)
+    assert [q.explanation for q in questions] == ["Short.", "Given."]
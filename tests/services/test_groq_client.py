@@ -0,0 +1,241 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.cancellation import CancelScope, Cancelled
+from services.groq_client import GroqClient, TokenBucket
+from services.token_budget import TokenAccount, charge_to
+
+
+class StatusError(Exception):
+    """Exception shaped like a groq.APIStatusError"""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock()
+        self.response.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+@pytest.fixture
+def client():
+    return GroqClient(
+        client=MagicMock(), async_client=MagicMock(), rate_limits={}, backoff=0.001, max_retries=2
+    )
+
+
+def test_create_passes_timeout(client):
+    """Test that requests get the default timeout"""
+    client.create(model="llama3-8b-8192", messages=[])
+
+    kwargs = client.client.chat.completions.create.call_args.kwargs
+    assert kwargs["timeout"] == client.timeout
+
+
+def test_retries_rate_limited_requests(client):
+    """Test that 429 and 5xx responses are retried"""
+    create = client.client.chat.completions.create
+    create.side_effect = [StatusError(429), StatusError(503), "response"]
+
+    assert client.create(model="llama3-8b-8192", messages=[]) == "response"
+    assert create.call_count == 3
+
+
+def test_gives_up_after_max_retries(client):
+    """Test that the last error is raised when retries are exhausted"""
+    client.client.chat.completions.create.side_effect = StatusError(429)
+
+    with pytest.raises(StatusError):
+        client.create(model="llama3-8b-8192", messages=[])
+    assert client.client.chat.completions.create.call_count == 3
+
+
+def test_does_not_retry_client_errors(client):
+    """Test that errors like a bad request are raised right away"""
+    client.client.chat.completions.create.side_effect = StatusError(400)
+
+    with pytest.raises(StatusError):
+        client.create(model="llama3-8b-8192", messages=[])
+    assert client.client.chat.completions.create.call_count == 1
+
+
+def test_respects_retry_after(client):
+    """Test that the Retry-After header sets the minimum delay"""
+    client.client.chat.completions.create.side_effect = [StatusError(429, "2"), "response"]
+
+    with patch('services.groq_client.time.sleep') as mock_sleep:
+        client.create(model="llama3-8b-8192", messages=[])
+
+    assert mock_sleep.call_args.args[0] >= 2
+
+
+def test_coalesces_identical_requests(client):
+    """Test that identical requests in flight share one API call"""
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        release.wait(5)
+        return "response"
+
+    client.client.chat.completions.create.side_effect = slow_create
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            client.create(model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}])
+        ))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["response"] * 3
+    assert client.client.chat.completions.create.call_count == 1
+
+
+def test_coalesced_requests_are_charged_once(client):
+    """Test that a shared response is charged to the account of its sender only"""
+    started, release = threading.Event(), threading.Event()
+    response = MagicMock()
+    response.usage.prompt_tokens, response.usage.completion_tokens = 10, 5
+
+    def create(**kwargs):
+        started.set()
+        release.wait(5)
+        return response
+
+    client.client.chat.completions.create.side_effect = create
+    kwargs = dict(model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}])
+    accounts = [TokenAccount(), TokenAccount()]
+
+    def charged_create(account):
+        charge_to(account)
+        client.create("question", **kwargs)
+
+    threads = [threading.Thread(target=charged_create, args=(account,)) for account in accounts]
+    threads[0].start()
+    started.wait(5)
+    threads[1].start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert accounts[0].totals()["prompt"] == 10
+    assert accounts[1].totals()["requests"] == 0
+
+
+def test_acreate_retries_rate_limited_requests(client):
+    """Test that asyncio requests are retried like the others"""
+    create = client.async_client.chat.completions.create = AsyncMock(
+        side_effect=[StatusError(429), StatusError(503), "response"]
+    )
+
+    assert asyncio.run(client.acreate(model="llama3-8b-8192", messages=[])) == "response"
+    assert create.call_count == 3
+    assert create.call_args.kwargs["timeout"] == client.timeout
+
+
+def test_acreate_shares_requests_with_create(client):
+    """Test that an asyncio request joins an identical blocking one in flight"""
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        release.wait(5)
+        return "response"
+
+    client.client.chat.completions.create.side_effect = slow_create
+    client.async_client.chat.completions.create = AsyncMock()
+    kwargs = dict(model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}])
+    results = []
+    owner = threading.Thread(target=lambda: results.append(client.create(**kwargs)))
+    owner.start()
+    time.sleep(0.1)
+
+    async def join():
+        asyncio.get_running_loop().call_later(0.1, release.set)
+        return await client.acreate(**kwargs)
+
+    results.append(asyncio.run(join()))
+    owner.join()
+
+    assert results == ["response"] * 2
+    client.async_client.chat.completions.create.assert_not_called()
+
+
+def test_cancelled_work_makes_no_requests(client):
+    """Test that requests and retries stop once the work is cancelled"""
+    scope = CancelScope()
+    scope.cancel()
+
+    with pytest.raises(Cancelled):
+        scope.run(client.create, model="llama3-8b-8192", messages=[])
+
+    client.client.chat.completions.create.assert_not_called()
+
+
+def test_cancellation_of_owner_does_not_fail_shared_request(client):
+    """Test that a request shared with cancelled work is made again"""
+    started, release = threading.Event(), threading.Event()
+    responses = iter([StatusError(503), "response"])
+
+    def create(**kwargs):
+        started.set()
+        release.wait(5)
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client.client.chat.completions.create.side_effect = create
+    scope = CancelScope()
+    kwargs = dict(model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}])
+    owner = threading.Thread(target=lambda: pytest.raises(Cancelled, scope.run, client.create, **kwargs))
+    owner.start()
+    started.wait(5)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(client.create(**kwargs)))
+    waiter.start()
+    time.sleep(0.1)
+    scope.cancel()
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert results == ["response"]
+    assert client.client.chat.completions.create.call_count == 2
+
+
+def test_token_bucket_limits_rate():
+    """Test that the bucket allows a burst and then waits"""
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_records_request_metrics(client):
+    """Test that requests, retries, errors and tokens are recorded per model"""
+    response = MagicMock()
+    response.usage.prompt_tokens = 12
+    response.usage.completion_tokens = 30
+    client.client.chat.completions.create.side_effect = [StatusError(503), response]
+
+    with patch('services.groq_client.metrics') as mock_metrics:
+        client.create(model="llama3-8b-8192", messages=[])
+
+    increments = [call.args + tuple(sorted(call.kwargs.items()))
+                  for call in mock_metrics.increment.call_args_list]
+    assert ("groq_requests_total", ("model", "llama3-8b-8192"), ("status", "error")) in increments
+    assert ("groq_retries_total", ("model", "llama3-8b-8192")) in increments
+    assert ("groq_requests_total", ("model", "llama3-8b-8192"), ("status", "ok")) in increments
+    assert ("groq_tokens_total", 12, ("model", "llama3-8b-8192"), ("type", "prompt")) in increments
+    assert ("groq_tokens_total", 30, ("model", "llama3-8b-8192"), ("type", "completion")) in increments
+    assert mock_metrics.observe.call_count == 2
@@ -1,4 +1,11 @@
-from unittest.mock import patch
+import asyncio
+import json
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from config import MAX_DEDUP_ROUNDS, MAX_PARSE_ATTEMPTS
+from models.question import Question
+from services.cancellation import CancelScope, Cancelled
 from services.groq_service import (
     validate_topic,
     generate_topics,
@@ -8,6 +15,25 @@ from services.groq_service import (
 )
 
 
+def _mock_completion(content):
+    """Build an object shaped like a Groq chat completion"""
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    return completion
+
+
+def _mock_async_client():
+    """A stand-in for the asyncio Groq client, whose create is awaited"""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+
 class TestGroqService:
     def test_validate_topic_valid(self):
         """Test that valid topics are recognized"""
@@ -54,17 +80,20 @@ class TestGroqService:
             A) A programming language
             B) A snake
             C) A type of fruit
-            D) A movie""",
+            D) A movie
+            Answer: A""",
 
             """2. What does OOP stand for?
             A) Object Oriented Programming
             B) Out of Possibilities
             C) Open Operational Protocol
-            D) Optimized Object Process"""
+            D) Optimized Object Process
+            Answer: A"""
         ]
 
         # Mock the Groq API call with side_effect to simulate multiple calls
-        with patch('services.groq_service.GROQ_CLIENT.chat.completions.create') as mock_create:
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
             # Create mock response objects
             mock_responses_objs = [
                 type('MockResponse', (), {
@@ -87,27 +116,62 @@ class TestGroqService:
 
             # Verify questions
             assert len(questions) == num_questions
-            assert "What is Python?" in questions[0]
-            assert "What does OOP stand for?" in questions[1]
+            assert "What is Python?" in questions[0].stem
+            assert "What does OOP stand for?" in questions[1].stem
+            assert questions[0].options["A"] == "A programming language"
+            assert questions[1].correct == "A"
+
+    def test_generate_questions_retries_unparseable_response(self):
+        """Test that a response without options is requested again"""
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            mock_create.side_effect = [
+                _mock_completion("What is Python?"),
+                _mock_completion("What is Python?\nA) A\nB) B\nC) C\nD) D\nAnswer: C"),
+            ]
+
+            questions = generate_questions("Python", 1)
+
+            assert mock_create.call_count == 2
+            assert questions[0].correct == "C"
+
+    def test_generate_questions_leaves_out_unparseable_questions(self):
+        """Test that a question that can't be parsed doesn't fail the batch"""
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            mock_create.side_effect = [_mock_completion("What is Python?")] * MAX_PARSE_ATTEMPTS + [
+                _mock_completion("Who made Rust?\nA) A\nB) B\nC) C\nD) D\nAnswer: C"),
+            ]
+
+            questions = generate_questions("Python", 2)
+
+            assert mock_create.call_count == MAX_PARSE_ATTEMPTS + 1
+            assert [question.stem for question in questions] == ["Who made Rust?"]
 
     def test_check_answer(self):
         """Test answer checking mechanism"""
-        question = """
+        question = Question.parse("""
         What is Python? 
         A) A programming language
         B) A snake
         C) A type of fruit
         D) A movie
-        """
+        Answer: A
+        """)
 
-        is_correct, result = check_answer(question, "A")
-        assert is_correct == True
-        assert result == "A"
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            is_correct, result = check_answer(question, "A")
+            assert is_correct == True
+            assert result == "A"
 
-        # Check if it works correctly when the answer is wrong
-        is_correct, result = check_answer(question, "B")
-        assert is_correct == False
-        assert result == "A"
+            # Check if it works correctly when the answer is wrong
+            is_correct, result = check_answer(question, "B")
+            assert is_correct == False
+            assert result == "A"
+
+            # The answer is checked locally
+            mock_create.assert_not_called()
 
     def test_get_explanation(self):
         """Test explanation retrieval"""
@@ -119,7 +183,8 @@ class TestGroqService:
         D) A movie
         """
 
-        with patch('services.groq_service.GROQ_CLIENT.chat.completions.create') as mock_create:
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
             # Simulate explanation generation
             mock_create.return_value.choices[0].message.content = (
                 "Python is a high-level, interpreted programming language known for "
@@ -128,4 +193,174 @@ class TestGroqService:
 
             explanation = get_explanation(question, "A")
             assert len(explanation) > 0
-            assert "Python" in explanation
\ No newline at end of file
+            assert "Python" in explanation
+
+    def test_generate_questions_concurrent_removes_duplicates(self):
+        """Test that parallel generation replaces duplicate questions"""
+        topic = "Python Programming"
+        mock_responses = [
+            "1. What is Python?\nA) A language\nB) A snake\nC) A fruit\nD) A movie\nAnswer: A",
+            "2. what is python\nA) A language\nB) A snake\nC) A fruit\nD) A movie\nAnswer: A",
+            "What does OOP stand for?\nA) Object Oriented Programming\nB) No\nC) Maybe\nD) Yes\nAnswer: A",
+        ]
+
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            mock_create.side_effect = [_mock_completion(r) for r in mock_responses]
+
+            questions = generate_questions(topic, 2, mode="concurrent")
+
+            assert mock_create.call_count == 3
+            assert len(questions) == 2
+            assert sum("OOP" in question.stem for question in questions) == 1
+
+    def test_generate_questions_batched(self):
+        """Test that batched mode requests all questions in one call"""
+        topic = "Python Programming"
+        content = json.dumps({"questions": [
+            {"question": "What is Python?",
+             "options": {"A": "A language", "B": "A snake", "C": "A fruit", "D": "A movie"},
+             "answer": "A"},
+            {"question": "What does OOP stand for?",
+             "options": {"A": "Object Oriented Programming", "B": "No", "C": "Maybe", "D": "Yes"},
+             "answer": "a"},
+        ]})
+
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            mock_create.return_value = _mock_completion(content)
+
+            questions = generate_questions(topic, 2, mode="batched")
+
+            assert mock_create.call_count == 1
+            assert mock_create.call_args.kwargs["response_format"] == {"type": "json_object"}
+            assert questions[0].stem == "What is Python?"
+            assert questions[1].stem == "What does OOP stand for?"
+            assert questions[1].correct == "A"
+
+    def test_generate_questions_batched_tops_up_invalid_response(self):
+        """Test that batched mode falls back to single requests on bad JSON"""
+        with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+            mock_create = mock_client.chat.completions.create
+            mock_create.side_effect = [
+                _mock_completion("not json"),
+                _mock_completion("What is Python?\nA) A\nB) B\nC) C\nD) D\nAnswer: B"),
+            ]
+
+            questions = generate_questions("Python", 1, mode="batched")
+
+            assert mock_create.call_count == 2
+            assert questions == [Question(
+                "What is Python?", {"A": "A", "B": "B", "C": "C", "D": "D"}, "B"
+            )]
+
+
+def test_generate_questions_replaces_near_duplicates():
+    """Test that paraphrased and cached questions are replaced with constant-size prompts"""
+    cached = Question.parse("What is the capital of France?\nA) Paris\nB) Rome\nC) Oslo\nD) Bern\nAnswer: A")
+    responses = [
+        "Which city is the capital of France?\nA) Paris\nB) Rome\nC) Oslo\nD) Bern\nAnswer: A",
+        "What is the capital of Italy?\nA) Paris\nB) Rome\nC) Oslo\nD) Bern\nAnswer: B",
+        "Which city serves as the capital of Italy?\nA) Paris\nB) Rome\nC) Oslo\nD) Bern\nAnswer: B",
+        "What is the capital of Norway?\nA) Paris\nB) Rome\nC) Oslo\nD) Bern\nAnswer: C",
+    ]
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.side_effect = [_mock_completion(r) for r in responses]
+
+        questions = generate_questions("Capitals", 2, existing=[cached])
+
+    assert [q.correct for q in questions] == ["B", "C"]
+    prompts = [c.kwargs["messages"][0]["content"] for c in mock_create.call_args_list]
+    assert "capital of France" in prompts[1]
+    assert "capital of Italy" not in prompts[2] and "capital of Italy" in prompts[3]
+    assert "capital of France" not in prompts[3]
+
+
+def test_generate_questions_drops_repeated_duplicates():
+    """Test that a question still repeating after the replacements is left out"""
+    cached = Question.parse("What is Python?\nA) A\nB) B\nC) C\nD) D\nAnswer: A")
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.return_value = _mock_completion(cached.text + "\nAnswer: A")
+
+        questions = generate_questions("Python", 1, existing=[cached])
+
+    assert questions == []
+    assert mock_create.call_count == MAX_DEDUP_ROUNDS + 1
+
+
+def test_get_explanation_stream():
+    """Test that a streamed explanation yields the pieces as they arrive"""
+    chunks = []
+    for content in ["Python ", None, "is a ", "language."]:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = content
+        chunks.append(chunk)
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.return_value = _async_iter(chunks)
+
+        pieces = get_explanation("What is Python?", "A", stream=True)
+
+        assert list(pieces) == ["Python ", "is a ", "language."]
+        assert mock_create.call_args.kwargs["stream"] is True
+
+
+def test_generate_questions_with_explanations():
+    """Test that short explanations can be generated with the questions"""
+    content = json.dumps({"questions": [
+        {"question": "What is Python?",
+         "options": {"A": "A language", "B": "A snake", "C": "A fruit", "D": "A movie"},
+         "answer": "A",
+         "explanation": "Python is a programming language."},
+    ]})
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.return_value = _mock_completion(content)
+
+        questions = generate_questions("Python", 1, mode="batched", explanations=True)
+
+        prompt = mock_create.call_args.kwargs["messages"][0]["content"]
+        assert '"explanation"' in prompt
+        assert questions[0].explanation == "Python is a programming language."
+
+
+def test_get_short_explanation():
+    """Test that a short explanation is requested in a few sentences"""
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.return_value = _mock_completion("Because.")
+
+        assert get_explanation("What is Python?", "A", short=True) == "Because."
+        prompt = mock_create.call_args.kwargs["messages"][0]["content"]
+        assert "one or two sentences" in prompt
+
+
+def test_cancelling_the_scope_aborts_the_request():
+    """Test that the blocking API cancels its coroutine with the caller's scope"""
+    started, aborted = threading.Event(), threading.Event()
+
+    async def create(**kwargs):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            aborted.set()
+            raise
+
+    scope = CancelScope()
+    canceller = threading.Thread(target=lambda: started.wait(5) and scope.cancel())
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client, \
+            patch('services.async_groq_service.groq_client.buckets', {}):
+        mock_client.chat.completions.create.side_effect = create
+        canceller.start()
+        with pytest.raises(Cancelled):
+            scope.run(generate_questions, "Python", 1)
+        canceller.join()
+
+    assert aborted.wait(5)
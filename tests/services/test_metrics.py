@@ -0,0 +1,114 @@
+import urllib.request
+import pytest
+from services.metrics import Metrics
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+def test_counters_are_exported_per_label_set(metrics):
+    """Test that counters add up separately for every set of labels"""
+    metrics.increment("groq_requests_total", model="a", status="ok")
+    metrics.increment("groq_requests_total", model="a", status="ok")
+    metrics.increment("groq_requests_total", 3, model="b", status="error")
+
+    text = metrics.export_prometheus()
+    assert "# TYPE groq_requests_total counter" in text
+    assert 'groq_requests_total{model="a",status="ok"} 2' in text
+    assert 'groq_requests_total{model="b",status="error"} 3' in text
+
+
+def test_gauges_keep_the_last_value(metrics):
+    """Test that a gauge is set rather than added to"""
+    metrics.set("topic_pool_topics", 40)
+    metrics.set("topic_pool_topics", 12)
+
+    text = metrics.export_prometheus()
+    assert "# TYPE topic_pool_topics gauge" in text
+    assert "topic_pool_topics 12" in text
+    assert {"metric": "topic_pool_topics", "value": 12} in metrics.summary()
+
+
+def test_histograms_have_cumulative_buckets(metrics):
+    """Test that observed values fill every bucket they fit in"""
+    metrics.observe("duration_seconds", 0.02)
+    metrics.observe("duration_seconds", 3)
+
+    text = metrics.export_prometheus()
+    assert 'duration_seconds_bucket{le="0.01"} 0' in text
+    assert 'duration_seconds_bucket{le="0.025"} 1' in text
+    assert 'duration_seconds_bucket{le="5"} 2' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in text
+    assert "duration_seconds_sum 3.02" in text
+    assert "duration_seconds_count 2" in text
+
+
+def test_timer_counts_errors(metrics):
+    """Test that a failing block is timed and counted as an error"""
+    @metrics.timed("call_duration_seconds", function="fail")
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        fail()
+
+    text = metrics.export_prometheus()
+    assert 'call_duration_seconds_count{function="fail"} 1' in text
+    assert 'call_duration_seconds_errors_total{function="fail"} 1' in text
+
+
+def test_timer_ignores_control_flow(metrics):
+    """Test that exceptions like Streamlit's rerun signal are not errors"""
+    class RerunSignal(BaseException):
+        pass
+
+    with pytest.raises(RerunSignal):
+        with metrics.timer("rerun_duration_seconds"):
+            raise RerunSignal()
+
+    text = metrics.export_prometheus()
+    assert "rerun_duration_seconds_count 1" in text
+    assert "errors_total" not in text
+
+
+def test_label_values_are_escaped(metrics):
+    """Test that quotes in label values don't break the export"""
+    metrics.increment("topics_total", topic='say "hi"')
+
+    assert 'topics_total{topic="say \\"hi\\""} 1' in metrics.export_prometheus()
+
+
+def test_summary(metrics):
+    """Test the rows of the debug panel"""
+    metrics.observe("duration_seconds", 0.5, step="spin")
+    metrics.increment("retries_total")
+
+    assert metrics.summary() == [
+        {"metric": 'duration_seconds{step="spin"}', "count": 1, "mean ms": 500.0, "max ms": 500.0},
+        {"metric": "retries_total", "count": 1},
+    ]
+
+
+def test_custom_buckets(metrics):
+    """Test that values other than durations get their own buckets and summary"""
+    metrics.observe("quiz_tokens", 700, buckets=(500, 1000))
+
+    assert 'quiz_tokens_bucket{le="500"} 0' in metrics.export_prometheus()
+    assert 'quiz_tokens_bucket{le="1000"} 1' in metrics.export_prometheus()
+    assert metrics.summary() == [{"metric": "quiz_tokens", "count": 1, "mean": 700, "max": 700}]
+
+
+def test_serve(metrics):
+    """Test that /metrics is served for Prometheus"""
+    metrics.increment("requests_total")
+    server = metrics.serve(0, host="127.0.0.1")
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert "requests_total 1" in response.read().decode()
+        assert metrics.serve(0) is server
+    finally:
+        server.shutdown()
+        server.server_close()
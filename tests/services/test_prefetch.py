@@ -0,0 +1,136 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from models.question import Question
+from services.cancellation import CancelScope, Cancelled, sleep
+from services.prefetch import QuestionFeed, prefetch_questions
+
+
+def make_questions(*numbers):
+    return [Question(f'Q{n}', {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'A') for n in numbers]
+
+
+@pytest.fixture
+def mock_get():
+    """Mock the question bank, waiting for background fetches before unpatching"""
+    executor = ThreadPoolExecutor(max_workers=1)
+    with patch('services.prefetch.question_bank.get_questions') as mock_get, \
+            patch('services.prefetch._executor', executor):
+        yield mock_get
+        executor.shutdown(wait=True)
+
+
+def test_prefetch_questions():
+    """Test that questions are fetched in the background"""
+    with patch('services.prefetch.question_bank.get_questions') as mock_get:
+        mock_get.return_value = ['Q1', 'Q2']
+
+        future = prefetch_questions('History', seen={'q0'}, num_questions=2)
+
+        assert future.result(timeout=5) == ['Q1', 'Q2']
+        mock_get.assert_called_once_with('History', 2, seen={'q0'})
+
+
+def test_prefetch_skips_invalid_topic():
+    """Test that no questions are generated for an invalid custom topic"""
+    with patch('services.prefetch.topic_validator.validate', return_value=(False, 'Please enter a real topic.')), \
+            patch('services.prefetch.question_bank.get_questions') as mock_get:
+        future = prefetch_questions('asdfghjk', validate=True)
+
+        assert future.result(timeout=5) is None
+        mock_get.assert_not_called()
+
+
+def test_feed_hands_out_initial_questions_first(mock_get):
+    """Test that prefetched questions are used before fetching more"""
+    mock_get.return_value = make_questions(3, 4)
+    seen = set()
+    feed = QuestionFeed('History', seen, make_questions(1, 2), limit=4, batch_size=2)
+
+    assert [feed.take().stem for _ in range(4)] == ['Q1', 'Q2', 'Q3', 'Q4']
+    assert feed.take() is None
+    assert seen == {'q1', 'q2', 'q3', 'q4'}
+    mock_get.assert_called_once()
+
+
+def test_feed_fetches_ahead(mock_get):
+    """Test that the next batch is fetched before the ready questions run out"""
+    batches = iter([make_questions(1, 2), make_questions(3, 4), make_questions(5, 6)])
+    mock_get.side_effect = lambda *args, **kwargs: next(batches)
+    feed = QuestionFeed('History', set(), batch_size=2, lookahead=2)
+
+    assert feed.take().stem == 'Q1'
+    pending = feed._pending
+    if pending:
+        pending.result(timeout=5)
+
+    # Q2 is left, so Q3 and Q4 were fetched while Q1 was being answered
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs['seen'] == {'q1', 'q2'}
+
+
+def test_feed_skips_seen_questions(mock_get):
+    """Test that generated questions the player already had are dropped"""
+    mock_get.return_value = make_questions(1, 2)
+    feed = QuestionFeed('History', {'q1'}, limit=1)
+
+    assert feed.take().stem == 'Q2'
+    assert feed.take() is None
+
+
+def test_feed_skips_repeats_within_a_batch(mock_get):
+    """Test that a batch repeating a question hands it out once"""
+    mock_get.return_value = make_questions(1, 1, 2)
+    feed = QuestionFeed('History', set(), limit=3, batch_size=3)
+
+    assert [feed.take().stem for _ in range(2)] == ['Q1', 'Q2']
+
+
+def test_feed_ends_when_no_questions_come(mock_get):
+    """Test that an endless quiz ends when the bank has nothing new"""
+    mock_get.side_effect = RuntimeError("API down")
+    feed = QuestionFeed('History', set())
+
+    assert feed.take() is None
+
+
+def test_cancelled_prefetch(mock_get):
+    """Test that cancelling a prefetch stops its work"""
+    mock_get.side_effect = lambda *args, **kwargs: sleep(5)
+    scope = CancelScope()
+
+    future = prefetch_questions('History', scope=scope)
+    scope.cancel()
+
+    with pytest.raises(Cancelled):
+        future.result(timeout=1)
+
+
+def test_closed_feed_stops_fetching(mock_get):
+    """Test that closing a feed cancels the pending fetch and ends the quiz"""
+    mock_get.side_effect = lambda *args, **kwargs: sleep(5)
+    feed = QuestionFeed('History', set(), make_questions(1))
+
+    pending = feed._pending
+    feed.close()
+    pending.result(timeout=1)
+
+    assert feed.take().stem == 'Q1'
+    assert feed.take() is None
+
+
+def test_fetch_finishing_after_close_starts_no_other(mock_get):
+    """Test that a fetch not stopped by the cancellation doesn't refill a closed feed"""
+    release = threading.Event()
+    mock_get.side_effect = lambda *args, **kwargs: release.wait(5) and make_questions(1, 2)
+    feed = QuestionFeed('History', set(), batch_size=2, lookahead=2)
+
+    pending = feed._pending
+    feed.close()
+    release.set()
+    pending.result(timeout=5)
+
+    assert mock_get.call_count == 1
+    assert feed._pending is None
+    assert feed.take() is None
@@ -0,0 +1,133 @@
+import time
+import pytest
+from unittest.mock import ANY, Mock
+from models.question import Question
+from services.question_bank import QuestionBank, normalize_topic
+
+
+def make_questions(prefix, count):
+    return [
+        Question(f"{prefix} question {i}?", {"A": "1", "B": "2", "C": "3", "D": "4"}, "A")
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def generate():
+    """Fake generate_questions that returns new questions on every call"""
+    calls = []
+
+    def _generate(topic, num_questions, mode=None, explanations=False, existing=()):
+        calls.append(num_questions)
+        return make_questions(f"{topic} {len(calls)}", num_questions)
+
+    mock = Mock(side_effect=_generate)
+    return mock
+
+
+@pytest.fixture
+def bank(tmp_path, generate):
+    return QuestionBank(path=str(tmp_path / "bank.db"), refill_size=10, generate=generate)
+
+
+def test_normalize_topic():
+    """Test that topics differing in casing and punctuation share a key"""
+    assert normalize_topic("  Ancient   Egypt! ") == normalize_topic("ancient egypt")
+
+
+def test_generates_on_empty_bank(bank, generate):
+    """Test that an empty bank generates and stores the questions"""
+    questions = bank.get_questions("History", 5)
+
+    assert len(questions) == 5
+    generate.assert_called_once()
+    assert len(bank._load("history")) == 5
+
+
+def test_serves_unseen_questions_from_cache(bank, generate):
+    """Test that cached questions are served without generating"""
+    bank.add("History", make_questions("History", 20))
+
+    first = bank.get_questions("history", 5)
+    second = bank.get_questions("HISTORY", 5, seen={q.key for q in first})
+
+    generate.assert_not_called()
+    assert len(second) == 5
+    assert not {q.key for q in first} & {q.key for q in second}
+
+
+def test_persists_across_instances(bank, tmp_path, generate):
+    """Test that questions are read back from SQLite by a new instance"""
+    bank.add("History", make_questions("History", 20))
+
+    other = QuestionBank(path=str(tmp_path / "bank.db"), generate=generate)
+    questions = other.get_questions("History", 5)
+
+    generate.assert_not_called()
+    assert {q.stem for q in questions} <= {q.stem for q in make_questions("History", 20)}
+
+
+def test_refills_in_background_when_running_low(bank, generate):
+    """Test that serving the last unseen questions triggers a refill"""
+    bank.add("History", make_questions("History", 6))
+
+    bank.get_questions("History", 5)
+    bank._executor.shutdown(wait=True)
+
+    generate.assert_called_once_with(
+        "History", 10, mode="batched", explanations=False, existing=ANY
+    )
+    assert len(generate.call_args.kwargs["existing"]) == 6
+    assert len(bank._load("history")) == 16
+
+
+def test_tops_up_missing_questions(bank, generate):
+    """Test that only the missing questions are generated"""
+    bank.add("History", make_questions("History", 3))
+
+    questions = bank.get_questions("History", 5)
+
+    assert len(questions) == 5
+    assert generate.call_args.args[1] == 2
+
+
+def test_regenerates_unparseable_questions_in_background(bank, generate):
+    """Test that questions missing from a short generation are refilled"""
+    generate.side_effect = [make_questions("History", 3), make_questions("More", 10)]
+
+    questions = bank.get_questions("History", 5)
+    bank._executor.shutdown(wait=True)
+
+    assert len(questions) == 3
+    assert generate.call_count == 2
+    assert len(bank._load("history")) == 13
+
+
+def test_ttl_eviction(bank):
+    """Test that expired questions are not served"""
+    bank.add("History", make_questions("History", 5))
+    bank.ttl = 0
+    time.sleep(0.01)
+
+    assert bank._load("history") == []
+
+
+def test_size_eviction(tmp_path, generate):
+    """Test that the oldest questions are evicted above the size limits"""
+    bank = QuestionBank(
+        path=str(tmp_path / "bank.db"), max_per_topic=4, max_questions=6, generate=generate
+    )
+    bank.add("History", make_questions("History", 5))
+    assert len(bank._load("history")) == 4
+
+    bank.add("Science", make_questions("Science", 4))
+    assert len(bank._load("history")) + len(bank._load("science")) == 6
+
+
+def test_lru_front(bank):
+    """Test that only the most recently used topics stay in memory"""
+    bank.lru_topics = 2
+    for topic in ["a", "b", "c"]:
+        bank._load(topic)
+
+    assert list(bank._cache) == ["b", "c"]
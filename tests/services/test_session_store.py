@@ -0,0 +1,191 @@
+import socketserver
+import threading
+import time
+import pytest
+from services.session_store import (
+    MemorySessionStore,
+    RedisError,
+    RedisSessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for the Redis commands used by the session store"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.hashes = {}
+        self.expiry = {}
+        self.commands = []
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+
+    def run(self, command):
+        name, args = command[0].upper(), command[1:]
+        with self.lock:
+            self.commands.append(name)
+            if name in (b"AUTH", b"SELECT"):
+                return b"+OK\r\n"
+            if name == b"HSET":
+                fields = self.hashes.setdefault(args[0], {})
+                added = 0
+                for i in range(1, len(args), 2):
+                    added += args[i] not in fields
+                    fields[args[i]] = args[i + 1]
+                return b":%d\r\n" % added
+            if name == b"HDEL":
+                fields = self.hashes.get(args[0], {})
+                return b":%d\r\n" % sum(fields.pop(f, None) is not None for f in args[1:])
+            if name == b"HGETALL":
+                fields = self.hashes.get(args[0], {})
+                reply = [b"*%d\r\n" % (2 * len(fields))]
+                for field, value in fields.items():
+                    reply += [b"$%d\r\n%s\r\n" % (len(field), field),
+                              b"$%d\r\n%s\r\n" % (len(value), value)]
+                return b"".join(reply)
+            if name == b"EXPIRE":
+                self.expiry[args[0]] = int(args[1])
+                return b":1\r\n"
+            if name == b"DEL":
+                return b":%d\r\n" % (self.hashes.pop(args[0], None) is not None)
+            return b"-ERR unknown command\r\n"
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                command.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.run(command))
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedisServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    if request.param == "sqlite":
+        return SQLiteSessionStore(path=str(tmp_path / "sessions.db"))
+    server = request.getfixturevalue("redis_server")
+    host, port = server.server_address
+    return RedisSessionStore(url=f"redis://{host}:{port}/0")
+
+
+def test_save_and_load(store):
+    """Test that fields are stored per session"""
+    store.save("s1", {"meta": b'{"running":true}', "answers": b"\x00\x02"})
+    store.save("s2", {"meta": b"{}"})
+
+    assert store.load("s1") == {"meta": b'{"running":true}', "answers": b"\x00\x02"}
+    assert store.load("s2") == {"meta": b"{}"}
+    assert store.load("unknown") == {}
+
+
+def test_incremental_save(store):
+    """Test that a save only touches the changed and removed fields"""
+    store.save("s1", {"meta": b"1", "questions": b"[...]", "answers": b""})
+    store.save("s1", {"answers": b"\x01"}, removed=["meta"])
+
+    assert store.load("s1") == {"questions": b"[...]", "answers": b"\x01"}
+
+
+def test_delete(store):
+    """Test that a deleted session is gone"""
+    store.save("s1", {"meta": b"1"})
+    store.delete("s1")
+
+    assert store.load("s1") == {}
+
+
+@pytest.mark.parametrize("store_class", [MemorySessionStore, SQLiteSessionStore])
+def test_expired_sessions_are_not_loaded(store_class, tmp_path):
+    """Test that sessions without changes for ttl seconds expire"""
+    if store_class is SQLiteSessionStore:
+        store = store_class(path=str(tmp_path / "sessions.db"), ttl=0.05)
+    else:
+        store = store_class(ttl=0.05)
+    store.save("s1", {"meta": b"1"})
+    time.sleep(0.1)
+
+    assert store.load("s1") == {}
+
+
+def test_memory_store_evicts_least_recently_used():
+    """Test that the memory store is bounded"""
+    store = MemorySessionStore(max_sessions=2)
+    store.save("s1", {"meta": b"1"})
+    store.save("s2", {"meta": b"2"})
+    store.load("s1")
+    store.save("s3", {"meta": b"3"})
+
+    assert store.load("s2") == {}
+    assert store.load("s1") == {"meta": b"1"}
+
+
+def test_redis_store_pipelines_and_expires(redis_server):
+    """Test that a save is one round trip that also refreshes the expiry"""
+    host, port = redis_server.server_address
+    store = RedisSessionStore(url=f"redis://:secret@{host}:{port}/2", ttl=60)
+
+    store.save("s1", {"meta": b"1"}, removed=["answers"])
+
+    assert redis_server.commands == [b"AUTH", b"SELECT", b"HSET", b"HDEL", b"EXPIRE"]
+    assert redis_server.expiry[b"quiz:session:s1"] == 60
+
+
+def test_redis_store_raises_error_replies(redis_server):
+    """Test that error replies are raised once all replies are read"""
+    host, port = redis_server.server_address
+    store = RedisSessionStore(url=f"redis://{host}:{port}")
+
+    with pytest.raises(RedisError):
+        store.execute(("PING",), ("HGETALL", "x"))
+    assert store.load("s1") == {}
+
+
+def test_redis_store_reconnects(redis_server):
+    """Test that a dropped connection is opened again"""
+    host, port = redis_server.server_address
+    store = RedisSessionStore(url=f"redis://{host}:{port}")
+    store.save("s1", {"meta": b"1"})
+    store._socket.close()
+
+    assert store.load("s1") == {"meta": b"1"}
+
+
+def test_create_session_store():
+    """Test that unknown store kinds are rejected"""
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("etcd")
+
+
+def test_incomplete_store_cannot_be_created():
+    """Test that a store missing a method fails when it is created"""
+    class NoDeleteStore(SessionStore):
+        def load(self, session_id):
+            return {}
+
+        def save(self, session_id, changed, removed=()):
+            pass
+
+    with pytest.raises(TypeError):
+        NoDeleteStore()
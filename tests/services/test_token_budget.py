@@ -0,0 +1,163 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.groq_client import GroqClient
+from services.groq_service import generate_questions, get_explanation
+from services.metrics import metrics
+from services.token_budget import (
+    TokenAccount,
+    charge_to,
+    completion_budget,
+    cost,
+    estimate_prompt_tokens,
+    estimate_tokens,
+    record_call,
+    record_quiz,
+    submit,
+    truncate,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.reset()
+    yield
+    charge_to(None)
+    metrics.reset()
+
+
+def _response(content="", prompt_tokens=100, completion_tokens=20, finish_reason="stop"):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    response.choices[0].finish_reason = finish_reason
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    return response
+
+
+def _mock_async_client():
+    """A stand-in for the asyncio Groq client, whose create is awaited"""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+
+def test_estimates():
+    """Test the local token estimates"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefghi") == 3
+    assert estimate_prompt_tokens([{"role": "user", "content": "abcd"}]) == 5
+    assert truncate("short", 10) == "short"
+    assert truncate("x" * 100, 5) == "x" * 20 + "…"
+
+
+def test_completion_budget_scales_with_items():
+    """Test that per-item budgets grow with the number of requested items"""
+    assert completion_budget("question", 5) == 5 * completion_budget("question")
+
+
+def test_account_report():
+    """Test that usage is totalled per kind of call and priced per model"""
+    account = TokenAccount()
+    account.record("question", "llama3-8b-8192", 90, 100, 200)
+    account.record("question", "llama3-8b-8192", 90, 100, 200, truncated=True)
+    account.record("topics", "unknown-model", 40, 50, 60)
+
+    rows = {row["call"]: row for row in account.report()}
+
+    assert rows["question"]["requests"] == 2
+    assert rows["question"]["truncated"] == 1
+    assert rows["topics"]["cost"] == 0
+    assert rows["total"]["prompt"] == 250
+    assert rows["total"]["cost"] == round(cost("llama3-8b-8192", 200, 400), 6)
+    assert TokenAccount.from_dict(account.to_dict()).totals() == account.totals()
+
+
+def test_calls_in_background_threads_are_charged():
+    """Test that submit keeps charging the account of the caller"""
+    account = TokenAccount()
+    charge_to(account)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        submit(executor, record_call, "question", "llama3-8b-8192", 10, None).result()
+        # A plain submit runs without the caller's account
+        executor.submit(record_call, "question", "llama3-8b-8192", 10, None).result()
+
+    assert account.totals()["requests"] == 1
+    assert account.totals()["prompt"] == 10  # estimated without usage
+
+
+def test_client_records_usage_per_call():
+    """Test that the client charges the actual usage and counts truncated responses"""
+    client = GroqClient(client=MagicMock(), rate_limits={})
+    client.client.chat.completions.create.return_value = _response(
+        prompt_tokens=123, completion_tokens=45, finish_reason="length"
+    )
+    account = TokenAccount()
+    charge_to(account)
+
+    client.create(model="llama3-8b-8192", messages=[{"role": "user", "content": "Hi"}],
+                  max_tokens=45, call="question")
+
+    assert "call" not in client.client.chat.completions.create.call_args.kwargs
+    assert account.to_dict()["question"]["prompt"] == 123
+    assert account.to_dict()["question"]["completion"] == 45
+    exported = metrics.export_prometheus()
+    assert 'groq_truncated_responses_total{call="question"} 1' in exported
+    assert 'groq_estimated_prompt_tokens_total{call="question"} 5' in exported
+
+
+def test_service_calls_have_max_tokens():
+    """Test that every kind of call is limited to its completion budget"""
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.side_effect = [_response('{"questions": []}')] + [
+            _response(f"{stem}\nA) A\nB) B\nC) C\nD) D\nAnswer: B")
+            for stem in ("What is Python?", "Who made Rust?", "When was C released?")
+        ] + [_response("Because.")]
+
+        generate_questions("Python", 3, mode="batched", existing=[])
+        get_explanation("What is Python?", "B", short=True)
+
+    budgets = [c.kwargs["max_tokens"] for c in mock_create.call_args_list]
+    assert budgets[0] == completion_budget("question", 3)
+    assert budgets[1:4] == [completion_budget("question")] * 3
+    assert budgets[-1] == completion_budget("short_explanation")
+
+
+def test_stream_usage_is_recorded():
+    """Test that a streamed explanation is charged once it is consumed"""
+    chunks = []
+    for content, usage in [("Python ", None), ("rocks.", MagicMock(prompt_tokens=30, completion_tokens=3))]:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = content
+        chunk.choices[0].finish_reason = None if usage is None else "stop"
+        chunk.x_groq = None if usage is None else MagicMock(usage=usage)
+        chunks.append(chunk)
+    account = TokenAccount()
+    charge_to(account)
+
+    with patch('services.async_groq_service.groq_client.async_client', _mock_async_client()) as mock_client:
+        mock_create = mock_client.chat.completions.create
+        mock_create.return_value = _async_iter(chunks)
+        assert "".join(get_explanation("Q", "A", stream=True)) == "Python rocks."
+
+    assert mock_create.call_args.kwargs["max_tokens"] == completion_budget("explanation")
+    assert account.to_dict()["explanation"]["completion"] == 3
+
+
+def test_record_quiz():
+    """Test that finished quizzes fill the per-quiz histograms"""
+    account = TokenAccount()
+    account.record("questions", "llama3-8b-8192", 500, 600, 1500)
+
+    record_quiz(account)
+
+    exported = metrics.export_prometheus()
+    assert 'quiz_tokens_bucket{type="completion",le="2500"} 1' in exported
+    assert 'quiz_tokens_bucket{type="completion",le="1000"} 0' in exported
+    assert "quiz_cost_dollars_count 1" in exported
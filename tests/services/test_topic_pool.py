@@ -0,0 +1,80 @@
+import json
+from unittest.mock import Mock, patch
+from config import DEFAULT_TOPICS
+from services.topic_pool import TopicPool
+
+
+def make_pool(topics, **kwargs):
+    generate = Mock(return_value=topics)
+    kwargs.setdefault("min_size", 5)
+    kwargs.setdefault("refill_size", 10)
+    return TopicPool(generate=generate, **kwargs), generate
+
+
+def test_take_from_empty_pool_uses_defaults():
+    """Test that an empty pool hands out default topics and refills"""
+    pool, generate = make_pool([f"Topic {i}" for i in range(10)])
+
+    with patch('services.topic_pool.metrics') as mock_metrics:
+        topics = pool.take(4)
+        pool._executor.shutdown(wait=True)
+
+    assert len(topics) == 4
+    assert set(topics) <= set(DEFAULT_TOPICS)
+    generate.assert_called_once_with(10, keep_extra=True)
+    assert pool.depth() == 10
+    mock_metrics.increment.assert_called_once_with("topic_pool_fallbacks_total")
+    mock_metrics.set.assert_called_with("topic_pool_topics", 10)
+
+
+def test_take_returns_distinct_pool_topics():
+    """Test that topics are taken from the pool and removed from it"""
+    pool, generate = make_pool([], min_size=0)
+    pool.add([f"Topic {i}" for i in range(20)])
+
+    first = pool.take(8)
+    second = pool.take(8)
+
+    assert len(set(first + second)) == 16
+    assert pool.depth() == 4
+    generate.assert_not_called()
+
+
+def test_add_deduplicates():
+    """Test that duplicates and recently handed out topics are skipped"""
+    pool, _ = make_pool([])
+    pool.add(["History", "history!", " HISTORY ", "Science"])
+    assert pool.depth() == 2
+
+    pool.min_size = 0
+    taken = pool.take(2)
+    pool.add(taken + ["Art"])
+    assert pool.depth() == 1
+
+
+def test_metrics_after_refill():
+    """Test that refill latency and errors are published"""
+    pool, generate = make_pool([])
+    with patch('services.topic_pool.metrics') as mock_metrics:
+        pool.refill().result()
+        generate.side_effect = Exception("API error")
+        pool.refill().exception()
+
+    statuses = [call.kwargs["status"] for call in mock_metrics.observe.call_args_list]
+    assert statuses == ["ok", "error"]
+    assert all(call.args[0] == "topic_pool_refill_duration_seconds"
+               for call in mock_metrics.observe.call_args_list)
+    mock_metrics.set.assert_called_with("topic_pool_topics", 0)
+
+
+def test_persistence(tmp_path):
+    """Test that the pool is saved to and loaded from a JSON file"""
+    path = str(tmp_path / "topics.json")
+    pool, _ = make_pool([], path=path)
+    pool.add(["History", "Science", "Art"])
+
+    with open(path) as file:
+        assert json.load(file) == ["History", "Science", "Art"]
+
+    other, _ = make_pool([], path=path)
+    assert other.depth() == 3
@@ -0,0 +1,88 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from services.topic_validator import TopicValidator, classify_locally
+
+
+@pytest.mark.parametrize("topic, expected", [
+    ("Ancient Egypt", True),
+    ("  ancient EGYPT! ", True),
+    ("asdfghjk", False),
+    ("but", False),
+    ("Although", False),
+    ("the and of", False),
+    ("aaaaaa", False),
+    ("xkcdqwpzt", False),
+    ("Liberty and Property", None),
+    ("HTML", None),
+    ("HTTPS", None),
+    ("LGBTQ history", None),
+    ("https", False),
+    ("Machine Learning", None),
+])
+def test_classify_locally(topic, expected):
+    """Test that only obvious cases are decided locally"""
+    assert classify_locally(topic, {"ancient egypt"}) is expected
+
+
+def test_validate_caches_remote_verdicts():
+    """Test that a topic is only sent to the API once"""
+    remote = Mock(return_value=(True, ""))
+    validator = TopicValidator(known_topics=[], validate=remote)
+
+    assert validator.validate("Machine Learning") == (True, "")
+    assert validator.validate("machine learning ") == (True, "")
+
+    remote.assert_called_once_with("Machine Learning")
+    assert validator.stats == {"local": 0, "cached": 1, "remote": 1}
+
+
+def test_validate_local_verdicts_skip_api():
+    """Test that known and gibberish topics never reach the API"""
+    remote = Mock()
+    validator = TopicValidator(known_topics=["World History"], validate=remote)
+
+    assert validator.validate("World History") == (True, "")
+    assert validator.validate("asdfghjk") == (False, "Please enter a real topic.")
+    remote.assert_not_called()
+
+
+def test_validate_does_not_cache_errors():
+    """Test that failed API calls are retried"""
+    remote = Mock(return_value=(False, "Error validating topic: timeout"))
+    validator = TopicValidator(known_topics=[], validate=remote)
+
+    validator.validate("Machine Learning")
+    validator.validate("Machine Learning")
+
+    assert remote.call_count == 2
+
+
+def test_verdict_cache_eviction():
+    """Test that the cache is bounded and verdicts expire"""
+    remote = Mock(return_value=(False, "Please enter a real topic."))
+    validator = TopicValidator(known_topics=[], max_size=2, validate=remote)
+
+    for topic in ["Topic one", "Topic two", "Topic three"]:
+        validator.validate(topic)
+    assert list(validator._verdicts) == ["topic two", "topic three"]
+
+    validator.ttl = 0
+    validator.validate("Topic three")
+    assert remote.call_count == 4
+
+
+def test_check_does_not_wait_for_the_api():
+    """Test that check returns at once and shares the API call with validate"""
+    release = threading.Event()
+    remote = Mock(side_effect=lambda topic: release.wait(5) and (True, ""))
+    validator = TopicValidator(known_topics=[], validate=remote)
+
+    assert validator.check("Machine Learning") is None
+    assert validator.pending("machine learning")
+    release.set()
+    assert validator.validate("Machine Learning") == (True, "")
+
+    assert not validator.pending("Machine Learning")
+    assert validator.check("Machine Learning") == (True, "")
+    remote.assert_called_once()
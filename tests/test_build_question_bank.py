@@ -0,0 +1,144 @@
+import hashlib
+import json
+import pytest
+from unittest.mock import Mock, patch
+from build_question_bank import (
+    Checkpoint,
+    QuestionBankBuilder,
+    collect_topics,
+    generate_topic_questions,
+    main,
+)
+from models.question import Question
+from services.question_bank import QuestionBank
+
+
+def make_question(stem, options=None):
+    # A distinct answer per stem, so that generated questions are no near-duplicates
+    answer = hashlib.md5(stem.encode()).hexdigest()
+    return Question(stem, options or {"A": answer, "B": "2", "C": "3", "D": "4"}, "A")
+
+
+@pytest.fixture
+def generate():
+    """Fake generate_questions that returns new questions on every call"""
+    calls = []
+
+    def _generate(topic, num_questions, mode=None, explanations=False, existing=()):
+        calls.append(topic)
+        if topic == "Broken":
+            raise RuntimeError("API down")
+        return [make_question(f"{topic} {len(calls)} question {i}?") for i in range(num_questions)]
+
+    return Mock(side_effect=_generate)
+
+
+def read_records(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_generate_topic_questions_validates_and_deduplicates():
+    """Test that invalid and duplicate questions are dropped and topped up"""
+    batches = iter([
+        [make_question("Q1?"), make_question("Q2?", {"A": "1", "B": "2", "C": "3"})],
+        [make_question("q1"), make_question("Q3?")],
+        [make_question("Q4?")],
+    ])
+    generate = Mock(side_effect=lambda *args, **kwargs: next(batches))
+
+    questions, rejected = generate_topic_questions("Topic", 3, 2, generate=generate)
+
+    assert [q.stem for q in questions] == ["Q1?", "Q3?", "Q4?"]
+    assert rejected == 1
+    assert [c.args[1] for c in generate.call_args_list] == [2, 2, 1]
+
+
+def test_generate_topic_questions_stops_without_new_questions():
+    """Test that a topic that keeps repeating itself doesn't loop forever"""
+    generate = Mock(return_value=[make_question("Same?")])
+
+    questions, _ = generate_topic_questions("Topic", 5, 5, generate=generate)
+
+    assert len(questions) == 1
+    assert generate.call_count == 2
+
+
+def test_collect_topics_deduplicates():
+    """Test that generated topics are distinct"""
+    generate = Mock(side_effect=[["Jazz", "jazz!", "Rome"], ["Rome", "Space"]])
+
+    assert collect_topics(3, generate=generate) == ["Jazz", "Rome", "Space"]
+
+
+def test_build_writes_bank_and_jsonl(tmp_path, generate):
+    """Test that every topic ends up in the bank and the records file"""
+    bank = QuestionBank(path=str(tmp_path / "bank.db"), generate=Mock())
+    output = str(tmp_path / "bank.jsonl")
+    checkpoint = str(tmp_path / "build.checkpoint.json")
+    builder = QuestionBankBuilder(checkpoint, output=output, bank=bank,
+                                  num_questions=4, batch_size=2, concurrency=2, generate=generate)
+
+    summary = builder.build(["History", "Jazz"])
+
+    assert summary["questions"] == 8 and not summary["failed"]
+    records = read_records(output)
+    assert len(records) == 8
+    assert {record["topic"] for record in records} == {"History", "Jazz"}
+    assert len(bank._load("jazz")) == 4
+    assert not (tmp_path / "build.checkpoint.json").exists()
+
+
+def test_build_resumes_after_failure(tmp_path, generate):
+    """Test that a second run only generates the topics that are not done"""
+    output = str(tmp_path / "bank.jsonl")
+    checkpoint = str(tmp_path / "build.checkpoint.json")
+    builder = QuestionBankBuilder(checkpoint, output=output, num_questions=2, generate=generate)
+
+    summary = builder.build(["History", "Broken"])
+    assert list(summary["failed"]) == ["Broken"]
+    assert Checkpoint(checkpoint).done == {"History": 2}
+
+    # A crash after writing records but before the checkpoint leaves extra lines
+    with open(output, "a") as file:
+        file.write('{"topic": "partial"}\n')
+
+    fixed = Mock(side_effect=lambda topic, n, **kwargs: [make_question(f"{topic} {i}?") for i in range(n)])
+    builder = QuestionBankBuilder(checkpoint, output=output, num_questions=2, generate=fixed)
+    summary = builder.build(["Something else"])
+
+    assert summary["resumed"] == 1 and not summary["failed"]
+    assert [c.args[0] for c in fixed.call_args_list] == ["Broken"]
+    assert [record["topic"] for record in read_records(output)] == ["History"] * 2 + ["Broken"] * 2
+
+
+def test_build_parquet(tmp_path, generate):
+    """Test that Parquet output holds the validated questions"""
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    output = str(tmp_path / "bank.parquet")
+    builder = QuestionBankBuilder(str(tmp_path / "c.json"), output=output, output_format="parquet",
+                                  num_questions=3, generate=generate)
+
+    builder.build(["History"])
+
+    table = pyarrow_parquet.read_table(output)
+    assert table.num_rows == 3
+    assert set(table.column_names) >= {"topic", "question", "options", "answer"}
+    assert not (tmp_path / "bank.parquet.partial.jsonl").exists()
+
+
+def test_main(tmp_path, generate):
+    """Test the command line with topics from a file"""
+    topics_file = tmp_path / "topics.txt"
+    topics_file.write_text("History\n\nJazz\n")
+    output = str(tmp_path / "bank.jsonl")
+
+    def fake_topic_questions(topic, num_questions, *args):
+        return generate_topic_questions(topic, num_questions, 10, generate=generate)
+
+    with patch("build_question_bank.generate_topic_questions", fake_topic_questions):
+        code = main(["--topics-file", str(topics_file), "--questions", "3",
+                     "--output", output, "--no-bank"])
+
+    assert code == 0
+    assert len(read_records(output)) == 6
@@ -0,0 +1,25 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _explanation_app():
+    import streamlit as st
+    from main import render_explanation_stream
+    from services.explanation_stream import ExplanationStream
+
+    if "explanations" not in st.session_state:
+        stream = ExplanationStream()
+        stream.consume(["Because ", "it is."])
+        st.session_state.explanations = {0: stream}
+        st.session_state.runs = 0
+    st.session_state.runs += 1
+    render_explanation_stream(st.session_state.explanations, 0)
+
+
+def test_finished_explanation_stream_is_stored():
+    """Test that a finished stream is stored as text and shown by a full run"""
+    at = AppTest.from_function(_explanation_app)
+    at.run()
+
+    assert at.session_state.explanations == {0: "Because it is."}
+    assert at.session_state.runs == 2
+    assert at.markdown[0].value == "Because it is."
@@ -0,0 +1,73 @@
+import pytest
+from models.question import Question
+from utils.dedup import DuplicateFilter, RecentKeys, shingles, similarity
+
+
+def make_question(stem, answer):
+    return Question(stem, {"A": answer, "B": "Other", "C": "Another", "D": "None"}, "A")
+
+
+@pytest.mark.parametrize("first, second", [
+    (("What is the capital of France?", "Paris"), ("Which city is the capital of France?", "Paris")),
+    (("What is the largest planet in our solar system?", "Jupiter"),
+     ("Which planet is the largest in the solar system?", "Jupiter")),
+    (("In which year did World War II end?", "1945"), ("When did the Second World War end?", "1945")),
+    (("1. What year did the Titanic sink?", "1912"), ("In what year did the Titanic sink?", "1912")),
+])
+def test_paraphrases_are_duplicates(first, second):
+    """Test that rephrased questions with the same answer are detected"""
+    dedup = DuplicateFilter([make_question(*first)])
+
+    assert dedup.duplicate_of(make_question(*second)) is not None
+
+
+@pytest.mark.parametrize("first, second", [
+    (("Who was the first president of the United States?", "George Washington"),
+     ("Who was the second president of the United States?", "John Adams")),
+    (("What is the chemical symbol for gold?", "Au"), ("What is the chemical symbol for silver?", "Ag")),
+    (("What is the largest planet in our solar system?", "Jupiter"),
+     ("Which planet has the Great Red Spot?", "Jupiter")),
+])
+def test_different_questions_are_kept(first, second):
+    """Test that similar questions about different facts are not duplicates"""
+    dedup = DuplicateFilter([make_question(*first)])
+
+    assert dedup.add(make_question(*second))
+    assert len(dedup) == 2
+
+
+def test_same_key_is_duplicate():
+    """Test that the exact duplicate check of Question.key still applies"""
+    original = make_question("What is Python?", "A language")
+    dedup = DuplicateFilter([original])
+
+    assert dedup.duplicate_of(make_question("2. what is python", "A snake")) is original
+    assert not dedup.add(make_question("2. what is python", "A snake"))
+    assert not dedup.add(make_question("???", "Something"))
+
+
+def test_shared_first_line_is_not_duplicate():
+    """Test that questions sharing their first line, e.g. a preamble, are kept"""
+    preamble = "Here is a multiple choice question about History:\n"
+    dedup = DuplicateFilter([make_question(preamble + "Who was the first emperor of Rome?", "Augustus")])
+
+    assert dedup.add(make_question(preamble + "In which year did the Western Roman Empire fall?", "476"))
+    assert len(dedup) == 2
+
+
+def test_similarity():
+    """Test the Jaccard similarity of shingle sets"""
+    assert similarity(shingles("the capital"), shingles("Capital!")) == 1.0
+    assert similarity(shingles("cat"), shingles("dog")) == 0.0
+    assert similarity(frozenset(), frozenset()) == 1.0
+
+
+def test_recent_keys_forget_the_oldest():
+    """Test that only the most recently seen keys are kept, in order"""
+    keys = RecentKeys(["q1", "q2", "q3"], maxlen=3)
+    keys.add("q1")
+    keys.add("q4")
+
+    assert list(keys) == ["q3", "q1", "q4"]
+    assert "q2" not in keys and "q4" in keys
+    assert len(keys) == 3
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import Mock, patch
 import plotly.graph_objects as go
 import streamlit as st
-from utils.spinning_wheel import SpinningWheel
+from utils.spinning_wheel import SpinningWheel, wheel_colors, wheel_svg
 
 
 # Fixture to mock Streamlit
@@ -17,7 +17,7 @@ def mock_streamlit(monkeypatch):
 @pytest.mark.parametrize("num_topics", [3, 5, 6])
 def test_initialize_wheel(mock_streamlit, num_topics):
     """Test initializing the wheel with different numbers of topics."""
-    wheel = SpinningWheel()
+    wheel = SpinningWheel(mode="frames")
     assert wheel.plot_placeholder is None
 
     # Call the method
@@ -79,7 +79,7 @@ def test_add_pointer_to_figure():
 
 def test_animate_spin():
     """Test the animate_spin method."""
-    wheel = SpinningWheel()
+    wheel = SpinningWheel(mode="frames")
 
     # Prepare test data
     topics = ['Topic 1', 'Topic 2', 'Topic 3', 'Topic 4']
@@ -95,4 +95,56 @@ def test_animate_spin():
         assert mock_placeholder.plotly_chart.call_count == len(frames)
 
         # Verify time.sleep was called for each frame
-        assert mock_sleep.call_count == len(frames)
\ No newline at end of file
+        assert mock_sleep.call_count == len(frames)
+
+
+def test_initialize_wheel_client_mode(mock_streamlit):
+    """Test that client mode renders the SVG wheel without building frames."""
+    wheel = SpinningWheel(mode="client")
+
+    with patch.object(wheel, 'create_frames_and_plot') as mock_frames:
+        frames, final_angle = wheel.initialize_wheel(['Topic 1', 'Topic 2', 'Topic 3'], 3)
+
+    mock_frames.assert_not_called()
+    assert frames is None
+    assert 1080 <= final_angle <= 2160
+    assert final_angle % 120 != 0
+
+    html = mock_streamlit.html.call_args.args[0]
+    assert html.count('<path') == 3
+    assert 'Topic 2' in html
+    assert 'animation' not in html
+
+
+def test_animate_spin_client_mode(mock_streamlit):
+    """Test that client mode sends the whole spin as one payload."""
+    wheel = SpinningWheel(mode="client")
+    _, final_angle = wheel.initialize_wheel(['Topic 1', 'Topic 2', 'Topic 3', 'Topic 4'], 4)
+
+    with patch('time.sleep', Mock()) as mock_sleep:
+        wheel.animate_spin(None)
+
+    assert mock_streamlit.html.call_count == 2
+    html = mock_streamlit.html.call_args.args[0]
+    assert f'rotate({final_angle}deg)' in html
+    assert '@keyframes' in html
+    mock_streamlit.plotly_chart.assert_not_called()
+    mock_sleep.assert_called_once()
+
+
+def test_wheel_svg_is_cached():
+    """Test that the wheel geometry is computed once per topics and segments."""
+    topics = ('Topic <1>', 'Topic 2', 'Topic 3')
+
+    assert wheel_svg(topics, 3) is wheel_svg(topics, 3)
+    assert 'Topic &lt;1&gt;' in wheel_svg(topics, 3)
+
+
+def test_wheel_colors_match_rainbow_colormap():
+    """Test the palette against matplotlib's rainbow colormap endpoints."""
+    colors = wheel_colors(3)
+
+    assert len(colors) == 3
+    assert colors[0] == pytest.approx((0.5, 0.0, 1.0, 1.0))
+    assert colors[1] == pytest.approx((0.5, 1.0, 0.7071, 1.0), abs=1e-4)
+    assert colors[2] == pytest.approx((1.0, 0.0, 0.0, 1.0), abs=1e-9)
@@ -0,0 +1,17 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _timer_app():
+    import time
+    from utils.timer import render_elapsed_time
+
+    render_elapsed_time(time.time() - 12.34)
+
+
+def test_render_elapsed_time():
+    """Test that the elapsed time is displayed without being stored"""
+    at = AppTest.from_function(_timer_app)
+    at.run()
+
+    assert at.markdown[0].value.startswith("Elapsed time: 12.3")
+    assert "elapsed_time" not in at.session_state
@@ -41,7 +41,9 @@ def test_topic_validation(mock_text_input, mock_st_error):
         # Reset mocks for each test case
         mock_st_error.clear()
 
-        with patch('streamlit.text_input', return_value=input_topic):
+        # The verdict of the Groq API, once the background check is done
+        with patch('streamlit.text_input', return_value=input_topic), \
+                patch('utils.validators.topic_validator.check', return_value=(True, "")):
             result = get_valid_custom_topic()
 
             assert result == expected_result
@@ -59,4 +61,15 @@ def test_server_validation_failure(mock_text_input, mock_st_error):
         result = get_valid_custom_topic()
         assert result is None
         assert len(mock_st_error) > 0
-        assert "Please enter a real topic" in mock_st_error[0]
\ No newline at end of file
+        assert "Please enter a real topic" in mock_st_error[0]
+
+
+def test_topic_checked_in_background(mock_text_input, mock_st_error):
+    """Test that the script doesn't wait for the API to decide on a topic"""
+    with patch('streamlit.text_input', return_value='Machine Learning'), \
+            patch('utils.validators.topic_validator.check', return_value=None), \
+            patch('utils.validators._rerun_when_checked') as mock_rerun:
+        assert get_valid_custom_topic() is None
+
+    mock_rerun.assert_called_once_with('Machine Learning')
+    assert mock_st_error == []
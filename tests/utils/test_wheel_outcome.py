@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+import pytest
+from utils.spinning_wheel import SpinningWheel
+from utils.wheel_outcome import MAX_ROTATION, MIN_ROTATION, WheelOutcome, segment_at, spin
+
+
+@pytest.mark.parametrize("num_segments", [3, 4, 5, 6, 8, 9, 10, 12, 15, 18, 20, 24, 30])
+def test_segment_at_matches_previous_formula(num_segments):
+    """Test that segments are the ones the app picked before"""
+    segment_angle = 360 // num_segments
+    for angle in range(MIN_ROTATION, MAX_ROTATION + 2):
+        if angle % segment_angle:
+            expected = num_segments - 1 - (angle % 360) // segment_angle
+            assert segment_at(angle, num_segments) == expected
+
+
+def test_segment_at_pointer_positions():
+    """Test that a small clockwise turn brings the last segment under the pointer"""
+    assert segment_at(1, 4) == 3
+    assert segment_at(91, 4) == 2
+    assert segment_at(359, 4) == 0
+    assert segment_at(360 * 3 + 1, 4) == 3
+
+
+@pytest.mark.parametrize("num_segments", [3, 7, 12, 30])
+def test_spin_never_ends_on_a_border(num_segments):
+    """Test that spins stay in range and never stop between two segments"""
+    rng = random.Random(1)
+    for _ in range(2000):
+        outcome = spin(num_segments, rng)
+        assert MIN_ROTATION <= outcome.angle <= MAX_ROTATION + 1
+        assert outcome.angle * num_segments % 360 != 0
+        assert 0 <= outcome.segment < num_segments
+
+
+def test_spin_is_reproducible():
+    """Test that spins with the same seed have the same outcome"""
+    assert spin(12, seed=42) == spin(12, seed=42)
+    assert [spin(12, random.Random(7)) for _ in range(3)] == \
+        [spin(12, random.Random(7)) for _ in range(3)]
+    assert isinstance(spin(12), WheelOutcome)
+
+
+def test_spin_covers_all_segments():
+    """Test that every segment can be chosen"""
+    rng = random.Random(0)
+    counts = Counter(spin(8, rng).segment for _ in range(8000))
+
+    assert set(counts) == set(range(8))
+    assert min(counts.values()) > 800
+
+
+def test_wheel_uses_outcome_engine():
+    """Test that a seeded wheel spins to the angle of the seeded engine"""
+    wheel = SpinningWheel(mode="frames", rng=random.Random(3))
+    _, frames, angle = wheel.create_frames_and_plot(['A', 'B', 'C'], 3)
+
+    assert angle == spin(3, seed=3).angle
+    assert frames[-1].data[0].rotation < angle